@@ -1,14 +1,15 @@
 """Some helpful functions for working with a pandas DataFrame object"""
 
 from lcmap_tap.Analysis import mask_values
-from lcmap_tap.logger import exc_handler
+from lcmap_tap.RetrieveData import aliases
+from lcmap_tap.logger import log, exc_handler
 import sys
 import warnings
 import datetime as dt
 import pandas as pd
 import numpy as np
 import requests
-from collections import OrderedDict
+from collections import OrderedDict, namedtuple
 from functools import lru_cache
 
 sys.excepthook = exc_handler
@@ -16,6 +17,73 @@ sys.excepthook = exc_handler
 warnings.simplefilter('ignore')
 
 
+ChipCube = namedtuple("ChipCube", ["rows", "cols", "bands"])
+
+
+def chip_cube(timeseries, bands):
+    """
+    Rearrange a chip time series into one (pixels, dates) array per band, along with the row and column of each pixel
+    in the chip, so that a date can be pulled for the whole chip with a single indexing operation
+
+    Args:
+        timeseries (array_like): A series of tuples, each containing a chip of data in the time series
+        bands (Iterable): Collection of band names that matches chipmunk bands
+
+    Returns:
+        ChipCube
+
+    """
+    coords = np.array([t[0][:4] for t in timeseries], dtype=np.int64).reshape(-1, 4)
+
+    cols = (coords[:, 2] - coords[:, 0]) // 30
+    rows = (coords[:, 1] - coords[:, 3]) // 30
+
+    cube = dict()
+
+    for b in set(bands):
+        try:
+            cube[b] = np.stack([t[1][b] for t in timeseries])
+
+        except ValueError:
+            # Pixels with differing numbers of observations can't be stacked, keep them as they are
+            cube[b] = [t[1][b] for t in timeseries]
+
+    return ChipCube(rows=rows, cols=cols, bands=cube)
+
+
+def assemble_cube(cube, ind, bands=None, dtype=int):
+    """
+    Populate a 100x100 array for each band from a chip cube, using the values at a single index in the time series
+
+    Args:
+        cube (ChipCube): The chip time series from chip_cube
+        ind (int): The index location for the target date in the time series
+        bands (Iterable): Collection of band names to assemble, default is all of the bands in the cube
+        dtype (type): Data type of the assembled arrays
+
+    Returns:
+        Dict[str: np.ndarray]
+
+    """
+    if bands is None:
+        bands = cube.bands.keys()
+
+    out = dict()
+
+    for b in bands:
+        out[b] = np.zeros(shape=(100, 100), dtype=dtype)
+
+        values = cube.bands[b]
+
+        if isinstance(values, np.ndarray):
+            out[b][cube.rows, cube.cols] = values[:, ind]
+
+        else:
+            out[b][cube.rows, cube.cols] = [v[ind] for v in values]
+
+    return out
+
+
 def assemble(timeseries, ind, bands):
     """
     Populate n-number of arrays using appropriate row and column locations
@@ -29,22 +97,41 @@ def assemble(timeseries, ind, bands):
         Dict[str: np.ndarray]
 
     """
-    out = {b: np.zeros(shape=(100, 100), dtype=np.int) for b in bands}
+    return assemble_cube(chip_cube(timeseries, bands), ind, bands)
+
+
+def export_frame(pixel_ard, items):
+    """
+    Build the table of observed values for the selected plot items, as written out by the CSV export
 
-    for t in timeseries:
-        coord_x = t[0][2]
-        coord_y = t[0][3]
+    Args:
+        pixel_ard (dict): The pixel time series, e.g. ARDData.pixel_ard
+        items (Iterable): The selected bands and/or indices
 
-        chip_coord_x = t[0][0]
-        chip_coord_y = t[0][1]
+    Returns:
+        pd.DataFrame
 
-        col = int((coord_x - chip_coord_x) / 30)
-        row = int((chip_coord_y - coord_y) / 30)
+    """
+    data = dict()
 
-        for b in bands:
-            out[b][row][col] = t[1][b][ind]
+    for item in items:
+        if item in aliases.keys():
+            for key in aliases[item]:
+                data[key] = pixel_ard[key]
 
-    return out
+    try:
+        data['qa'] = pixel_ard['qas']
+
+        data['dates'] = pixel_ard['dates']
+
+    except KeyError as _e:
+        log.error('Exception: %s' % _e, exc_info=True)
+
+    data = pd.DataFrame(data).sort_values('dates').reset_index(drop=True)
+
+    data['dates'] = data['dates'].apply(lambda x: dt.datetime.fromordinal(x))
+
+    return data
 
 
 @lru_cache()
@@ -4,7 +4,7 @@ Establish the main GUI Window using PyQt, provide the main interactions with chi
 
 from lcmap_tap.UserInterface import ui_main_workshop
 from lcmap_tap.Controls import UNITS
-from lcmap_tap.RetrieveData import aliases, RowColumn
+from lcmap_tap.RetrieveData import RowColumn
 from lcmap_tap.RetrieveData.retrieve_ard import ARDData
 from lcmap_tap.RetrieveData.retrieve_ccd import CCDReader
 from lcmap_tap.RetrieveData.retrieve_geo import GeoInfo
@@ -13,12 +13,14 @@ from lcmap_tap.PlotFrame.plotwindow import PlotWindow
 from lcmap_tap.PlotFrame.symbology_window import SymbologyWindow
 from lcmap_tap.Plotting import make_plots, LOOKUP, POINTS
 from lcmap_tap.Plotting.plot_config import PlotConfig
+from lcmap_tap.Plotting.figures import FIGURES
 from lcmap_tap.Plotting.plot_specs import PlotSpecs
 from lcmap_tap.Auxiliary import projections
 from lcmap_tap.Visualization.chip_viewer import ChipsViewerX
 from lcmap_tap.MapCanvas.mapcanvas import MapCanvas
 from lcmap_tap.logger import log, exc_handler, QtHandler
 from lcmap_tap.Auxiliary.caching import read_cache, update_cache
+from lcmap_tap.Analysis.data_tools import export_frame
 from lcmap_tap import HOME
 
 import datetime as dt
@@ -27,10 +29,8 @@ import sys
 import time
 import re
 import matplotlib
-import matplotlib.pyplot as plt
 import yaml
 import pkg_resources
-import pandas as pd
 import numpy as np
 from osgeo import ogr, osr
 from PyQt5.QtWidgets import QMainWindow, QFileDialog
@@ -278,10 +278,7 @@ class MainControls(QMainWindow):
             except (IOError, PermissionError) as _e:
                 log.error('Exception: %s' % _e, exc_info=True)
 
-        # Make sure the timeseries plot is set as the current figure
-        plt.figure(f'timeseries_figure_{self.fig_num}')
-
-        plt.savefig(fname, bbox_inches="tight", dpi=150)
+        self.fig.savefig(fname, bbox_inches="tight", dpi=150)
 
         log.debug("Plot figure saved to file {}".format(fname))
 
@@ -418,6 +415,9 @@ class MainControls(QMainWindow):
         if self.plot_window:
             self.plot_window.close()
 
+        # The previous figure is replaced by this one
+        FIGURES.close(self.fig)
+
         self.fig_num += 1
 
         # <list> The bands and/or indices selected for plotting
@@ -500,7 +500,8 @@ class MainControls(QMainWindow):
         self.plot_window = PlotWindow(fig=self.fig,
                                       axes=self.axes,
                                       artist_map=self.artist_map,
-                                      lines_map=self.lines_map
+                                      lines_map=self.lines_map,
+                                      plot_specs=self.plot_specs
                                       )
 
         self.plot_window.selected_obs.connect(self.connect_plot_selection)
@@ -581,6 +582,16 @@ class MainControls(QMainWindow):
         date = dt.datetime.strptime(match, '%Y-%b-%d')
 
         try:
+            if self.ard and self.ard.covers(self.geo_info.coord.x, self.geo_info.coord.y, date):
+                # The chips for this date are already in memory, move the viewer to it instead of retrieving them
+                self.ard.ax = self.plot_window.b
+
+                self.ard.set_date(date)
+
+                self.ard.show()
+
+                return
+
             if self.ard:
 
                 # Update with the previously selected color channels so they are displayed in the new ARD viewer
@@ -599,7 +610,10 @@ class MainControls(QMainWindow):
                                     r=self.store_r,
                                     g=self.store_g,
                                     b=self.store_b,
-                                    outdir=self.working_directory)
+                                    outdir=self.working_directory,
+                                    radius=CONFIG.get('MOSAIC_RADIUS', 1),
+                                    workers=CONFIG.get('FETCH_WORKERS', 4),
+                                    cache=self.cache_data)
 
             self.ard.update_plot_signal.connect(self.update_plot)
 
@@ -625,26 +639,7 @@ class MainControls(QMainWindow):
         Export the currently plotted data to an output CSV that will be saved in the specified working directory.
 
         """
-        data = dict()
-
-        for item in self.item_list:
-            if item in aliases.keys():
-                group = aliases[item]
-
-                for key in group:
-                    data[key] = self.ard_observations.pixel_ard[key]
-
-        try:
-            data['qa'] = self.ard_observations.pixel_ard['qas']
-
-            data['dates'] = self.ard_observations.pixel_ard['dates']
-
-        except KeyError as _e:
-            log.error('Exception: %s' % _e, exc_info=True)
-
-        data = pd.DataFrame(data).sort_values('dates').reset_index(drop=True)
-
-        data['dates'] = data['dates'].apply(lambda x: dt.datetime.fromordinal(x))
+        data = export_frame(self.ard_observations.pixel_ard, self.item_list)
 
         data.to_csv(os.path.join(self.working_directory,
                                  f'{get_time()}_{self.geo_info.pixel_coord_ul.x}_{self.geo_info.pixel_coord_ul.y}.csv'))
@@ -774,7 +769,7 @@ class MainControls(QMainWindow):
                 # highlight.set_data(self.date_x[0], self.data_y[0])
                 highlight.set_data(self.ard.date_x, data_y)
 
-                self.plot_window.canvas.draw()
+                self.plot_window.blit()
 
                 break
 
@@ -823,8 +818,6 @@ class MainControls(QMainWindow):
 
     @QtCore.pyqtSlot(object)
     def redraw_plot(self, val):
-        self.fig_num += 1
-
         log.debug("Received plot config vals: {}".format(val))
 
         if self.label in POINTS:
@@ -841,20 +834,8 @@ class MainControls(QMainWindow):
 
         self.symbol_selector.close()
 
-        self.fig, self.artist_map, self.lines_map, self.axes = make_plots.draw_figure(data=self.plot_specs,
-                                                                                      items=self.item_list,
-                                                                                      fig_num=self.fig_num,
-                                                                                      config=self.plotconfig.opts)
-
-        self.plot_window = PlotWindow(fig=self.fig,
-                                      axes=self.axes,
-                                      artist_map=self.artist_map,
-                                      lines_map=self.lines_map
-                                      )
-
-        self.plot_window.selected_obs.connect(self.connect_plot_selection)
-
-        self.plot_window.change_symbology.connect(self.change_symbology)
+        # Update the existing figure rather than drawing a new one
+        self.plot_window.apply_config(self.plotconfig.opts)
 
     @QtCore.pyqtSlot(object)
     def save_plot_config(self, outfile):
@@ -873,19 +854,4 @@ class MainControls(QMainWindow):
 
         self.symbol_selector.close()
 
-        self.fig_num += 1
-
-        self.fig, self.artist_map, self.lines_map, self.axes = make_plots.draw_figure(data=self.plot_specs,
-                                                                                      items=self.item_list,
-                                                                                      fig_num=self.fig_num,
-                                                                                      config=self.plotconfig.opts)
-
-        self.plot_window = PlotWindow(fig=self.fig,
-                                      axes=self.axes,
-                                      artist_map=self.artist_map,
-                                      lines_map=self.lines_map
-                                      )
-
-        self.plot_window.selected_obs.connect(self.connect_plot_selection)
-
-        self.plot_window.change_symbology.connect(self.change_symbology)
\ No newline at end of file
+        self.plot_window.apply_config(self.plotconfig.opts)
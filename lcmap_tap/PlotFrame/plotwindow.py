@@ -15,8 +15,10 @@ import matplotlib
 matplotlib.use("Qt5Agg")
 from matplotlib.collections import PathCollection
 from matplotlib.lines import Line2D
+from matplotlib.legend import Legend
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
+from lcmap_tap.Plotting import make_plots
 
 sys.excepthook = exc_handler
 
@@ -55,7 +57,7 @@ class PlotWindow(QtWidgets.QMainWindow):
 
     change_symbology = QtCore.pyqtSignal(object)
 
-    def __init__(self, fig, axes, artist_map, lines_map, parent=None):
+    def __init__(self, fig, axes, artist_map, lines_map, parent=None, plot_specs=None):
         """
         TODO Add a summary
         Args:
@@ -64,6 +66,7 @@ class PlotWindow(QtWidgets.QMainWindow):
             artist_map:
             lines_map:
             parent:
+            plot_specs: The PlotSpecs the figure was drawn from, used to redraw the model curves when the view changes
 
         """
         super(PlotWindow, self).__init__(parent)
@@ -82,6 +85,7 @@ class PlotWindow(QtWidgets.QMainWindow):
 
         self.artist_map = artist_map
         self.lines_map = lines_map
+        self.plot_specs = plot_specs
         # self.gui = gui
 
         self.prev_highlight = None
@@ -93,12 +97,30 @@ class PlotWindow(QtWidgets.QMainWindow):
 
         self.fig = fig
         self.canvas = MplCanvas(fig=self.fig)
-        self.canvas.draw()
 
         # <matplotlib.axes.Axes> All axes in the figure are linked via sharey=True, only need one axes object
         # to control zooming on all axes simultaneously.
         self.ax = axes.flatten()[0]
 
+        # The rendered figure minus the animated artists, captured after every full draw.  Updates to the animated
+        # artists restore this and draw only those artists on top of it.
+        self.background = None
+
+        # <list> Artists left out of full draws and redrawn over the background: the highlighted points, the legend,
+        # and anything that has been toggled from the legend
+        self.animated = list()
+
+        self.set_animated([a for key, artists in self.artist_map.items() if isinstance(key, str) for a in artists])
+
+        if self.ax.get_legend() is not None:
+            self.set_animated([self.ax.get_legend()])
+
+        self.canvas.mpl_connect("draw_event", self.on_draw)
+
+        self.canvas.mpl_connect("resize_event", self.on_resize)
+
+        self.canvas.draw()
+
         # <tuple> Contains the original x-axes (i.e. date) limits in order (left, right)
         self.xlim_original = self.ax.get_xlim()
 
@@ -131,6 +153,10 @@ class PlotWindow(QtWidgets.QMainWindow):
 
         self.canvas.mpl_connect("scroll_event", self.zoom_event)
 
+        # Resample the model curves on every change of the view, from the scroll wheel or the toolbar
+        if self.plot_specs is not None:
+            make_plots.follow_view(self.plot_specs, self.artist_map, axes)
+
         self.show()
 
         self.resize(1200, 400)
@@ -188,9 +214,98 @@ class PlotWindow(QtWidgets.QMainWindow):
 
                         set_vis(vis, legline)
 
-            # Redraw the canvas with the line or points turned on/off
+        # Redraw the canvas once all of the legend lines are set
+        self.canvas.draw()
+
+    def set_animated(self, artists):
+        """
+        Leave artists out of full canvas draws and draw them over the cached background instead.  A full draw is
+        needed afterwards for the background to no longer include them.
+
+        Args:
+            artists: <list> matplotlib artists
+
+        Returns:
+            None
+
+        """
+        for artist in artists:
+            if not artist.get_animated():
+                artist.set_animated(True)
+
+                self.animated.append(artist)
+
+    def on_draw(self, event=None):
+        """
+        Cache the background after a full draw of the canvas, then draw the animated artists over it
+
+        Args:
+            event: The 'draw_event'
+
+        Returns:
+            None
+
+        """
+        # Saving the figure renders it at a different size, that's no good as a background
+        if self.canvas.is_saving():
+            self.background = None
+
+            return
+
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+
+        self.draw_animated()
+
+    def on_resize(self, event=None):
+        """
+        The cached background no longer matches the canvas once it has been resized, and the model curves need
+        resampling for the new width
+
+        Args:
+            event: The 'resize_event'
+
+        Returns:
+            None
+
+        """
+        self.background = None
+
+        # The curves are sampled for the plot's width in pixels
+        if self.plot_specs is not None:
+            make_plots.regenerate_curves(self.plot_specs, self.artist_map, self.ax)
+
+    def draw_animated(self):
+        """
+        Draw the animated artists onto the canvas renderer in the same order as a full draw would, by z-order, with
+        the legends always on top
+
+        Returns:
+            None
+
+        """
+        for artist in sorted(self.animated, key=lambda a: (isinstance(a, Legend), a.get_zorder())):
+            self.fig.draw_artist(artist)
+
+    def blit(self):
+        """
+        Redraw only the animated artists over the cached background.  Falls back to a full draw of the canvas if
+        there is no usable background, which also caches a new one.
+
+        Returns:
+            None
+
+        """
+        if self.background is None:
             self.canvas.draw()
 
+            return
+
+        self.canvas.restore_region(self.background)
+
+        self.draw_animated()
+
+        self.canvas.blit(self.fig.bbox)
+
     def point_pick(self, event=None):
         """
         Define a picker method to grab data off of the plot wherever the mouse cursor is clicked
@@ -312,7 +427,7 @@ class PlotWindow(QtWidgets.QMainWindow):
 
         highlight.set_data(self.artist_data[0], self.artist_data[1])
 
-        self.canvas.draw()
+        self.blit()
 
     def leg_pick(self):
         """
@@ -352,6 +467,14 @@ class PlotWindow(QtWidgets.QMainWindow):
 
         # log.debug("method leg_pick, origlines referenced=%s" % str(origlines))
 
+        # Artists toggled for the first time have to be taken out of the background with one full draw, after that
+        # they are drawn over the background like the highlighted points
+        artists = [_l for l in origlines for _l in (l if type(l) is list else [l])]
+
+        first_toggle = not all(a.get_animated() for a in artists)
+
+        self.set_animated(artists)
+
         for l in origlines:
             if type(l) is not list:
                 # Reference the opposite of the line's current visibility
@@ -370,7 +493,11 @@ class PlotWindow(QtWidgets.QMainWindow):
                     set_vis(vis, legline)
 
         # Redraw the canvas with the line or points turned on/off
-        self.canvas.draw()
+        if first_toggle:
+            self.canvas.draw()
+
+        else:
+            self.blit()
 
     def init_configure(self):
         log.debug("Selected Legend Label: {}".format(self.artist.get_label()))
@@ -411,6 +538,21 @@ class PlotWindow(QtWidgets.QMainWindow):
         if event:
             self.scroll.viewport().removeEventFilter(self)
 
+    def apply_config(self, config: dict):
+        """
+        Update the symbology of the current figure in place and redraw it once
+
+        Args:
+            config: Plot symbology settings, i.e. PlotConfig.opts
+
+        Returns:
+            None
+
+        """
+        make_plots.apply_config(self.fig, self.lines_map, config)
+
+        self.canvas.draw()
+
     def zoom_event(self, event=None, base_scale=2.):
         """
         Enable zooming in/out of the plots using the mouse scroll wheel.  Current affects only the x-axis by design.
@@ -2,6 +2,7 @@
 
 from lcmap_tap.UserInterface.ui_symbology import Ui_MainWindow_symbology
 from lcmap_tap.Plotting import POINTS
+from lcmap_tap.Plotting.figures import FIGURES
 
 import os
 import sys
@@ -60,7 +61,8 @@ class SymbologyWindow(QtWidgets.QMainWindow):
 
         icon = QIcon(QPixmap(pkg_resources.resource_filename("lcmap_tap", "/".join(("Auxiliary", "icon.PNG")))))
 
-        self.fig = plt.figure()
+        # Only one symbology window is open at a time, so its figure replaces the last one
+        self.fig = FIGURES.figure('symbology_figure')
 
         self.ax = self.fig.add_subplot(1, 1, 1)
         self.ax.grid(False)
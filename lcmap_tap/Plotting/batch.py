@@ -0,0 +1,271 @@
+"""Render the time series plots and CSV exports for a list of points without the GUI.  Points are grouped by chip and
+each chip is handled by one worker process, so the chip's ARD is only retrieved once no matter how many of its pixels
+are in the list.
+
+    python -m lcmap_tap.Plotting.batch points.csv -o plots --items "All Spectral Bands" NDVI -j 4
+"""
+
+import matplotlib
+
+# No display is needed, this has to happen before pyplot is imported
+matplotlib.use('Agg')
+
+from lcmap_tap.RetrieveData.retrieve_ard import ARDData
+from lcmap_tap.RetrieveData.retrieve_ccd import CCDReader
+from lcmap_tap.RetrieveData.retrieve_geo import GeoInfo
+from lcmap_tap.RetrieveData.retrieve_classes import SegmentClasses
+from lcmap_tap.Plotting import make_plots
+from lcmap_tap.Plotting.figures import FIGURES
+from lcmap_tap.Plotting.plot_config import PlotConfig
+from lcmap_tap.Plotting.plot_specs import PlotSpecs
+from lcmap_tap.Analysis.data_tools import export_frame
+from lcmap_tap.Auxiliary.caching import read_cache, update_cache
+from lcmap_tap.logger import log, exc_handler
+
+import os
+import sys
+import argparse
+import datetime as dt
+import multiprocessing as mp
+from collections import OrderedDict
+from typing import List, Tuple
+
+import yaml
+import pkg_resources
+
+sys.excepthook = exc_handler
+
+
+def read_points(path: str) -> List[Tuple[str, str]]:
+    """
+    Read x, y coordinates from a text or CSV file, one point per line.  Lines that don't start with two numbers,
+    such as a header, are skipped.
+
+    Args:
+        path: Full path to the points file
+
+    Returns:
+        The x and y of each point, as strings like the GUI coordinate inputs
+
+    """
+    points = list()
+
+    with open(path, 'r') as f:
+        for line in f:
+            parts = line.replace(',', ' ').split()
+
+            try:
+                float(parts[0])
+                float(parts[1])
+
+            except (IndexError, ValueError):
+                continue
+
+            points.append((parts[0], parts[1]))
+
+    return points
+
+
+def group_by_chip(points: List[Tuple[str, str]], units: str="meters") -> OrderedDict:
+    """
+    Group the points by the chip that contains them
+
+    Args:
+        points: x, y coordinates
+        units: Coordinate units, either "meters" or "lat/long"
+
+    Returns:
+        Chip UL key, e.g. '-2565585_3314805': list of points in that chip
+
+    """
+    chips = OrderedDict()
+
+    for x, y in points:
+        geo = GeoInfo(x=x, y=y, units=units)
+
+        chips.setdefault(f'{geo.chip_coord_ul.x}_{geo.chip_coord_ul.y}', list()).append((x, y))
+
+    return chips
+
+
+def render_point(x: str, y: str, units: str, items: list, url: str, ccd_root: str, outdir: str, config: dict,
+                 cache: dict, fig_num: int, begin: dt.date, end: dt.date) -> str:
+    """
+    Retrieve the data for one point, then write its time series plot to PNG and its observations to CSV
+
+    Args:
+        x: X-coordinate
+        y: Y-coordinate
+        units: Coordinate units, either "meters" or "lat/long"
+        items: The bands and/or indices to plot
+        url: Chipmunk URL
+        ccd_root: Directory containing the tile folders of PyCCD and classification results
+        outdir: Output directory
+        config: Plot symbology settings
+        cache: ARD chip data shared between the points of a chip
+        fig_num: Used as the figure identifier
+        begin: Start date of the time series
+        end: End date of the time series
+
+    Returns:
+        Path to the output files, without the extension
+
+    """
+    geo = GeoInfo(x=x, y=y, units=units)
+
+    if f'{geo.chip_coord_ul.x}_{geo.chip_coord_ul.y}' not in cache:
+        cache = read_cache(geo, cache)
+
+    ard = ARDData(geo=geo, url=url, items=items, cache=cache)
+
+    cache = update_cache(cache, ard.cache, ard.key)
+
+    try:
+        ccd = CCDReader(tile=geo.tile,
+                        chip_coord=geo.chip_coord_ul,
+                        pixel_coord=geo.pixel_coord_ul,
+                        json_dir=os.path.join(ccd_root, geo.tile, 'change', 'n-compare', 'json'))
+
+    except (IndexError, AttributeError, TypeError, ValueError, FileNotFoundError) as _e:
+        log.error('Exception: %s' % _e, exc_info=True)
+
+        ccd = None
+
+    try:
+        classes = SegmentClasses(chip_coord_ul=geo.chip_coord_ul,
+                                 class_dir=os.path.join(ccd_root, geo.tile, 'class', 'annualized', 'pickles'),
+                                 rc=geo.chip_pixel_rowcol,
+                                 tile=geo.tile)
+
+    except (IndexError, AttributeError, TypeError, ValueError, FileNotFoundError) as _e:
+        log.error('Exception: %s' % _e, exc_info=True)
+
+        classes = None
+
+    specs = PlotSpecs(ard=ard.pixel_ard, change=ccd, segs=classes, items=items, begin=begin, end=end)
+
+    fig, _, _, _ = make_plots.draw_figure(data=specs, items=items, fig_num=fig_num, config=config)
+
+    fname = os.path.join(outdir, f'H{geo.H}V{geo.V}_{geo.coord.x}_{geo.coord.y}')
+
+    try:
+        fig.savefig(f'{fname}.png', bbox_inches="tight", dpi=150)
+
+    finally:
+        FIGURES.close(fig)
+
+    export_frame(ard.pixel_ard, items).to_csv(f'{fname}.csv')
+
+    log.debug("Batch plot saved to {}.png".format(fname))
+
+    return fname
+
+
+def render_chip(job: dict) -> list:
+    """
+    Render all of the points within one chip, sharing the chip's ARD between them
+
+    Args:
+        job: The render_point keyword arguments plus 'points', the x, y coordinates in the chip
+
+    Returns:
+        The output paths for the points that were rendered
+
+    """
+    job = dict(job)
+
+    points = job.pop('points')
+
+    if job['config'] is None:
+        job['config'] = PlotConfig().opts
+
+    cache = dict()
+
+    out = list()
+
+    for num, (x, y) in enumerate(points):
+        try:
+            out.append(render_point(x, y, cache=cache, fig_num=num, **job))
+
+        # Keep going with the rest of the points
+        except Exception as _e:
+            log.error('Batch plot failed for {}, {}: {}'.format(x, y, _e), exc_info=True)
+
+    return out
+
+
+def run(points: List[Tuple[str, str]], outdir: str, items: list, url: str, ccd_root: str, units: str="meters",
+        processes: int=None, config: dict=None, begin: dt.date=dt.date(year=1982, month=1, day=1),
+        end: dt.date=dt.date(year=2017, month=12, day=31)) -> list:
+    """
+    Render the plots and CSV exports for a list of points across a pool of worker processes
+
+    Args:
+        points: x, y coordinates
+        outdir: Output directory
+        items: The bands and/or indices to plot, same as the GUI item list
+        url: Chipmunk URL
+        ccd_root: Directory containing the tile folders of PyCCD and classification results
+        units: Coordinate units, either "meters" or "lat/long"
+        processes: Number of worker processes, defaults to the number of CPUs
+        config: Plot symbology settings, defaults to the saved plot config
+        begin: Start date of the time series
+        end: End date of the time series
+
+    Returns:
+        The output paths for the points that were rendered
+
+    """
+    os.makedirs(outdir, exist_ok=True)
+
+    jobs = [{'points': chip_points,
+             'units': units,
+             'items': items,
+             'url': url,
+             'ccd_root': ccd_root,
+             'outdir': outdir,
+             'config': config,
+             'begin': begin,
+             'end': end}
+            for chip_points in group_by_chip(points, units).values()]
+
+    log.info("Rendering {} points in {} chips".format(len(points), len(jobs)))
+
+    out = list()
+
+    with mp.Pool(processes) as pool:
+        for paths in pool.imap_unordered(render_chip, jobs):
+            out.extend(paths)
+
+    return out
+
+
+def main(argv: list=None) -> int:
+    parser = argparse.ArgumentParser(description='Render TAP time series plots and CSV exports for a list of points')
+    parser.add_argument('points', help='text or CSV file with an x and y coordinate on each line')
+    parser.add_argument('-o', '--output', default='.', help='output directory')
+    parser.add_argument('--items', nargs='+', default=['All Spectral Bands and Indices'],
+                        help='bands and/or indices to plot, as named in the GUI')
+    parser.add_argument('--units', default='meters', choices=['meters', 'lat/long'])
+    parser.add_argument('-j', '--processes', type=int, default=None)
+    parser.add_argument('--url', default=None, help='Chipmunk URL, defaults to the config.yaml URL')
+    parser.add_argument('--ccd', default=None, help='PyCCD results directory, defaults to the config.yaml CCD')
+
+    args = parser.parse_args(argv)
+
+    if args.url is None or args.ccd is None:
+        with open(pkg_resources.resource_filename('lcmap_tap', 'config.yaml'), 'r') as f:
+            config = yaml.safe_load(f)
+
+        args.url = args.url or config['URL']
+        args.ccd = args.ccd or config['CCD']
+
+    out = run(read_points(args.points), args.output, args.items, args.url, args.ccd, args.units, args.processes)
+
+    log.info("Wrote plots for {} points to {}".format(len(out), args.output))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""Keep track of the matplotlib figures made through pyplot, so that superseded figures are closed instead of being
+kept alive by pyplot's figure registry for the rest of the session"""
+
+from lcmap_tap.logger import log, exc_handler
+
+import sys
+from collections import OrderedDict
+from typing import Union
+
+from matplotlib import pyplot as plt
+from matplotlib.figure import Figure
+
+sys.excepthook = exc_handler
+
+
+class FigureManager:
+
+    def __init__(self, max_open: int=3):
+        """
+        Args:
+            max_open: The most figures to keep open in any one group, the oldest are closed first
+
+        """
+        self.max_open = max_open
+
+        # <dict> group name: OrderedDict of figure name: Figure, oldest first
+        self.groups = dict()
+
+    def _register(self, name: str, group: str, fig: Figure) -> Figure:
+        figs = self.groups.setdefault(group, OrderedDict())
+
+        figs[name] = fig
+
+        while len(figs) > self.max_open:
+            old_name, old = figs.popitem(last=False)
+
+            log.debug('Closing figure {}'.format(old_name))
+
+            plt.close(old)
+
+        return fig
+
+    def figure(self, name: str, group: str=None, **kwargs) -> Figure:
+        """
+        Make a new pyplot figure, closing any figure that already has the same name
+
+        Args:
+            name: The figure name, used as the pyplot figure num
+            group: The group the figure is capped in, defaults to the figure name
+            **kwargs: Passed along to plt.figure
+
+        Returns:
+            The new figure
+
+        """
+        self.close(name)
+
+        return self._register(name, group or name, plt.figure(num=name, **kwargs))
+
+    def subplots(self, name: str, group: str=None, **kwargs) -> tuple:
+        """
+        Make a new pyplot figure and its axes, closing any figure that already has the same name
+
+        Args:
+            name: The figure name, used as the pyplot figure num
+            group: The group the figure is capped in, defaults to the figure name
+            **kwargs: Passed along to plt.subplots
+
+        Returns:
+            fig, axes
+
+        """
+        self.close(name)
+
+        fig, axes = plt.subplots(num=name, **kwargs)
+
+        return self._register(name, group or name, fig), axes
+
+    def close(self, fig: Union[str, Figure, None]) -> None:
+        """
+        Close a figure and stop tracking it
+
+        Args:
+            fig: The figure or its name
+
+        Returns:
+            None
+
+        """
+        if fig is None:
+            return
+
+        for figs in self.groups.values():
+            for name, f in list(figs.items()):
+                if f is fig or name == fig:
+                    del figs[name]
+
+        plt.close(fig)
+
+    def close_group(self, group: str) -> None:
+        """
+        Close all of the figures in a group
+
+        Args:
+            group: The group name
+
+        Returns:
+            None
+
+        """
+        for fig in list(self.groups.pop(group, dict()).values()):
+            plt.close(fig)
+
+    def count(self, group: str=None) -> int:
+        """
+        Number of figures open, in one group or altogether
+
+        Args:
+            group: The group name, or None for all groups
+
+        Returns:
+            The number of open figures
+
+        """
+        if group is not None:
+            return len(self.groups.get(group, dict()))
+
+        return sum(len(figs) for figs in self.groups.values())
+
+
+FIGURES = FigureManager()
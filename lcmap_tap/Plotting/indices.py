@@ -0,0 +1,305 @@
+"""Spectral index calculations shared by the time series plots and the chip viewer.  Each band is scaled to reflectance
+once, every requested index is calculated from those scaled bands into preallocated buffers, and the results can be
+kept per pixel or chip so they are only ever calculated once."""
+
+import numpy as np
+from collections import OrderedDict, namedtuple
+from typing import Hashable, Iterable, Mapping
+
+# Surface reflectance scaling factor
+SCALE = 0.0001
+
+# The ARD keys of the bands used by an index, and their positions in the PyCCD band order
+IndexDef = namedtuple("IndexDef", ["bands", "inds"])
+
+INDICES = OrderedDict([('ndvi', IndexDef(bands=('reds', 'nirs'), inds=(2, 3))),
+                       ('msavi', IndexDef(bands=('reds', 'nirs'), inds=(2, 3))),
+                       ('evi', IndexDef(bands=('blues', 'reds', 'nirs'), inds=(0, 2, 3))),
+                       ('savi', IndexDef(bands=('reds', 'nirs'), inds=(2, 3))),
+                       ('ndmi', IndexDef(bands=('nirs', 'swir1s'), inds=(3, 4))),
+                       ('nbr', IndexDef(bands=('nirs', 'swir2s'), inds=(3, 5))),
+                       ('nbr2', IndexDef(bands=('swir1s', 'swir2s'), inds=(4, 5)))])
+
+# Names used for the indices in the GUI
+NAMES = {'NDVI': 'ndvi',
+         'MSAVI': 'msavi',
+         'EVI': 'evi',
+         'SAVI': 'savi',
+         'NDMI': 'ndmi',
+         'NBR': 'nbr',
+         'NBR-1': 'nbr',
+         'NBR-2': 'nbr2'}
+
+
+def index_key(name: str) -> str:
+    """
+    Get the index key for either a GUI index name (e.g. 'NBR-2') or an index key (e.g. 'nbr2')
+
+    Args:
+        name: The index name
+
+    Returns:
+        The index key
+
+    """
+    return NAMES.get(name, name)
+
+
+def scale(band: np.ndarray, dtype=np.float64, out: np.ndarray=None) -> np.ndarray:
+    """
+    Scale a surface reflectance band, replacing any negative reflectance with 0
+
+    Args:
+        band: The input band values
+        dtype: The output data type
+        out: Optional array to write the result to
+
+    Returns:
+        The scaled reflectance
+
+    """
+    out = np.multiply(band, SCALE, out=out, dtype=dtype)
+
+    return np.maximum(out, 0, out=out)
+
+
+def _divide(num: np.ndarray, den: np.ndarray) -> np.ndarray:
+    """
+    Divide num by den in place, with 0 wherever den is 0
+    """
+    zero = den == 0
+
+    np.divide(num, den, out=num, where=~zero)
+
+    num[zero] = 0
+
+    return num
+
+
+def _normdiff(a: np.ndarray, b: np.ndarray, out: np.ndarray, tmp: np.ndarray) -> np.ndarray:
+    """
+    (a - b) / (a + b)
+    """
+    np.subtract(a, b, out=out)
+
+    np.add(a, b, out=tmp)
+
+    return _divide(out, tmp)
+
+
+def ndvi(R, NIR, out, tmp):
+    """
+    Normalized Difference Vegetation Index
+    (NIR - R) / (NIR + R)
+    """
+    return _normdiff(NIR, R, out, tmp)
+
+
+def msavi(R, NIR, out, tmp):
+    """
+    Modified Soil Adjusted Vegetation Index
+    (2.0 * NIR + 1.0 - ((2.0 * NIR + 1.0) ** 2.0 - 8.0 * (NIR - R)) ** 0.5) / 2.0
+    """
+    np.multiply(NIR, 2.0, out=tmp)
+    tmp += 1.0
+    np.square(tmp, out=tmp)
+
+    np.subtract(NIR, R, out=out)
+    out *= 8.0
+    tmp -= out
+
+    # No square root of negative numbers
+    invalid = ~(tmp >= 0.0)
+
+    np.sqrt(tmp, out=tmp, where=~invalid)
+
+    np.multiply(NIR, 2.0, out=out)
+    out += 1.0
+    out -= tmp
+    out /= 2.0
+
+    out[invalid] = 0
+
+    return out
+
+
+def evi(B, R, NIR, out, tmp, G=2.5, L=1.0, C1=6.0, C2=7.5):
+    """
+    Enhanced Vegetation Index
+    G * ((NIR - R) / (NIR + C1 * R - C2 * B + L))
+    """
+    np.multiply(R, C1, out=tmp)
+    tmp += NIR
+
+    np.multiply(B, C2, out=out)
+    tmp -= out
+    tmp += L
+
+    np.subtract(NIR, R, out=out)
+
+    _divide(out, tmp)
+
+    out *= G
+
+    return out
+
+
+def savi(R, NIR, out, tmp, L=0.5):
+    """
+    Soil Adjusted Vegetation Index
+    ((NIR - R) / (NIR + R + L)) * (1 + L)
+    """
+    np.subtract(NIR, R, out=out)
+
+    np.add(NIR, R, out=tmp)
+    tmp += L
+
+    _divide(out, tmp)
+
+    out *= 1 + L
+
+    return out
+
+
+def ndmi(NIR, SWIR1, out, tmp):
+    """
+    Normalized Difference Moisture Index
+    (NIR - SWIR1) / (NIR + SWIR1)
+    """
+    return _normdiff(NIR, SWIR1, out, tmp)
+
+
+def nbr(NIR, SWIR2, out, tmp):
+    """
+    Normalized Burn Ratio
+    (NIR - SWIR2) / (NIR + SWIR2)
+    """
+    return _normdiff(NIR, SWIR2, out, tmp)
+
+
+def nbr2(SWIR1, SWIR2, out, tmp):
+    """
+    Normalized Burn Ratio 2
+    (SWIR1 - SWIR2) / (SWIR1 + SWIR2)
+    """
+    return _normdiff(SWIR1, SWIR2, out, tmp)
+
+
+_functions = {'ndvi': ndvi,
+              'msavi': msavi,
+              'evi': evi,
+              'savi': savi,
+              'ndmi': ndmi,
+              'nbr': nbr,
+              'nbr2': nbr2}
+
+
+class IndexEngine:
+    """
+    Calculate spectral indices, keeping the scaled bands and the results for each source of band values.
+
+    A source is identified by a key chosen by the caller, such as a chip coordinate.  Calculating with key=None
+    keeps nothing.
+    """
+
+    def __init__(self, dtype=np.float64, maxsize: int=32):
+        """
+        Args:
+            dtype: Data type of the scaled bands and the results, e.g. np.float32 for display only
+            maxsize: The most sources to keep results for, the least recently used are dropped first
+
+        """
+        self.dtype = dtype
+
+        self.maxsize = maxsize
+
+        # <OrderedDict> key: {'scaled': {band: array}, 'indices': {index key: array}}, least recently used first
+        self._memo = OrderedDict()
+
+    def _entry(self, key: Hashable) -> dict:
+        if key is None:
+            return {'scaled': dict(), 'indices': dict()}
+
+        entry = self._memo.pop(key, None)
+
+        if entry is None:
+            entry = {'scaled': dict(), 'indices': dict()}
+
+        self._memo[key] = entry
+
+        while len(self._memo) > self.maxsize:
+            self._memo.popitem(last=False)
+
+        return entry
+
+    def compute(self, bands: Mapping, names: Iterable[str], key: Hashable=None) -> OrderedDict:
+        """
+        Calculate a set of indices.  Only the bands the indices need are read from bands, and each is scaled once.
+
+        Args:
+            bands: ARD key: band values, e.g. ARDData.pixel_ard
+            names: Index keys (e.g. 'nbr2') or GUI names (e.g. 'NBR-2')
+            key: Identifies the source of the band values, to reuse earlier results
+
+        Returns:
+            name: index values, for each of the requested names
+
+        """
+        entry = self._entry(key)
+
+        out = OrderedDict()
+
+        tmp = None
+
+        for name in names:
+            k = index_key(name)
+
+            if k not in entry['indices']:
+                for band in INDICES[k].bands:
+                    if band not in entry['scaled']:
+                        entry['scaled'][band] = scale(bands[band], self.dtype)
+
+                args = [entry['scaled'][band] for band in INDICES[k].bands]
+
+                # The scratch buffer is shared by every index calculated in this call
+                if tmp is None or tmp.shape != args[0].shape:
+                    tmp = np.empty(args[0].shape, dtype=self.dtype)
+
+                entry['indices'][k] = _functions[k](*args, out=np.empty_like(tmp), tmp=tmp)
+
+            out[name] = entry['indices'][k]
+
+        return out
+
+    def clear(self, key: Hashable=None) -> None:
+        """
+        Drop the kept results for one source, or for all of them
+
+        Args:
+            key: The source to drop, or None for all
+
+        Returns:
+            None
+
+        """
+        if key is None:
+            self._memo.clear()
+
+        else:
+            self._memo.pop(key, None)
+
+
+def calculate(bands: Mapping, names: Iterable[str], dtype=np.float64) -> OrderedDict:
+    """
+    Calculate a set of indices without keeping any results
+
+    Args:
+        bands: ARD key: band values
+        names: Index keys or GUI names
+        dtype: Data type of the results
+
+    Returns:
+        name: index values, for each of the requested names
+
+    """
+    return IndexEngine(dtype).compute(bands, names)
@@ -1,7 +1,8 @@
 """Create a matplotlib figure"""
 
 from lcmap_tap.Plotting.plot_specs import PlotSpecs
-from lcmap_tap.Plotting import plot_functions, NAMES, COLORS
+from lcmap_tap.Plotting import plot_functions, NAMES, COLORS, LOOKUP
+from lcmap_tap.Plotting.figures import FIGURES
 from lcmap_tap.logger import log, exc_handler
 
 import sys
@@ -14,6 +15,8 @@ from numpy import ndarray
 import matplotlib
 from matplotlib import pyplot as plt
 import matplotlib.lines as mlines
+from matplotlib.collections import PathCollection
+from matplotlib.markers import MarkerStyle
 from matplotlib.figure import Figure
 
 sys.excepthook = exc_handler
@@ -158,8 +161,9 @@ def draw_figure(data: PlotSpecs, items: list, fig_num: int, config: dict) -> \
     squeeze=False allows for plt.subplots to have a single subplot, must specify the column index as well
     when referencing a subplot because will always return a 2D array
     e.g. axes[num, 0] for subplot 'num'"""
-    fig, axes = plt.subplots(nrows=len(plot_data), ncols=1, figsize=(18, len(plot_data) * 5),
-                             dpi=65, squeeze=False, sharex='all', sharey='none', num=f'timeseries_figure_{fig_num}')
+    fig, axes = FIGURES.subplots(f'timeseries_figure_{fig_num}', group='timeseries',
+                                 nrows=len(plot_data), ncols=1, figsize=(18, len(plot_data) * 5),
+                                 dpi=65, squeeze=False, sharex='all', sharey='none')
 
     """
     Define list objects that will contain the matplotlib artist objects within all subplots
@@ -265,12 +269,12 @@ def draw_figure(data: PlotSpecs, items: list, fig_num: int, config: dict) -> \
         for ind, s in enumerate(data.start_dates):
             lines1 = axes[num, 0].axvline(s, **m_config['start_lines'])
 
-            end_lines.append(lines1)
+            start_lines.append(lines1)
 
         for ind, e in enumerate(data.end_dates):
             lines3 = axes[num, 0].axvline(e, **m_config['end_lines'])
 
-            start_lines.append(lines3)
+            end_lines.append(lines3)
 
         for ind, br in enumerate(data.break_dates):
             lines2 = axes[num, 0].axvline(br, **m_config['break_lines'])
@@ -283,12 +287,13 @@ def draw_figure(data: PlotSpecs, items: list, fig_num: int, config: dict) -> \
         """
         if data.results is not None:
             for c in range(0, len(data.results["change_models"])):
-                lines5, = axes[num, 0].plot(data.prediction_dates[c * len(data.bands)],
-                                            plot_data[b][1][c],
-                                            **m_config['model_lines'])
+                # The curve itself is filled in once the axes have their final size
+                lines5, = axes[num, 0].plot([], [], **m_config['model_lines'])
 
                 model_lines.append(lines5)
 
+                artist_map[lines5] = [None, None, b, c]
+
         """
         Draw horizontal color bars representing class assignments
         
@@ -452,4 +457,117 @@ def draw_figure(data: PlotSpecs, items: list, fig_num: int, config: dict) -> \
     # Make room for the legend
     fig.subplots_adjust(right=0.9)
 
+    regenerate_curves(data, artist_map, axes[0, 0])
+
     return fig, artist_map, lines_map, axes
+
+
+def regenerate_curves(data: PlotSpecs, artist_map: dict, ax: matplotlib.axes.Axes, samples: float=2.0) -> None:
+    """
+    Recompute the model curves for the current x-axis view, using a number of points based on the axes' width in
+    pixels rather than one per day.
+
+    Args:
+        data: The PlotSpecs instance the figure was drawn from
+        artist_map: The artist map returned by draw_figure
+        ax: The axes to take the view and size from, the subplots share their x-axis
+        samples: Curve points per pixel across the full view
+
+    Returns:
+        None
+
+    """
+    xlim = ax.get_xlim()
+    npoints = max(int(ax.bbox.width * samples), 2)
+
+    for artist, info in artist_map.items():
+        if not isinstance(artist, mlines.Line2D) or len(info) != 4:
+            continue
+
+        info[0], info[1] = data.model_curve(info[2], info[3], xlim, npoints)
+
+        artist.set_data(info[0], info[1])
+
+
+def follow_view(data: PlotSpecs, artist_map: dict, axes: ndarray) -> None:
+    """
+    Keep the model curves sampled for the x-axis view, whatever changes it: the scroll wheel, the toolbar's pan, zoom
+    and home, or set_xlim.  The subplots share their x-axis, but only the axes whose limits were set sends the
+    'xlim_changed' callback, and its siblings are updated after it, so each axes is connected and the curves are
+    taken from the one that changed.
+
+    Args:
+        data: The PlotSpecs instance the figure was drawn from
+        artist_map: The artist map returned by draw_figure
+        axes: The axes returned by draw_figure
+
+    Returns:
+        None
+
+    """
+    for ax in axes.flatten():
+        ax.callbacks.connect('xlim_changed', lambda changed: regenerate_curves(data, artist_map, changed))
+
+
+def set_symbology(artist: matplotlib.artist.Artist, params: dict) -> None:
+    """
+    Update an existing plot artist with the plot config parameters it was originally drawn with
+
+    Args:
+        artist: A PathCollection from Axes.scatter or a Line2D from Axes.plot/Axes.axvline
+        params: The plot config parameters for the artist
+
+    Returns:
+        None
+
+    """
+    params = {k: v for k, v in params.items() if k not in ('label', 'picker')}
+
+    if isinstance(artist, PathCollection):
+        if 'color' in params:
+            artist.set_facecolor(params['color'])
+
+            artist.set_edgecolor(params.get('edgecolors', 'face'))
+
+        if 's' in params:
+            artist.set_sizes([params['s']])
+
+        if 'marker' in params:
+            marker = MarkerStyle(params['marker'])
+
+            artist.set_paths([marker.get_path().transformed(marker.get_transform())])
+
+    elif isinstance(artist, mlines.Line2D):
+        artist.update(params)
+
+
+def apply_config(fig: matplotlib.figure.Figure, lines_map: dict, config: dict) -> None:
+    """
+    Apply the plot config to the artists of a figure made by draw_figure, rather than drawing a new figure.  The
+    canvas still needs to be redrawn afterwards.
+
+    Args:
+        fig: The figure returned by draw_figure
+        lines_map: The lines map returned by draw_figure
+        config: Plot symbology settings
+
+    Returns:
+        None
+
+    """
+    leg = fig.axes[0].get_legend()
+
+    for legline, text in zip(leg.get_lines(), leg.get_texts()):
+        # The land cover class bars aren't configurable
+        if text.get_text() not in LOOKUP or legline not in lines_map:
+            continue
+
+        key = LOOKUP[text.get_text()]
+
+        for artist in lines_map[legline]:
+            set_symbology(artist, config['DEFAULTS'][key])
+
+        set_symbology(legline, config['LEG_DEFAULTS'][key])
+
+    for ax in fig.axes:
+        ax.patch.set_facecolor(config['DEFAULTS']['background']['color'])
@@ -1,7 +1,7 @@
 """Prepare data for plotting"""
 
 from lcmap_tap.logger import exc_handler, log
-from lcmap_tap.Plotting import plot_functions
+from lcmap_tap.Plotting.indices import INDICES, IndexEngine, calculate
 from lcmap_tap.RetrieveData.retrieve_ccd import CCDReader
 from lcmap_tap.RetrieveData.retrieve_classes import SegmentClasses
 
@@ -9,18 +9,91 @@ import sys
 import numpy as np
 import datetime as dt
 from collections import OrderedDict
-from typing import Union
+from collections.abc import Mapping, Sequence
+from typing import Tuple
 
 sys.excepthook = exc_handler
 
-index_functions = {'ndvi': {'func': plot_functions.ndvi, 'bands': ('reds', 'nirs'), 'inds': (2, 3)},
-                   'msavi': {'func': plot_functions.msavi, 'bands': ('reds', 'nirs'), 'inds': (2, 3)},
-                   'evi': {'func': plot_functions.evi, 'bands': ('blues', 'reds', 'nirs'), 'inds': (0, 2, 3)},
-                   'savi': {'func': plot_functions.savi, 'bands': ('reds', 'nirs'), 'inds': (2, 3)},
-                   'ndmi': {'func': plot_functions.ndmi, 'bands': ('nirs', 'swir1s'), 'inds': (3, 4)},
-                   'nbr': {'func': plot_functions.nbr, 'bands': ('nirs', 'swir2s'), 'inds': (3, 5)},
-                   'nbr2': {'func': plot_functions.nbr2, 'bands': ('swir1s', 'swir2s'), 'inds': (4, 5)}
-                   }
+class LazyLookup(Mapping):
+    """
+    Read-only ordered mapping whose values are built the first time they are looked up, then kept.  Checking for a
+    key or listing the keys doesn't build anything.
+
+    """
+    def __init__(self, factories: OrderedDict):
+        """
+
+        Args:
+            factories: Ordered mapping of key to a function with no arguments that builds the value
+
+        """
+        self._factories = OrderedDict(factories)
+
+        self._values = dict()
+
+    def __getitem__(self, key):
+        if key not in self._values:
+            self._values[key] = self._factories[key]()
+
+        return self._values[key]
+
+    def __contains__(self, key):
+        return key in self._factories
+
+    def __iter__(self):
+        return iter(self._factories)
+
+    def __len__(self):
+        return len(self._factories)
+
+    @classmethod
+    def merge(cls, *lookups):
+        """
+        Combine lookups into a new lookup that shares their values, so nothing gets built twice
+
+        Args:
+            *lookups: The lookups to combine, later keys win
+
+        Returns:
+            LazyLookup
+
+        """
+        factories = OrderedDict()
+
+        for lookup in lookups:
+            for key in lookup:
+                factories[key] = (lambda lk, k: lambda: lk[k])(lookup, key)
+
+        return cls(factories)
+
+
+class LazySeries(Sequence):
+    """
+    The (observed values, model curves) pair for a plot item, with each half built the first time it is indexed.
+    Drawing a figure only reads the observations, the model lines get their values from PlotSpecs.model_curve, so
+    the daily model curves are never built unless something asks for them.
+
+    """
+    def __init__(self, observed, modeled):
+        """
+
+        Args:
+            observed: Function with no arguments that builds the observed values
+            modeled: Function with no arguments that builds the model curves, one array per change model
+
+        """
+        self._factories = (observed, modeled)
+
+        self._values = [None, None]
+
+    def __getitem__(self, i):
+        if self._values[i] is None:
+            self._values[i] = self._factories[i]()
+
+        return self._values[i]
+
+    def __len__(self):
+        return 2
 
 
 class PlotSpecs:
@@ -30,6 +103,24 @@ class PlotSpecs:
     """
     bands = ('blue', 'green', 'red', 'nir', 'swir1', 'swir2', 'thermal')
 
+    # Plot item name: (ARD key, band number)
+    band_items = OrderedDict([("Blue", ('blues', 0)),
+                              ("Green", ('greens', 1)),
+                              ("Red", ('reds', 2)),
+                              ("NIR", ('nirs', 3)),
+                              ("SWIR-1", ('swir1s', 4)),
+                              ("SWIR-2", ('swir2s', 5)),
+                              ("Thermal", ('thermals', 6))])
+
+    # Plot item name: (ARD key, modeled key)
+    index_items = OrderedDict([('NDVI', ('ndvi', 'ndvi-modeled')),
+                               ('MSAVI', ('msavi', 'msavi-modeled')),
+                               ('EVI', ('evi', 'evi-modeled')),
+                               ('SAVI', ('savi', 'savi-modeled')),
+                               ('NDMI', ('ndmi', 'ndmi-modeled')),
+                               ('NBR', ('nbr', 'nbr-modeled')),
+                               ('NBR-2', ('nbr2', 'nbr2-modeled'))])
+
     def __init__(self, ard: dict, change: CCDReader, segs: SegmentClasses, items: list,
                  begin: dt.date = dt.date(year=1982, month=1, day=1),
                  end: dt.date = dt.date(year=2017, month=12, day=31)):
@@ -92,111 +183,201 @@ class PlotSpecs:
         # # self.total_mask = np.logical_and(self.ccd_mask, self.fill_in)
         # self.total_mask = np.logical_and(self.qa_mask[date_mask], self.fill_in)
 
-        # Check for presence of thermals, rescale if present
-        if 'thermals' in self.ard.keys():
-            self.rescale_thermal()
-
-        self.index_to_observations()
+        # The thermal rescaling, observed indices, and model curves are only built when a series is first looked
+        # up, so plotting a single band or index doesn't pay for everything else
+        self._thermal_rescaled = False
 
         if self.results is not None:
-            self.predicted_values, \
-            self.prediction_dates, \
-            self.break_dates, \
-            self.start_dates, \
-            self.end_dates = self.get_modelled_specs(self.results)
+            models = self.results['change_models']
 
         else:
-            self.predicted_values = []
-            self.prediction_dates = []
-            self.break_dates = []
-            self.start_dates = []
-            self.end_dates = []
+            models = []
+
+        self.break_dates = [m['break_day'] for m in models]
+        self.start_dates = [m['start_day'] for m in models]
+        self.end_dates = [m['end_day'] for m in models]
+
+        self.prediction_dates = [np.arange(m['start_day'], m['end_day'] + 1) for m in models]
+
+        self._coefs = [np.array([[m[b]['intercept']] + list(m[b]['coefficients']) for b in self.bands],
+                                dtype=np.float64)
+                       for m in models]
+
+        self._basis = dict()
+        self._band_predicts = dict()
+        self._predicted_values = None
+
+        # Keeps the scaled bands for the observations and for each model's curves, shared by all of the indices
+        self._indices = IndexEngine()
+
+        self.index_lookup, self.band_lookup, self.all_lookup = self.get_lookups(results=self.results)
+
+    @property
+    def predicted_values(self) -> list:
+        """
+        The model curves for all bands of every change model, a (bands, days) array per model, so
+        predicted_values[m][n] is band n of model m.  Built on first access.
+
+        """
+        if self._predicted_values is None:
+            self._predicted_values = [np.vstack([self.band_predicts(n)[m] for n in range(len(self.bands))])
+                                      for m in range(len(self.prediction_dates))]
+
+        return self._predicted_values
+
+    def model_basis(self, m: int) -> np.ndarray:
+        """
+        The harmonic design matrix for a change model, built once and shared between all of its bands
+
+        Args:
+            m: Change model number
+
+        Returns:
+            Array with shape (8, days)
+
+        """
+        if m not in self._basis:
+            self._basis[m] = self.harmonic_basis(self.prediction_dates[m])
+
+        return self._basis[m]
+
+    def band_predicts(self, n: int) -> list:
+        """
+        The model curves for a single band, one array per change model.  Built on first access.
+
+        Args:
+            n: Band number, the position in PlotSpecs.bands
+
+        Returns:
+            List of arrays
+
+        """
+        if n not in self._band_predicts:
+            self._band_predicts[n] = [self._coefs[m][n] @ self.model_basis(m) for m in range(len(self._coefs))]
+
+        return self._band_predicts[n]
+
+    def model_curve(self, item: str, m: int, xlim: tuple, npoints: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Evaluate a change model's curve for display, only over the visible part of the x-axis and at a resolution
+        tied to the plot width rather than every day of the model
+
+        Args:
+            item: The plot item name, e.g. 'Red' or 'NDVI'
+            m: Change model number
+            xlim: The visible x-axis range, (left, right) in ordinal days
+            npoints: How many samples to use across the full visible range
+
+        Returns:
+            days, values
+
+        """
+        left = max(self.start_dates[m], xlim[0])
+        right = min(self.end_dates[m], xlim[1])
+
+        if right < left:
+            return np.empty(0), np.empty(0)
+
+        # Share the samples out by how much of the view the model covers, never finer than daily
+        num = int(np.ceil(npoints * (right - left) / max(xlim[1] - xlim[0], 1))) + 1
+
+        days = np.linspace(left, right, max(min(num, int(right - left) + 1), 2))
 
-        self.index_lookup, self.band_lookup, self.all_lookup = self.get_lookups(results=self.results,
-                                                                                predicted_values=self.predicted_values)
+        basis = self.harmonic_basis(days)
 
-    def get_modelled_specs(self, results):
-        band_info = {b: {'coefs': [], 'inter': [], 'pred': []} for b in self.bands}
+        if item in self.band_items:
+            return days, self._coefs[m][self.band_items[item][1]] @ basis
 
-        predicted_values = []
-        prediction_dates = []
-        break_dates = []
-        start_dates = []
-        end_dates = []
+        key = self.index_items[item][0]
 
-        for num, result in enumerate(results['change_models']):
-            days = np.arange(result['start_day'], result['end_day'] + 1)
+        bands = {band: self._coefs[m][ind] @ basis for band, ind in zip(*INDICES[key])}
 
-            break_dates.append(result['break_day'])
+        return days, calculate(bands, [key])[key]
 
-            start_dates.append(result['start_day'])
+    def observed(self, key: str) -> np.ndarray:
+        """
+        The observed values for a band or index, deriving or rescaling them the first time they are needed
 
-            end_dates.append(result['end_day'])
+        Args:
+            key: The ARD key, e.g. 'reds' or 'ndvi'
 
-            for b in self.bands:
-                band_info[b]['inter'] = result[b]['intercept']
+        Returns:
+            Array of observed values
+
+        """
+        if key == 'thermals' and not self._thermal_rescaled:
+            self.rescale_thermal()
 
-                band_info[b]['coefs'] = result[b]['coefficients']
+            self._thermal_rescaled = True
 
-                band_info[b]['pred'] = self.predicts(days, result[b]['coefficients'], result[b]['intercept'])
+        elif key in INDICES and key not in self.ard:
+            self.ard[key] = self._indices.compute(self.ard, [key], key='observed')[key]
 
-                prediction_dates.append(days)
+        return self.ard[key]
 
-                predicted_values.append(band_info[b]['pred'])
+    def modeled_index(self, key: str) -> list:
+        """
+        The model curves for an index, one array per change model
 
-        return predicted_values, prediction_dates, break_dates, start_dates, end_dates
+        Args:
+            key: The index key, e.g. 'ndvi'
 
-    def get_lookups(self, results, predicted_values):
-        # Calculate indices from observed values
+        Returns:
+            List of arrays
 
-        # Calculate indices from the results' change models
-        # The change models are stored by order of model, then
-        # band number.  For example, the band values for the first change model are represented by indices 0-5,
-        # the second model by indices 6-11, and so on.
-        index_modeled = self.get_modeled_index(ard=self.ard, results=results, predicted_values=predicted_values)
+        """
+        curves = [self.band_predicts(ind) for ind in INDICES[key].inds]
 
-        index_lookup = OrderedDict([('NDVI', ('ndvi', 'ndvi-modeled')),
-                                    ('MSAVI', ('msavi', 'msavi-modeled')),
-                                    ('EVI', ('evi', 'evi-modeled')),
-                                    ('SAVI', ('savi', 'savi-modeled')),
-                                    ('NDMI', ('ndmi', 'ndmi-modeled')),
-                                    ('NBR', ('nbr', 'nbr-modeled')),
-                                    ('NBR-2', ('nbr2', 'nbr2-modeled'))])
+        return [self._indices.compute(dict(zip(INDICES[key].bands, args)), [key], key=('modeled', m))[key]
+                for m, args in enumerate(zip(*curves))]
 
-        index_lookup = [(key, (self.ard[index_lookup[key][0]],
-                               index_modeled[index_lookup[key][1]]))
+    def get_lookups(self, results):
+        """
+        Build the lookups of plot item to (observed values, model curves).  The lookups are LazyLookups of
+        LazySeries, so observations are only calculated when an item is first looked up, and model curves only when
+        they are indexed.
+
+        Args:
+            results: PyCCD results
+
+        Returns:
+            index_lookup, band_lookup, all_lookup
+
+        """
+        indices = ['NDVI', 'MSAVI', 'EVI', 'SAVI', 'NDMI', 'NBR', 'NBR-2']
+
+        selected_indices = [i.lower().replace('-', '') for i in indices
+                            if i in self.items or 'All Indices' in self.items]
+
+        index_lookup = self.index_items
+
+        index_lookup = [(key, (lambda k: lambda: LazySeries(lambda: self.observed(k),
+                                                            lambda: self.modeled_index(k)))(index_lookup[key][0]))
                         for key in index_lookup.keys()
-                        if index_lookup[key][0] in self.ard.keys()]
+                        if index_lookup[key][0] in self.ard.keys() or index_lookup[key][0] in selected_indices]
 
-        index_lookup = OrderedDict(index_lookup)
+        index_lookup = LazyLookup(OrderedDict(index_lookup))
 
-        lookup = OrderedDict([("Blue", ('blues', 0)),
-                              ("Green", ('greens', 1)),
-                              ("Red", ('reds', 2)),
-                              ("NIR", ('nirs', 3)),
-                              ("SWIR-1", ('swir1s', 4)),
-                              ("SWIR-2", ('swir2s', 5)),
-                              ("Thermal", ('thermals', 6))])
+        lookup = self.band_items
 
-        band_lookup = [(key, (self.ard[lookup[key][0]],
-                              self.get_predicts(num=lookup[key][1], bands=self.bands,
-                                                predicted_values=predicted_values, results=results)))
+        band_lookup = [(key, (lambda k, n: lambda: LazySeries(lambda: self.observed(k),
+                                                              lambda: self.band_predicts(n)))(*lookup[key]))
                        for key in lookup.keys()
                        if lookup[key][0] in self.ard.keys()]
 
-        # Example of how the band_lookup is structured:
-        # self.band_lookup = [("Blue", (self.ard['blues'], self.get_predicts(0))),
-        #                     ("Green", (self.ard['greens'], self.get_predicts(1))),
-        #                     ("Red", (self.ard['reds'], self.get_predicts(2))),
-        #                     ("NIR", (self.ard['nirs'], self.get_predicts(3))),
-        #                     ("SWIR-1", (self.ard['swir1s'], self.get_predicts(4))),
-        #                     ("SWIR-2", (self.ard['swir2s'], self.get_predicts(5))),
-        #                     ("Thermal", (self.ard['thermals'], self.get_predicts(6)))]
+        # Example of how the band_lookup is structured once the values are built:
+        # self.band_lookup = [("Blue", (self.ard['blues'], self.band_predicts(0))),
+        #                     ("Green", (self.ard['greens'], self.band_predicts(1))),
+        #                     ("Red", (self.ard['reds'], self.band_predicts(2))),
+        #                     ("NIR", (self.ard['nirs'], self.band_predicts(3))),
+        #                     ("SWIR-1", (self.ard['swir1s'], self.band_predicts(4))),
+        #                     ("SWIR-2", (self.ard['swir2s'], self.band_predicts(5))),
+        #                     ("Thermal", (self.ard['thermals'], self.band_predicts(6)))]
 
-        band_lookup = OrderedDict(band_lookup)
+        band_lookup = LazyLookup(OrderedDict(band_lookup))
 
-        # Combine these two dictionaries
-        all_lookup = plot_functions.merge_dicts(band_lookup, index_lookup)
+        # Combine these two lookups
+        all_lookup = LazyLookup.merge(band_lookup, index_lookup)
 
         return index_lookup, band_lookup, all_lookup
 
@@ -217,49 +398,30 @@ class PlotSpecs:
         return np.logical_and(dates >= start.toordinal(), dates < stop.toordinal())
 
     @staticmethod
-    def predicts(days, coef, intercept):
-        """
-        Calculate change segment curves
-
-        Args:
-            days:
-            coef:
-            intercept:
-
-        Returns:
-
-        """
-        return (intercept + coef[0] * days +
-                coef[1] * np.cos(days * 1 * 2 * np.pi / 365.25) + coef[2] * np.sin(days * 1 * 2 * np.pi / 365.25) +
-                coef[3] * np.cos(days * 2 * 2 * np.pi / 365.25) + coef[4] * np.sin(days * 2 * 2 * np.pi / 365.25) +
-                coef[5] * np.cos(days * 3 * 2 * np.pi / 365.25) + coef[6] * np.sin(days * 3 * 2 * np.pi / 365.25))
-
-    @staticmethod
-    def get_predicts(num: Union[int, list], bands: tuple, predicted_values: list, results: dict) -> list:
+    def harmonic_basis(days: np.ndarray) -> np.ndarray:
         """
-        Return the model prediction values in the time series for a particular band or bands
+        Build the design matrix for the PyCCD harmonic model: a constant, the slope, and the annual,
+        semi-annual and tri-annual cosine/sine pairs
 
         Args:
-            num:
+            days: Ordinal days to evaluate the model on
 
         Returns:
-            A list of segment models
+            Array with shape (8, len(days))
 
         """
-        # Check for type int, create list if true
-        if isinstance(num, int):
-            num = [num]
+        basis = np.empty((8, len(days)), dtype=np.float64)
 
-        try:
-            _predicts = [predicted_values[m * len(bands) + n] for n in num
-                         for m in range(len(results["change_models"]))]
+        w = days * (2 * np.pi / 365.25)
 
-        except (IndexError, TypeError) as e:
-            log.error('Exception: %s' % e, exc_info=True)
+        basis[0] = 1
+        basis[1] = days
 
-            _predicts = []
+        for h in range(1, 4):
+            np.cos(h * w, out=basis[2 * h])
+            np.sin(h * w, out=basis[2 * h + 1])
 
-        return _predicts
+        return basis
 
     @staticmethod
     def make_arrays(in_dict: dict) -> dict:
@@ -289,61 +451,3 @@ class PlotSpecs:
         self.ard['thermals'] = np.copy(temp_thermal)
 
         return None
-
-    def index_to_observations(self):
-        """
-        Add index calculated observations to the timeseries pixel rod
-
-        Returns:
-
-        """
-        indices = ['NDVI', 'MSAVI', 'EVI', 'SAVI', 'NDMI', 'NBR', 'NBR-2']
-
-        selected_indices = [i for i in indices if i in self.items or 'All Indices' in self.items]
-
-        for i in selected_indices:
-            key = i.lower().replace('-', '')
-
-            call = index_functions[key]['func']
-
-            args = tuple([self.ard[band] for band in index_functions[key]['bands']])
-
-            self.ard[key] = call(*args)
-
-        return None
-
-    @staticmethod
-    def get_modeled_index(ard, results, predicted_values):
-        """
-        Calculate the model-predicted index curves
-
-        Returns:
-
-        """
-        bands = ('blue', 'green', 'red', 'nir', 'swir1', 'swir2', 'thermal')
-        indices = ('ndvi', 'msavi', 'evi', 'savi', 'ndmi', 'nbr', 'nbr2')
-
-        modeled = dict()
-
-        for key in ard.keys():
-            if key in indices:
-                new_key = f'{key}-modeled'
-
-                modeled[new_key] = list()
-
-                call = index_functions[key]['func']
-
-                inds = index_functions[key]['inds']
-
-                try:
-                    for m in range(len(results['change_models'])):
-                        args = tuple([predicted_values[m * len(bands) + ind] for ind in inds])
-
-                        modeled[new_key].append(call(*args))
-
-                except (AttributeError, TypeError) as e:
-                    log.error('Exception: %s' % e, exc_info=True)
-
-                    modeled[new_key].append([])
-
-        return modeled
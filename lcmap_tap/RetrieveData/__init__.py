@@ -1,4 +1,6 @@
 
+from lcmap_tap.Plotting.indices import INDICES
+
 from collections import namedtuple
 
 GeoExtent = namedtuple("GeoExtent", ["x_min", "y_max", "x_max", "y_min"])
@@ -89,13 +91,13 @@ item_lookup = {'All Spectral Bands and Indices': ['blues', 'greens', 'reds', 'ni
                'SWIR-1': ['swir1s', 'qas'],
                'SWIR-2': ['swir2s', 'qas'],
                'Thermal': ['thermals', 'qas'],
-               'NDVI': ['reds', 'nirs', 'qas'],
-               'MSAVI': ['reds', 'nirs', 'qas'],
-               'SAVI': ['reds', 'nirs', 'qas'],
-               'EVI': ['blues', 'reds', 'nirs', 'qas'],
-               'NDMI': ['nirs', 'swir1s', 'qas'],
-               'NBR': ['nirs', 'swir2s', 'qas'],
-               'NBR-2': ['swir1s', 'swir2s', 'qas']
+               'NDVI': list(INDICES['ndvi'].bands) + ['qas'],
+               'MSAVI': list(INDICES['msavi'].bands) + ['qas'],
+               'SAVI': list(INDICES['savi'].bands) + ['qas'],
+               'EVI': list(INDICES['evi'].bands) + ['qas'],
+               'NDMI': list(INDICES['ndmi'].bands) + ['qas'],
+               'NBR': list(INDICES['nbr'].bands) + ['qas'],
+               'NBR-2': list(INDICES['nbr2'].bands) + ['qas']
                }
 
 indices = ['ndvi', 'msavi', 'evi', 'savi', 'ndmi', 'nbr', 'nbr2']
@@ -2,36 +2,33 @@
 
 from lcmap_tap.logger import exc_handler, log
 from lcmap_tap.RetrieveData.retrieve_geo import GeoInfo
-from lcmap_tap.RetrieveData.retrieve_ard import ARDData
 from lcmap_tap.RetrieveData import GeoCoordinate
 from lcmap_tap.RetrieveData.merlin_cfg import make_cfg
 import lcmap_tap.Analysis.data_tools as tools
 from lcmap_tap.Visualization.rescale import Rescale
-from lcmap_tap.Plotting import plot_functions
+from lcmap_tap.Plotting.indices import NAMES, IndexEngine
 
 import sys
+import copy
 import numpy as np
 import datetime as dt
 from multiprocessing.dummy import Pool as ThreadPool
 import merlin
-from itertools import chain
 
 sys.excepthook = exc_handler
 
 
 class Chips:
-    index_functions = {'NDVI': {'func': plot_functions.ndvi, 'bands': ('reds', 'nirs'), 'inds': (2, 3)},
-                       'MSAVI': {'func': plot_functions.msavi, 'bands': ('reds', 'nirs'), 'inds': (2, 3)},
-                       'EVI': {'func': plot_functions.evi, 'bands': ('blues', 'reds', 'nirs'), 'inds': (0, 2, 3)},
-                       'SAVI': {'func': plot_functions.savi, 'bands': ('reds', 'nirs'), 'inds': (2, 3)},
-                       'NDMI': {'func': plot_functions.ndmi, 'bands': ('nirs', 'swir1s'), 'inds': (3, 4)},
-                       'NBR-1': {'func': plot_functions.nbr, 'bands': ('nirs', 'swir2s'), 'inds': (3, 5)},
-                       'NBR-2': {'func': plot_functions.nbr2, 'bands': ('swir1s', 'swir2s'), 'inds': (4, 5)}
-                       }
+    # Shared between instances, so going back to a date that was already viewed doesn't recalculate its indices.
+    # Indices are only displayed, so single precision is plenty.
+    indices = IndexEngine(dtype=np.float32, maxsize=81)
+
+    # Every band is retrieved, so any combination of channels can be displayed from the data already in memory
+    bands = ['blues', 'greens', 'reds', 'nirs', 'swir1s', 'swir2s', 'thermals', 'qas']
 
     def __init__(self, x, y, date, url,
                  r_channel, g_channel, b_channel,
-                 n=9, lower=0, upper=100, **params):
+                 radius=1, workers=4, lower=0, upper=100, ndays=0, window=None, fetch=True, cache=None, **params):
         """
 
         Args:
@@ -39,34 +36,45 @@ class Chips:
             y (coordinate_like): The point of reference y-coordinate
             date (dt.datetime): The target date
             url (str): The Chipmunk URL
-            n (int): Number of chips in mosaic, default is 9
             r_channel (Tuple[str, List[str]): UBID to use for the red color channel (default is 'reds')
             g_channel (Tuple[str, List[str]): UBID to use for the green color channel (default is 'greens')
             b_channel (Tuple[str, List[str]): UBID to use for the blue color channel (default is 'blues')
+            radius (int): Number of chips either side of the center chip, default of 1 gives a 3x3 mosaic
+            workers (int): The most chips to request at the same time
             lower (float): Lower percentage clipping threshold
             upper (float): Upper percentage clipping threshold
+            ndays (int): Number of days either side of the target date to retrieve, the acquisitions in this window
+                can be displayed with render() without another request
+            window (Tuple[str, str]): Start and stop dates to retrieve as 'YYYY-MM-DD', used instead of ndays
+            fetch (bool): Retrieve and render the chips before returning, otherwise call retrieve_data when ready
+            cache (dict): Chip data from Auxiliary.caching, chips found here with every band aren't requested
 
         """
-        self.pool = ThreadPool(n)
+        self.workers = workers
+
+        self.cache = cache if cache is not None else dict()
 
         self.r_channel = r_channel
         self.g_channel = g_channel
         self.b_channel = b_channel
 
+        self.lower = lower
+        self.upper = upper
+
         self.tile_geo = GeoInfo(str(x), str(y))
 
-        self.items = list(chain(*[self.r_channel[1], self.g_channel[1], self.b_channel[1], ['qas']]))
+        self.items = self.bands
 
         self.date = date
 
-        self.start, self.stop = self.get_acquired_dates(self.date, 0)
+        self.start, self.stop = window if window is not None else self.get_acquired_dates(self.date, ndays)
 
         self.cfg = make_cfg(self.items, url)
 
         # A list of upper left chip coordinates to identify which chips to request
-        self.coords_snap = tools.zoomout(*tools.align(x, y, url))
+        self.coords_snap = tools.zoomout(*tools.align(x, y, url), factor=radius)
 
-        self.coords = tools.zoomout(int(x), int(y))
+        self.coords = tools.zoomout(int(x), int(y), factor=radius)
 
         self.ul = GeoInfo.find_ul(self.coords)
 
@@ -77,22 +85,21 @@ class Chips:
                             'x_ul': c_ul[0],
                             'y_ul': c_ul[1],
                             'data': [],
+                            'cube': None,
+                            'dates': np.array([], dtype=int),
                             'ind': 0
                             } for c_ul, c in zip(self.coords_snap, self.coords)}
 
         self.params = self.get_params()
 
-        self.retrieve_data()
-
-        self.pool.close()
+        # The acquisition dates that can be displayed, taken from the chip containing the point of reference
+        self.dates = np.array([], dtype=int)
 
-        self.pool.join()
-
-        self.grid_timeseries_index()
-
-        self.assemble_chips()
+        # The clipping limits of each color channel used for the last mosaic
+        self.limits = None
 
-        self.check_indices()
+        # ubid: mosaic array, allocated once and filled in place on every render
+        self.mosaics = dict()
 
         # Note: This is the UL coord of the upper left chip in the mosaic
         self.mosaic_coord_ul = GeoInfo.find_ul(self.coords)
@@ -104,62 +111,267 @@ class Chips:
 
         self.chips_lr = GeoInfo.find_lr(self.coords_snap)
 
-        self.qa = self.mosaic(grid=self.grid, ubid='qas', ul=self.mosaic_coord_ul, lr=self.mosaic_coord_lr)
+        # The geo transform of the mosaic, whose upper left pixel is the upper left pixel of the upper left chip
+        self.image_affine = GeoInfo.get_affine(self.chips_ul.x, self.chips_ul.y)
 
-        self.rgb = np.dstack((self.rescale_array(self.mosaic(grid=self.grid, ubid=self.r_channel[0],
-                                                             ul=self.mosaic_coord_ul, lr=self.mosaic_coord_lr),
-                                                 self.qa, lower, upper),
+        self.rgb = np.zeros(shape=tools.findrowscols(self.mosaic_coord_ul, self.mosaic_coord_lr) + (3,),
+                            dtype=np.uint8)
 
-                              self.rescale_array(self.mosaic(grid=self.grid, ubid=self.g_channel[0],
-                                                             ul=self.mosaic_coord_ul, lr=self.mosaic_coord_lr),
-                                                 self.qa, lower, upper),
+        if fetch:
+            self.retrieve_data()
 
-                              self.rescale_array(self.mosaic(grid=self.grid, ubid=self.b_channel[0],
-                                                             ul=self.mosaic_coord_ul, lr=self.mosaic_coord_lr),
-                                                 self.qa, lower, upper))).astype(np.uint8)
+            self.render()
 
         self.pixel_rowcol = GeoInfo.geo_to_rowcol(self.affine, GeoCoordinate(x, y))
 
+    def render(self, date=None, r_channel=None, g_channel=None, b_channel=None, lower=None, upper=None,
+               keep_limits=False):
+        """
+        Make the RGB mosaic from the chips in memory, optionally changing the date, channels or clipping thresholds
+        first.  No data is requested, so the date should be within the retrieved window; the nearest acquisition to it
+        is displayed.
+
+        Args:
+            date (dt.datetime): The target date
+            r_channel (Tuple[str, List[str]): UBID to use for the red color channel
+            g_channel (Tuple[str, List[str]): UBID to use for the green color channel
+            b_channel (Tuple[str, List[str]): UBID to use for the blue color channel
+            lower (float): Lower percentage clipping threshold
+            upper (float): Upper percentage clipping threshold
+            keep_limits (bool): Clip with the limits of the last mosaic instead of calculating them again, so that
+                chips added since then are displayed with the same stretch
+
+        Returns:
+            np.ndarray: The RGB mosaic, also kept as self.rgb
+
+        """
+        if date is not None:
+            self.date = date
+
+        self.r_channel = r_channel or self.r_channel
+        self.g_channel = g_channel or self.g_channel
+        self.b_channel = b_channel or self.b_channel
+
+        self.lower = self.lower if lower is None else lower
+        self.upper = self.upper if upper is None else upper
+
+        if not any(len(item['dates']) for item in self.grid.values()):
+            return self.rgb
+
+        self.grid_timeseries_index()
+
+        self.assemble_chips()
+
+        self.check_indices()
+
+        self.qa = self.mosaic(grid=self.grid, ubid='qas', ul=self.mosaic_coord_ul, lr=self.mosaic_coord_lr,
+                              out=self.mosaics.get('qas'))
+
+        self.mosaics['qas'] = self.qa
+
+        limits = self.limits if keep_limits and self.limits else [None, None, None]
+
+        # A channel selected more than once is only placed once
+        for ubid in set(channel[0] for channel in (self.r_channel, self.g_channel, self.b_channel)):
+            self.mosaics[ubid] = self.mosaic(grid=self.grid, ubid=ubid, ul=self.mosaic_coord_ul,
+                                             lr=self.mosaic_coord_lr, out=self.mosaics.get(ubid))
+
+        # Every channel shares the qa, so the masks are only made once, and each channel is written straight into rgb
+        masks = Rescale.get_masks(self.qa)
+
+        self.limits = [Rescale(self.mosaics[channel[0]], self.qa, self.lower, self.upper, limits=lim, masks=masks,
+                               out=self.rgb[..., i]).limits
+                       for i, (channel, lim) in enumerate(zip((self.r_channel, self.g_channel, self.b_channel),
+                                                              limits))]
+
+        return self.rgb
+
+    def copy(self):
+        """
+        Make a copy that can be rendered on another thread without changing what this one displays.  The retrieved
+        chips are shared rather than copied, only what render writes to is new.
+
+        Returns:
+            Chips
+
+        """
+        other = copy.copy(self)
+
+        other.grid = {loc: dict(item) for loc, item in self.grid.items()}
+
+        other.mosaics = dict()
+
+        other.rgb = self.rgb.copy()
+
+        other.limits = list(self.limits) if self.limits is not None else None
+
+        # The index results kept for every instance aren't safe to share between threads
+        other.indices = IndexEngine(dtype=self.indices.dtype, maxsize=self.indices.maxsize)
+
+        return other
+
+    def qa_mosaic(self, date):
+        """
+        Make the qa mosaic for a date without changing what is displayed
+
+        Args:
+            date (dt.datetime): The target date
+
+        Returns:
+            np.ndarray
+
+        """
+        grid = dict()
+
+        for loc, item in self.grid.items():
+            if len(item['dates']):
+                qa = tools.assemble_cube(item['cube'], self.get_index(item['dates'], date), ['qas'],
+                                         dtype=np.int16)['qas']
+
+            else:
+                qa = np.ones(shape=(100, 100), dtype=np.int16)
+
+            grid[loc] = {'x': item['x'], 'y': item['y'], 'chip': {'qas': qa}}
+
+        return self.mosaic(grid=grid, ubid='qas', ul=self.mosaic_coord_ul, lr=self.mosaic_coord_lr)
+
+    @property
+    def acquired(self):
+        """
+        The acquisition date displayed for the chip containing the point of reference
+
+        Returns:
+            dt.datetime
+
+        """
+        center = self.grid[self.tile_geo.chip_coord_ul]
+
+        if not len(center['dates']):
+            return self.date
+
+        return dt.datetime.fromordinal(int(center['dates'][center['ind']]))
+
     def check_indices(self):
         """
         Check to see if an index was selected, if so, calculate it
 
         """
-        selected_items = [self.r_channel[0], self.g_channel[0], self.b_channel[0]]
+        selected_items = [i for i in (self.r_channel[0], self.g_channel[0], self.b_channel[0]) if i in NAMES]
 
-        indices = self.index_functions.keys()
+        if not selected_items:
+            return
 
-        for i in selected_items:
-            if i in indices:
-                call = self.index_functions[i]['func']
+        for loc, item in self.grid.items():
+            if not len(item['dates']):
+                self.grid[loc]['chip'].update({i: np.zeros(shape=(100, 100), dtype=self.indices.dtype)
+                                               for i in selected_items})
 
-                for loc, item in self.grid.items():
-                    args = tuple([self.grid[loc]['chip'][band] for band in self.index_functions[i]['bands']])
+                continue
 
-                    # Calculate the index and add it to the dictionary referenced by 'chip'
-                    self.grid[loc]['chip'][i] = call(*args)
+            # Calculate the indices and add them to the dictionary referenced by 'chip'
+            self.grid[loc]['chip'].update(self.indices.compute(self.grid[loc]['chip'], selected_items,
+                                                               key=(loc, int(item['dates'][item['ind']]))))
 
     def get_params(self):
         """
-        Get an iterable containing the parameters for each chip to request via merlin
+        Get an iterable containing the parameters for each chip to request via merlin, the chip containing the point
+        of reference first and then outward from it
 
         """
-        return [{'x': info['x'],
-                 'y': info['y'],
-                 'start': self.start,
-                 'stop': self.stop,
-                 'cfg': self.cfg,
-                 'id': key}
-                for key, info in self.grid.items()]
+        center = self.tile_geo.chip_coord_ul
+
+        return sorted([{'x': info['x'],
+                        'y': info['y'],
+                        'start': self.start,
+                        'stop': self.stop,
+                        'cfg': self.cfg,
+                        'id': key}
+                       for key, info in self.grid.items()],
+                      key=lambda p: (p['id'][0] - center[0]) ** 2 + (p['id'][1] - center[1]) ** 2)
+
+    def retrieve_data(self, callback=None):
+        """
+        Add all of the chips to the grid, taking them from the cache where possible and requesting the rest.  This
+        blocks until the last one is in.
+
+        Args:
+            callback (Callable): Called with the chip key as each chip arrives, on the calling thread
 
-    def retrieve_data(self):
         """
+        required = list()
+
+        for params in self.params:
+            data = self.from_cache(params['id'])
+
+            if data is None:
+                required.append(params)
+
+                continue
 
+            self.add_chip(params['id'], data)
+
+            if callback is not None:
+                callback(params['id'])
+
+        if not required:
+            return
+
+        log.info("Requesting %d of %d chips" % (len(required), len(self.params)))
+
+        pool = ThreadPool(min(self.workers, len(required)))
+
+        try:
+            for loc in pool.imap_unordered(self.merlin_call, required):
+                if callback is not None:
+                    callback(loc)
+
+        finally:
+            pool.close()
+
+            pool.join()
+
+    def from_cache(self, loc):
         """
-        self.pool.map(self.merlin_call, self.params)
+        Get a chip's time series for the retrieved window from the cache
+
+        Args:
+            loc (Tuple[int, int]): The chip key
+
+        Returns:
+            list: The chip time series in the same form as merlin returns it, or None if the cache doesn't have it
+                with every band
+
+        """
+        try:
+            timeseries = self.cache[f'{loc[0]}_{loc[1]}']
+
+            first = next(iter(timeseries.values()))
+
+        except (KeyError, StopIteration):
+            return None
+
+        if not all(b in first for b in self.items) or 'dates' not in first:
+            return None
+
+        dates = np.asarray(first['dates'])
+
+        start = dt.datetime.strptime(self.start, '%Y-%m-%d').toordinal()
+
+        stop = dt.datetime.strptime(self.stop, '%Y-%m-%d').toordinal()
+
+        window = (dates >= start) & (dates <= stop)
+
+        log.info("Using cached chip %s_%s" % loc)
+
+        return [(coord, dict({b: np.asarray(pixel[b])[window] for b in self.items}, dates=dates[window]))
+                for coord, pixel in timeseries.items()]
 
     def merlin_call(self, params):
         """
+        Request one chip and add it to the grid
+
+        Returns:
+            Tuple[int, int]: The chip key
 
         """
         # self.grid[args[4]]['data'] = merlin.create(x=args[0].coord.x,
@@ -167,17 +379,52 @@ class Chips:
         #                                             acquired=f'{args[1]}/{args[2]}',
         #                                             cfg=args[3])
 
-        self.grid[params['id']]['data'] = merlin.create(x=params['x'],
-                                                        y=params['y'],
-                                                        acquired=f"{params['start']}/{params['stop']}",
-                                                        cfg=params['cfg'])
+        self.add_chip(params['id'], merlin.create(x=params['x'],
+                                                  y=params['y'],
+                                                  acquired=f"{params['start']}/{params['stop']}",
+                                                  cfg=params['cfg']))
+
+        return params['id']
+
+    def add_chip(self, loc, data):
+        """
+        Keep a chip's time series as a cube, ready to be assembled for any of its dates
+
+        Args:
+            loc (Tuple[int, int]): The chip key
+            data (list): The chip time series from merlin
+
+        """
+        try:
+            dates = np.asarray(data[0][1]['dates'])
+
+        except IndexError:
+            dates = np.array([], dtype=int)
+
+        # The cube has to be in place before the dates, a chip is only displayed once it has dates
+        self.grid[loc]['cube'] = tools.chip_cube(data, self.items)
+
+        self.grid[loc]['dates'] = dates
+
+        if loc == self.tile_geo.chip_coord_ul:
+            self.dates = np.unique(dates)
 
     def assemble_chips(self):
         """
+        Populate the arrays for each chip at the target date index
 
         """
-        for loc in self.grid.keys():
-            self.grid[loc]['chip'] = tools.assemble(self.grid[loc]['data'], self.grid[loc]['ind'], self.items)
+        for loc, item in self.grid.items():
+            if not len(item['dates']):
+                # Nothing was acquired for this chip within the retrieved window, or it hasn't arrived yet
+                self.grid[loc]['chip'] = {b: np.zeros(shape=(100, 100), dtype=np.int16) for b in self.items}
+
+                # Flag it as fill so it is left out of the stretch and displayed black
+                self.grid[loc]['chip']['qas'][:] = 1
+
+                continue
+
+            self.grid[loc]['chip'] = tools.assemble_cube(item['cube'], item['ind'], dtype=np.int16)
 
     @staticmethod
     def rescale_array(array, qa, lower=1, upper=99):
@@ -198,7 +445,7 @@ class Chips:
         return Rescale(array, qa, lower, upper).rescaled
 
     @staticmethod
-    def mosaic(grid, ubid, ul, lr):
+    def mosaic(grid, ubid, ul, lr, out=None):
         """
         Place values from each chip into a larger array
 
@@ -207,6 +454,7 @@ class Chips:
             ubid (str): The band identifier
             ul (GeoCoordinate): The upper left coordinate of the upper left chip in the mosaic
             lr (GeoCoordinate): The upper left coordinate of the lower right chip in the mosaic
+            out (np.ndarray): Array to place the values in, a new one is made if this is None
 
         Returns:
             np.ndarray
@@ -219,42 +467,37 @@ class Chips:
                        'SWIR-1': {'ubid': 'swir1s', 'dtype': np.int16},
                        'SWIR-2': {'ubid': 'swir2s', 'dtype': np.int16},
                        'Thermal': {'ubid': 'thermals', 'dtype': np.int16},
-                       'NDVI': {'ubid': 'NDVI', 'dtype': np.float64},
-                       'MSAVI': {'ubid': 'MSAVI', 'dtype': np.float64},
-                       'SAVI': {'ubid': 'SAVI', 'dtype': np.float64},
-                       'EVI': {'ubid': 'EVI', 'dtype': np.float64},
-                       'NDMI': {'ubid': 'NDMI', 'dtype': np.float64},
-                       'NBR-1': {'ubid': 'NBR-1', 'dtype': np.float64},
-                       'NBR-2': {'ubid': 'NBR-2', 'dtype': np.float64},
+                       'NDVI': {'ubid': 'NDVI', 'dtype': np.float32},
+                       'MSAVI': {'ubid': 'MSAVI', 'dtype': np.float32},
+                       'SAVI': {'ubid': 'SAVI', 'dtype': np.float32},
+                       'EVI': {'ubid': 'EVI', 'dtype': np.float32},
+                       'NDMI': {'ubid': 'NDMI', 'dtype': np.float32},
+                       'NBR-1': {'ubid': 'NBR-1', 'dtype': np.float32},
+                       'NBR-2': {'ubid': 'NBR-2', 'dtype': np.float32},
                        'qas': {'ubid': 'qas', 'dtype': np.int16}, }
 
-        array = np.zeros(shape=tools.findrowscols(ul, lr))
+        if out is None:
+            out = np.zeros(shape=tools.findrowscols(ul, lr), dtype=ubid_lookup[ubid]['dtype'])
+
+        affine = GeoInfo.get_affine(ul.x, ul.y)
 
         for chip in grid.keys():
             coord = GeoCoordinate(x=grid[chip]['x'], y=grid[chip]['y'])
 
-            row, column = GeoInfo.geo_to_rowcol(GeoInfo.get_affine(ul.x, ul.y), coord)
+            row, column = GeoInfo.geo_to_rowcol(affine, coord)
 
-            array[row: row + 100, column: column + 100] = grid[chip]['chip'][ubid_lookup[ubid]['ubid']]
+            out[row: row + 100, column: column + 100] = grid[chip]['chip'][ubid_lookup[ubid]['ubid']]
 
-        return array
+        return out
 
     def grid_timeseries_index(self):
         """
         A wrapper to get the index within a timeseries for each grid-location in regards to a target date
 
         """
-        log.debug("coords_snap: %s" % str(self.coords_snap[0]))
-
-        log.debug("tile_geo pixel_coord_ul: %s" % str(self.tile_geo.pixel_coord_ul))
-
-        temp = ARDData.get_sequence(timeseries=self.grid[self.tile_geo.chip_coord_ul]['data'],
-                                    pixel_coord=self.tile_geo.pixel_coord_ul)
-
-        ind = self.get_index(temp['dates'], self.date)
-
         for loc, item in self.grid.items():
-            self.grid[loc]['ind'] = ind
+            if len(item['dates']):
+                self.grid[loc]['ind'] = self.get_index(item['dates'], self.date)
 
     @staticmethod
     def get_index(array, date):
@@ -0,0 +1,305 @@
+"""An index of the mapped product rasters under a tile's product directory, saved beside the products"""
+
+import os
+import re
+import sys
+import json
+from collections import OrderedDict
+from typing import Dict, List
+
+from lcmap_tap.Visualization import PRODUCTS, VERSIONS
+from lcmap_tap.logger import log, exc_handler
+
+sys.excepthook = exc_handler
+
+# Name of the saved catalogue in the tile root
+CATALOG_NAME = "tap_catalog.json"
+
+# A year on its own in a file name, e.g. 1984 in CoverPrim_color_1984.tif but not in h012v009 or 19840
+YEAR_RE = re.compile(r"(?<!\d)((?:19|20)\d{2})(?!\d)")
+
+RASTER_EXTENSIONS = (".tif", ".tiff")
+
+
+def file_year(name: str) -> int:
+    """
+    Get the year of a product raster from its file name, ignoring the directories it is in
+
+    Args:
+        name: File name or path
+
+    Returns:
+        The first year in the file name, or None if there isn't one
+
+    """
+    match = YEAR_RE.search(os.path.splitext(os.path.basename(name))[0])
+
+    return int(match.group(1)) if match else None
+
+
+def _mtime(path: str) -> float:
+    try:
+        return os.stat(path).st_mtime
+
+    except OSError:
+        return None
+
+
+def _subdirs(root: str) -> List[str]:
+    try:
+        return sorted(d for d in os.listdir(root) if os.path.isdir(os.path.join(root, d)))
+
+    except OSError:
+        return list()
+
+
+class ProductCatalog:
+    """
+    Product name -> year -> raster file for each version of the products in a tile root, made once with one directory
+    listing per product and saved as JSON in the tile root.  A saved catalogue is used as long as the tile root has
+    the same subdirectories and the modification times of each version directory, its ChangeMaps and CoverMaps
+    directories and every product directory it could hold are unchanged.  Directories that didn't exist are kept
+    with no time, so one created later is noticed, and checking all of them takes a listing of the root and a stat
+    of each directory rather than a walk.
+    """
+
+    def __init__(self, root: str, versions: dict=None, subdirs: List[str]=None, mtimes: Dict[str, float]=None):
+        """
+        Args:
+            root: The tile root, holding a directory for each version
+            versions: version: {product: {"dir": str, "years": {year: file name}}}, directories are relative to root
+            subdirs: Subdirectories of root when the catalogue was made
+            mtimes: Directory relative to root: modification time, or None if it didn't exist
+
+        """
+        self.root = root
+
+        self.versions = versions if versions is not None else OrderedDict()
+
+        self.subdirs = subdirs if subdirs is not None else list()
+
+        self.mtimes = mtimes if mtimes is not None else OrderedDict()
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.root, CATALOG_NAME)
+
+    @classmethod
+    def build(cls, root: str) -> "ProductCatalog":
+        """
+        Index the products in a tile root
+
+        Args:
+            root: The tile root
+
+        Returns:
+            The catalogue
+
+        """
+        found = _subdirs(root)
+
+        # The known versions first in order of preference, then anything else that looks like a version
+        names = [v for v in VERSIONS if v in found] + [v for v in found if v not in VERSIONS]
+
+        versions = OrderedDict()
+
+        mtimes = OrderedDict()
+
+        for version in names:
+            products = OrderedDict()
+
+            mtimes[version] = _mtime(os.path.join(root, version))
+
+            for product, spec in PRODUCTS.items():
+                parent = os.path.join(version, spec["type"])
+
+                if parent not in mtimes:
+                    mtimes[parent] = _mtime(os.path.join(root, parent))
+
+                rel = os.path.join(parent, spec["alias"])
+
+                full = os.path.join(root, rel)
+
+                # Taken before the listing, so files added while it is read make the catalogue out of date
+                mtimes[rel] = _mtime(full)
+
+                try:
+                    files = [f for f in os.listdir(full) if f.lower().endswith(RASTER_EXTENSIONS)]
+
+                except OSError:
+                    continue
+
+                years = dict()
+
+                for f in sorted(files):
+                    year = file_year(f)
+
+                    if year is not None and year not in years:
+                        years[year] = f
+
+                products[product] = {"dir": rel, "years": years}
+
+            if products:
+                versions[version] = products
+
+        log.debug("CATALOG, built for %s: %s" % (root, str({v: len(p) for v, p in versions.items()})))
+
+        return cls(root, versions, found, mtimes)
+
+    @classmethod
+    def load(cls, root: str, rebuild: bool=False) -> "ProductCatalog":
+        """
+        Get the catalogue of a tile root, from the saved one if it is still current, otherwise building and saving a
+        new one
+
+        Args:
+            root: The tile root
+            rebuild: Build a new catalogue even if the saved one is current
+
+        Returns:
+            The catalogue
+
+        """
+        catalog = None
+
+        if not rebuild:
+            catalog = cls.read(root)
+
+        if catalog is None or not catalog.current():
+            catalog = cls.build(root)
+
+            catalog.save()
+
+        return catalog
+
+    @classmethod
+    def read(cls, root: str) -> "ProductCatalog":
+        """
+        Read a saved catalogue
+
+        Args:
+            root: The tile root
+
+        Returns:
+            The catalogue, or None if there isn't a readable one
+
+        """
+        try:
+            with open(os.path.join(root, CATALOG_NAME), "r") as f:
+                saved = json.load(f, object_pairs_hook=OrderedDict)
+
+            for products in saved["versions"].values():
+                for entry in products.values():
+                    entry["years"] = {int(year): name for year, name in entry["years"].items()}
+
+            return cls(root, saved["versions"], saved["subdirs"], saved["mtimes"])
+
+        except (OSError, ValueError, KeyError, AttributeError) as e:
+            log.debug("CATALOG, no saved catalogue for %s: %s" % (root, str(e)))
+
+            return None
+
+    def save(self) -> bool:
+        """
+        Save the catalogue in the tile root, a root that can't be written to only means it is built again next time
+
+        Returns:
+            True if it was saved
+
+        """
+        saved = {"subdirs": self.subdirs, "mtimes": self.mtimes, "versions": self.versions}
+
+        try:
+            with open(self.path + ".tmp", "w") as f:
+                json.dump(saved, f, indent=1)
+
+            os.replace(self.path + ".tmp", self.path)
+
+            return True
+
+        except OSError as e:
+            log.warning("CATALOG, could not save %s: %s" % (self.path, str(e)))
+
+            return False
+
+    def current(self) -> bool:
+        """
+        Whether the catalogue still matches the directories, i.e. no versions, product directories or product files were
+        added or removed
+
+        Returns:
+            True if it is current
+
+        """
+        if _subdirs(self.root) != self.subdirs:
+            return False
+
+        return all(_mtime(os.path.join(self.root, rel)) == mtime for rel, mtime in self.mtimes.items())
+
+    def default_version(self) -> str:
+        """
+        The preferred version that has both change and cover products
+
+        Returns:
+            The version, or None if there isn't one
+
+        """
+        for version, products in self.versions.items():
+            types = {PRODUCTS[p]["type"] for p in products if p in PRODUCTS}
+
+            if {"ChangeMaps", "CoverMaps"} <= types:
+                return version
+
+        return None
+
+    def product_dir(self, version: str, product: str) -> str:
+        """
+        Full path to a product's directory
+
+        Args:
+            version: The product version
+            product: The product name, a key of PRODUCTS
+
+        Returns:
+            The directory, whether or not it exists
+
+        """
+        entry = self.versions.get(version, dict()).get(product)
+
+        if entry is not None:
+            return os.path.join(self.root, entry["dir"])
+
+        return os.path.join(self.root, version, PRODUCTS[product]["type"], PRODUCTS[product]["alias"])
+
+    def files(self, version: str, product: str) -> Dict[int, str]:
+        """
+        The rasters of a product
+
+        Args:
+            version: The product version
+            product: The product name
+
+        Returns:
+            year: full path to the raster, empty if there are none
+
+        """
+        entry = self.versions.get(version, dict()).get(product)
+
+        if entry is None:
+            return dict()
+
+        return {year: os.path.join(self.root, entry["dir"], name) for year, name in entry["years"].items()}
+
+    def years(self, version: str, product: str) -> List[int]:
+        """
+        The years a product has a raster for
+
+        Args:
+            version: The product version
+            product: The product name
+
+        Returns:
+            The years in order
+
+        """
+        return sorted(self.versions.get(version, dict()).get(product, {"years": dict()})["years"])
@@ -4,12 +4,12 @@ from lcmap_tap.logger import log, exc_handler
 from lcmap_tap.RetrieveData.retrieve_geo import GeoInfo
 from lcmap_tap.RetrieveData.retrieve_chips import Chips
 from lcmap_tap.Visualization.chipviewer_main import Ui_MainWindow_chipviewer
+from lcmap_tap.Visualization.export import export_image, export_dates, export_timelapse, select_frames
 
 import os
 import sys
 import time
 import datetime as dt
-import matplotlib.pyplot as plt
 
 from PyQt5 import QtCore
 from PyQt5.QtGui import QPixmap, QImage
@@ -174,6 +174,164 @@ class ImageViewer(QtWidgets.QGraphicsView):
         super(ImageViewer, self).mouseReleaseEvent(event)
 
 
+class ChipFetcher(QtCore.QThread):
+    """
+    Retrieve the chips for a mosaic off of the GUI thread, signalling as each one arrives
+    """
+    chip_ready = QtCore.pyqtSignal(object)
+
+    # Keeps a reference to each running fetcher, so closing its viewer doesn't destroy the thread while it runs
+    running = set()
+
+    def __init__(self, chips):
+        """
+        Args:
+            chips (Chips): Made with fetch=False
+
+        """
+        super().__init__()
+
+        self.chips = chips
+
+        self.running.add(self)
+
+        self.finished.connect(lambda: self.running.discard(self))
+
+    def run(self):
+        try:
+            self.chips.retrieve_data(callback=self.chip_ready.emit)
+
+        except Exception as e:
+            log.error('Chip retrieval raised exception: %s' % e, exc_info=True)
+
+
+class TimelapseWriter(QtCore.QThread):
+    """
+    Choose the frames of a time-lapse and write it off of the GUI thread, retrieving the chips for it first if they
+    aren't already in memory
+    """
+    # (number of frames, output files), or None if it couldn't be written
+    written = QtCore.pyqtSignal(object)
+
+    # Keeps a reference to each running writer, so closing its viewer doesn't destroy the thread while it runs
+    running = set()
+
+    def __init__(self, chips, opts, path, row=None, col=None, scale=1, workers=4, fetch=False):
+        """
+        Args:
+            chips (Chips): Covering the time-lapse dates, not used by anything else while it is written
+            opts (dict): From TimelapseDialog.options
+            path (str): Output file name without the extension
+            row (int): Row of the pixel to outline, no outline if None
+            col (int): Column of the pixel to outline
+            scale (int): Number of output pixels along each side of an image pixel
+            workers (int): Number of frames to prepare and write at the same time
+            fetch (bool): Retrieve the chips first, they were made with fetch=False
+
+        """
+        super().__init__()
+
+        self.chips = chips
+
+        self.opts = opts
+
+        self.path = path + '.gif' if opts['gif'] else path
+
+        self.row, self.col, self.scale, self.workers = row, col, scale, workers
+
+        self.fetch = fetch
+
+        self.running.add(self)
+
+        self.finished.connect(lambda: self.running.discard(self))
+
+    def run(self):
+        try:
+            if self.fetch:
+                self.chips.retrieve_data()
+
+            frames = select_frames(self.chips, self.opts['start'], self.opts['stop'], self.opts['cadence'],
+                                   self.opts['max_cloud'])
+
+            out = export_timelapse(self.chips, frames, self.path, row=self.row, col=self.col, scale=self.scale,
+                                   workers=self.workers)
+
+            self.written.emit((len(frames), out))
+
+        except Exception as e:
+            log.error('ARD time-lapse raised exception: %s' % e, exc_info=True)
+
+            self.written.emit(None)
+
+
+class TimelapseDialog(QtWidgets.QDialog):
+    """
+    Ask for the date range, cadence, cloud limit and output format of a time-lapse
+    """
+
+    def __init__(self, parent, start, stop):
+        """
+        Args:
+            parent (QtWidgets.QWidget): The chip viewer
+            start (dt.datetime): Initial first date
+            stop (dt.datetime): Initial last date
+
+        """
+        super().__init__(parent)
+
+        self.setWindowTitle('Time-lapse')
+
+        layout = QtWidgets.QFormLayout(self)
+
+        self.DateEdit_start = QtWidgets.QDateEdit(QtCore.QDate(start.year, start.month, start.day), self)
+        self.DateEdit_start.setCalendarPopup(True)
+
+        self.DateEdit_stop = QtWidgets.QDateEdit(QtCore.QDate(stop.year, stop.month, stop.day), self)
+        self.DateEdit_stop.setCalendarPopup(True)
+
+        self.SpinBox_cadence = QtWidgets.QSpinBox(self)
+        self.SpinBox_cadence.setRange(1, 3650)
+        self.SpinBox_cadence.setValue(365)
+        self.SpinBox_cadence.setSuffix(' days')
+
+        self.SpinBox_cloud = QtWidgets.QSpinBox(self)
+        self.SpinBox_cloud.setRange(0, 100)
+        self.SpinBox_cloud.setValue(30)
+        self.SpinBox_cloud.setSuffix(' %')
+
+        self.ComboBox_format = QtWidgets.QComboBox(self)
+        self.ComboBox_format.addItems(['GIF', 'PNG sequence'])
+
+        layout.addRow('Start', self.DateEdit_start)
+        layout.addRow('End', self.DateEdit_stop)
+        layout.addRow('One frame every', self.SpinBox_cadence)
+        layout.addRow('Most cloud', self.SpinBox_cloud)
+        layout.addRow('Format', self.ComboBox_format)
+
+        buttons = QtWidgets.QDialogButtonBox(QtWidgets.QDialogButtonBox.Ok | QtWidgets.QDialogButtonBox.Cancel,
+                                             parent=self)
+
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+
+        layout.addRow(buttons)
+
+    def options(self):
+        """
+        Returns:
+            dict: start, stop, cadence, max_cloud and gif
+
+        """
+        start = self.DateEdit_start.date()
+        stop = self.DateEdit_stop.date()
+
+        return {'start': dt.datetime(start.year(), start.month(), start.day()),
+                'stop': dt.datetime(stop.year(), stop.month(), stop.day()),
+                'cadence': self.SpinBox_cadence.value(),
+                'max_cloud': self.SpinBox_cloud.value() / 100,
+                'gif': self.ComboBox_format.currentIndex() == 0}
+
+
 class ChipsViewerX(QMainWindow):
     channel_lookup = {'Blue': ['blues'],
                       'Green': ['greens'],
@@ -196,7 +354,10 @@ class ChipsViewerX(QMainWindow):
 
     update_plot_signal = QtCore.pyqtSignal(object)
 
-    def __init__(self, x, y, date, url, subplot, geo, r, g, b, outdir):
+    # Saved images are enlarged so the outline of the selected pixel doesn't cover its neighbours
+    save_scale = 4
+
+    def __init__(self, x, y, date, url, subplot, geo, r, g, b, outdir, ndays=182, radius=1, workers=4, cache=None):
         """
 
         Args:
@@ -209,6 +370,11 @@ class ChipsViewerX(QMainWindow):
             r:
             g:
             b:
+            outdir:
+            ndays: Number of days either side of date to retrieve, these acquisitions are available on the date slider
+            radius: Number of chips either side of the center chip in the mosaic
+            workers: The most chips to request at the same time
+            cache: Chip data already retrieved for the plots
         """
         super().__init__()
 
@@ -220,8 +386,12 @@ class ChipsViewerX(QMainWindow):
         self.g = g
         self.b = b
         self.working_dir = outdir
+        self.ndays = ndays
+        self.radius = radius
+        self.workers = workers
+        self.cache = cache
 
-        self.fig_num = 1
+        self.current_pixel = None
 
         self.geo_info = geo
 
@@ -236,8 +406,12 @@ class ChipsViewerX(QMainWindow):
         self.lower = float(self.ui.LineEdit_lower.text())
         self.upper = float(self.ui.LineEdit_upper.text())
 
+        # The chips are retrieved in the background, each is displayed as it arrives
         self.chips = Chips(x=self.x, y=self.y, date=self.date, url=self.url,
-                           lower=self.lower, upper=self.upper, **self.channels)
+                           lower=self.lower, upper=self.upper, ndays=self.ndays, radius=self.radius,
+                           workers=self.workers, fetch=False, cache=self.cache, **self.channels)
+
+        self.arrived = 0
 
         self.pixel_image_affine = GeoInfo.get_affine(self.chips.chips_ul.x, self.chips.chips_ul.y)
 
@@ -253,15 +427,9 @@ class ChipsViewerX(QMainWindow):
 
         self.ui.ScrollArea_viewer.setWidget(self.graphics_view)
 
-        self.img = QImage(self.chips.rgb.data, self.chips.rgb.shape[1], self.chips.rgb.shape[0],
-                          self.chips.rgb.strides[0],
-                          QImage.Format_RGB888)
-
-        self.img.ndarray = self.chips.rgb
+        self.make_slider()
 
-        self.display_img()
-
-        self.make_rect()
+        self.show_rgb()
 
         self.init_ui()
 
@@ -270,7 +438,15 @@ class ChipsViewerX(QMainWindow):
         # Before generating the new plot, create a reference to the previously clicked date and subplot
         self.ax = subplot
 
-        self.date_x = self.date.toordinal()  # Date in ordinal datetime format, the x coordinate
+        self.date_x = self.chips.acquired.toordinal()  # Date in ordinal datetime format, the x coordinate
+
+        self.fetcher = ChipFetcher(self.chips)
+
+        self.fetcher.chip_ready.connect(self.chip_arrived)
+
+        self.fetcher.finished.connect(self.fetch_finished)
+
+        self.fetcher.start()
 
         self.ui.PushButton_update.clicked.connect(self.update_channels)
 
@@ -280,9 +456,183 @@ class ChipsViewerX(QMainWindow):
 
         self.ui.PushButton_save.clicked.connect(self.save_img)
 
+        self.PushButton_save_dates = QtWidgets.QPushButton('Save Dates', self.ui.Widget_central)
+
+        self.PushButton_save_dates.setMinimumSize(QtCore.QSize(100, 0))
+
+        self.PushButton_save_dates.setMaximumSize(QtCore.QSize(100, 16777215))
+
+        self.ui.VBoxLayout_zoom.addWidget(self.PushButton_save_dates, 0, QtCore.Qt.AlignHCenter)
+
+        self.PushButton_save_dates.clicked.connect(self.save_dates)
+
+        self.PushButton_timelapse = QtWidgets.QPushButton('Time-lapse', self.ui.Widget_central)
+
+        self.PushButton_timelapse.setMinimumSize(QtCore.QSize(100, 0))
+
+        self.PushButton_timelapse.setMaximumSize(QtCore.QSize(100, 16777215))
+
+        self.ui.VBoxLayout_zoom.addWidget(self.PushButton_timelapse, 0, QtCore.Qt.AlignHCenter)
+
+        self.PushButton_timelapse.clicked.connect(self.timelapse)
+
+        # The thread writing the last time-lapse
+        self.timelapse_writer = None
+
     def init_ui(self):
         self.show()
 
+    def make_slider(self):
+        """
+        Add a slider for stepping through the acquisitions that were retrieved around the target date
+
+        """
+        self.slider_layout = QtWidgets.QHBoxLayout()
+
+        self.slider = QtWidgets.QSlider(QtCore.Qt.Horizontal, self.ui.Widget_central)
+
+        self.slider.setPageStep(1)
+
+        self.Label_date = QtWidgets.QLabel(self.ui.Widget_central)
+
+        self.slider_layout.addWidget(self.slider)
+
+        self.slider_layout.addWidget(self.Label_date)
+
+        # Keeps the clipping limits from the current date while stepping through the others
+        self.CheckBox_hold = QtWidgets.QCheckBox('Hold stretch', self.ui.Widget_central)
+
+        self.slider_layout.addWidget(self.CheckBox_hold)
+
+        self.ui.gridLayout.addLayout(self.slider_layout, 2, 0, 1, 1)
+
+        self.reset_slider()
+
+        self.slider.valueChanged.connect(self.update_date)
+
+    def reset_slider(self):
+        """
+        Match the date slider to the acquisition dates that have been retrieved
+
+        """
+        self.slider.blockSignals(True)
+
+        self.slider.setRange(0, max(len(self.chips.dates) - 1, 0))
+
+        self.slider.setValue(self.chips.get_index(self.chips.dates, self.date) if len(self.chips.dates) else 0)
+
+        self.slider.setEnabled(len(self.chips.dates) > 1)
+
+        self.slider.blockSignals(False)
+
+        self.Label_date.setText(self.chips.acquired.strftime('%Y-%m-%d'))
+
+    @QtCore.pyqtSlot(object)
+    def chip_arrived(self, loc):
+        """
+        Add a newly retrieved chip to the displayed mosaic.  Nothing is displayed until the chip containing the point
+        of reference is in, and the stretch from that first display is kept until all of the chips are in.
+
+        Args:
+            loc (Tuple[int, int]): The chip key
+
+        """
+        self.arrived += 1
+
+        self.ui.statusbar.showMessage('Retrieved {} of {} chips'.format(self.arrived, len(self.chips.grid)))
+
+        if not len(self.chips.dates):
+            return
+
+        if loc == self.chips.tile_geo.chip_coord_ul:
+            self.reset_slider()
+
+            self.date_x = self.chips.acquired.toordinal()
+
+        self.chips.render(keep_limits=True)
+
+        self.show_rgb()
+
+    @QtCore.pyqtSlot()
+    def fetch_finished(self):
+        """
+        Calculate the stretch from the complete mosaic
+
+        """
+        self.ui.statusbar.clearMessage()
+
+        if not len(self.chips.dates):
+            log.warning('No ARD was retrieved for %s, %s around %s' % (self.x, self.y, self.date))
+
+            return
+
+        self.chips.render()
+
+        self.show_rgb()
+
+    def covers(self, x, y, date):
+        """
+        Check whether a date at a location can be displayed from the chips already retrieved
+
+        Args:
+            x: The point of reference x-coordinate
+            y: The point of reference y-coordinate
+            date (dt.datetime): The target date
+
+        Returns:
+            bool
+
+        """
+        return (x, y) == (self.x, self.y) and self.chips.start <= date.strftime('%Y-%m-%d') <= self.chips.stop
+
+    def set_date(self, date):
+        """
+        Move the date slider to the acquisition nearest to a date
+
+        Args:
+            date (dt.datetime): The target date
+
+        """
+        if len(self.chips.dates):
+            self.slider.setValue(self.chips.get_index(self.chips.dates, date))
+
+        else:
+            self.date = date
+
+    def update_date(self, value):
+        """
+        Display a different acquisition from the chips in memory
+
+        Args:
+            value (int): The slider position, an index into the acquisition dates
+
+        """
+        self.date = dt.datetime.fromordinal(int(self.chips.dates[value]))
+
+        self.chips.render(date=self.date, keep_limits=self.CheckBox_hold.isChecked())
+
+        self.date_x = self.chips.acquired.toordinal()
+
+        self.Label_date.setText(self.chips.acquired.strftime('%Y-%m-%d'))
+
+        self.show_rgb()
+
+    def show_rgb(self):
+        """
+        Display the current RGB mosaic
+
+        """
+        self.img = QImage(self.chips.rgb.data, self.chips.rgb.shape[1], self.chips.rgb.shape[0],
+                          self.chips.rgb.strides[0],
+                          QImage.Format_RGB888)
+
+        self.img.ndarray = self.chips.rgb
+
+        self.display_img()
+
+        if self.current_pixel is None:
+            self.make_rect()
+
     def update_percentiles(self):
         try:
             self.lower = float(self.ui.LineEdit_lower.text())
@@ -298,64 +648,136 @@ class ChipsViewerX(QMainWindow):
 
             self.ui.LineEdit_upper.setText('99.0')
 
-    def save_img(self):
+    def file_prefix(self):
         """
+        Output file name for the current channels, without the date or extension
 
         Returns:
+            str
 
         """
-        date = self.date.strftime('%Y%m%d')
-
         r = self.ui.ComboBox_red.currentText().lower()
         g = self.ui.ComboBox_green.currentText().lower()
         b = self.ui.ComboBox_blue.currentText().lower()
 
+        if r == b and r == g:
+            return r
+
+        return f'{r}_{g}_{b}'
+
+    def save_img(self):
+        """
+        Write the displayed mosaic with the selected pixel outlined, as a PNG and a georeferenced GeoTIFF
+
+        Returns:
+            None
+
+        """
+        date = self.chips.acquired.strftime('%Y%m%d')
+
+        outfile = os.path.join(self.working_dir, f'{self.file_prefix()}_{date}_{get_time()}')
+
+        metadata = {'DATE': self.chips.acquired.strftime('%Y-%m-%d'), 'X': self.x, 'Y': self.y}
+
         try:
-            outdir = self.working_dir
+            for ext in ('.png', '.tif'):
+                export_image(outfile + ext, self.chips.rgb, affine=self.chips.image_affine, row=self.row,
+                             col=self.col, scale=self.save_scale, metadata=metadata)
 
-            if r == b and r == g:
-                outfile = os.path.join(outdir, f'{r}_{date}_{get_time()}.png')
+        except (TypeError, ValueError, RuntimeError) as e:
+            log.error('ARD save_img raised exception: %s' % e, exc_info=True)
 
-            else:
-                outfile = os.path.join(outdir, f'{r}_{g}_{b}_{date}_{get_time()}.png')
+    def save_dates(self):
+        """
+        Write the mosaic for every retrieved acquisition date, with the current channels and selected pixel
+
+        Returns:
+            None
+
+        """
+        try:
+            export_dates(self.chips, self.chips.dates, self.working_dir, prefix=f'{self.file_prefix()}_{get_time()}',
+                         row=self.row, col=self.col, scale=self.save_scale,
+                         keep_limits=self.CheckBox_hold.isChecked())
+
+        except (TypeError, ValueError, RuntimeError) as e:
+            log.error('ARD save_dates raised exception: %s' % e, exc_info=True)
 
-            fig, ax = plt.subplots(figsize=(10, 10), num=f'ard_figure_{self.fig_num}')
+    def timelapse(self):
+        """
+        Ask for the time-lapse settings, then write it in the background, from a copy of the chips in memory if they
+        cover the date range or from chips retrieved for the whole range first
 
-            # Make sure that the ARD figure is active
-            plt.figure(f'ard_figure_{self.fig_num}')
+        Returns:
+            None
 
-            plt.axis('off')
+        """
+        if self.timelapse_writer is not None and self.timelapse_writer.isRunning():
+            self.ui.statusbar.showMessage('Still writing the last time-lapse')
 
-            ax.grid(False)
+            return
 
-            center = self.chips.tile_geo.chip_coord_ul
+        dialog = TimelapseDialog(self, dt.datetime.strptime(self.chips.start, '%Y-%m-%d'),
+                                 dt.datetime.strptime(self.chips.stop, '%Y-%m-%d'))
 
-            _date = dt.datetime.fromordinal(self.chips.grid[center]['data'][0][1]['dates']
-                                            [self.chips.grid[center]['ind']]).strftime('%Y-%m-%d')
+        if dialog.exec_() != QtWidgets.QDialog.Accepted:
+            return
 
-            title = f'Date: {_date}'
+        opts = dialog.options()
 
-            text = f'X: {self.x}\nY: {self.y}'
+        window = (opts['start'].strftime('%Y-%m-%d'), opts['stop'].strftime('%Y-%m-%d'))
 
-            ax.set_title(title)
+        name = os.path.join(self.working_dir, '{}_timelapse_{}_{}_{}'.format(self.file_prefix(),
+                                                                            opts['start'].strftime('%Y%m%d'),
+                                                                            opts['stop'].strftime('%Y%m%d'),
+                                                                            get_time()))
 
-            ax.imshow(self.chips.rgb, interpolation='nearest')
+        fetch = not (self.chips.start <= window[0] and window[1] <= self.chips.stop and self.fetcher.isFinished())
 
-            ax.scatter(x=self.col, y=self.row, marker='s', facecolor='none',
-                       color='yellow', s=15, linewidth=1)
+        if fetch:
+            # Retrieve the acquisitions for the whole date range once, then make every frame from them
+            chips = Chips(x=self.x, y=self.y, date=self.chips.date, url=self.url, lower=self.lower, upper=self.upper,
+                          window=window, radius=self.radius, workers=self.workers, fetch=False, cache=self.cache,
+                          r_channel=self.chips.r_channel, g_channel=self.chips.g_channel,
+                          b_channel=self.chips.b_channel)
 
-            ax.text(0, -.01, text, horizontalalignment='left', verticalalignment='top', transform=ax.transAxes)
+            self.ui.statusbar.showMessage('Retrieving chips from {} to {} for the time-lapse'.format(*window))
 
-            plt.savefig(outfile, bbox_inches='tight', dpi=200)
+        else:
+            # The frames are rendered from a copy, so the viewer can keep using the chips while it is written
+            chips = self.chips.copy()
 
-            log.debug("Plot figure saved to file {}".format(outfile))
+            self.ui.statusbar.showMessage('Writing the time-lapse')
 
-            plt.gcf().clear()
+        self.timelapse_writer = TimelapseWriter(chips, opts, name, row=self.row, col=self.col, scale=self.save_scale,
+                                                workers=self.workers, fetch=fetch)
 
-            self.fig_num += 1
+        self.timelapse_writer.written.connect(self.timelapse_written)
 
-        except (TypeError, ValueError) as e:
-            log.error('ARD save_img raised exception: %s' % e, exc_info=True)
+        self.timelapse_writer.start()
+
+    def timelapse_written(self, result):
+        """
+        Report the time-lapse once its writer has finished
+
+        Args:
+            result (tuple): Number of frames and output files, None if it failed
+
+        Returns:
+            None
+
+        """
+        if result is None:
+            self.ui.statusbar.showMessage('The time-lapse could not be written, see the log for details')
+
+            return
+
+        count, out = result
+
+        self.ui.statusbar.showMessage('Time-lapse of {} frames saved'.format(count))
+
+        if out:
+            log.info('Time-lapse saved to %s' % (out[0] if len(out) == 1 else os.path.dirname(out[0])))
 
     def update_channels(self):
         """
@@ -377,18 +799,10 @@ class ChipsViewerX(QMainWindow):
 
         self.update_percentiles()
 
-        self.chips = Chips(x=self.x, y=self.y, date=self.date, url=self.url,
-                           lower=self.lower, upper=self.upper, **self.channels)
-
-        self.img = QImage(self.chips.rgb.data, self.chips.rgb.shape[1], self.chips.rgb.shape[0],
-                          self.chips.rgb.strides[0],
-                          QImage.Format_RGB888)
-
-        self.img.ndarray = self.chips.rgb
-
-        self.display_img()
+        # The chips already hold every band, so only the mosaic needs to be made again
+        self.chips.render(lower=self.lower, upper=self.upper, **self.channels)
 
-        self.make_rect()
+        self.show_rgb()
 
     def display_img(self):
         """
@@ -0,0 +1,366 @@
+"""Write ARD chip mosaics straight to PNG or GeoTIFF, without drawing them in a matplotlib figure first"""
+
+from lcmap_tap.logger import log, exc_handler
+from lcmap_tap.Auxiliary.projections import AEA_WKT
+from lcmap_tap.RetrieveData import GeoAffine
+from lcmap_tap.Visualization.rescale import Rescale
+
+import os
+import sys
+import datetime as dt
+from multiprocessing.dummy import Pool as ThreadPool
+from typing import Iterable, List, Tuple
+
+import numpy as np
+from matplotlib import image
+from osgeo import gdal
+
+try:
+    from PIL import Image
+
+except ImportError:
+    # Only needed for animated GIFs, time-lapses can still be written as PNG sequences
+    Image = None
+
+sys.excepthook = exc_handler
+
+# Yellow, the same as the selected pixel in the viewer
+MARKER_COLOR = (255, 255, 0)
+
+
+def burn_marker(rgb: np.ndarray, row: int, col: int, scale: int=1, color: tuple=MARKER_COLOR) -> np.ndarray:
+    """
+    Enlarge the image and outline one of its pixels
+
+    Args:
+        rgb: The RGB image, rows x columns x 3
+        row: Row of the pixel to outline
+        col: Column of the pixel to outline
+        scale: Number of output pixels along each side of an input pixel, the outline is drawn on the pixels
+            surrounding the enlarged pixel so that the pixel itself is left as it is
+        color: RGB color of the outline
+
+    Returns:
+        A new image, (rows * scale) x (columns * scale) x 3
+
+    """
+    out = np.repeat(np.repeat(rgb, scale, axis=0), scale, axis=1) if scale > 1 else rgb.copy()
+
+    top, left = row * scale - 1, col * scale - 1
+
+    bottom, right = (row + 1) * scale, (col + 1) * scale
+
+    rows, cols = out.shape[:2]
+
+    # Sides that fall outside of the image are left off
+    r0, r1 = max(top, 0), min(bottom, rows - 1)
+    c0, c1 = max(left, 0), min(right, cols - 1)
+
+    for r in (top, bottom):
+        if 0 <= r < rows:
+            out[r, c0:c1 + 1] = color
+
+    for c in (left, right):
+        if 0 <= c < cols:
+            out[r0:r1 + 1, c] = color
+
+    return out
+
+
+def write_png(path: str, rgb: np.ndarray) -> str:
+    """
+    Write an RGB image to PNG, one image pixel to one file pixel
+
+    Args:
+        path: Output file
+        rgb: uint8 RGB image
+
+    Returns:
+        The output file
+
+    """
+    image.imsave(path, rgb, format='png')
+
+    return path
+
+
+def write_geotiff(path: str, rgb: np.ndarray, affine: GeoAffine, wkt: str=AEA_WKT, metadata: dict=None) -> str:
+    """
+    Write an RGB image to a 3 band GeoTIFF
+
+    Args:
+        path: Output file
+        rgb: uint8 RGB image
+        affine: Geo transform of the image
+        wkt: Projection of the image, default is Albers CONUS
+        metadata: Optional tags to add to the file
+
+    Returns:
+        The output file
+
+    """
+    rows, cols = rgb.shape[:2]
+
+    ds = gdal.GetDriverByName('GTiff').Create(path, cols, rows, 3, gdal.GDT_Byte,
+                                              options=['COMPRESS=DEFLATE', 'PHOTOMETRIC=RGB'])
+
+    try:
+        ds.SetGeoTransform(tuple(affine))
+
+        ds.SetProjection(wkt)
+
+        if metadata:
+            ds.SetMetadata({str(k): str(v) for k, v in metadata.items()})
+
+        for i in range(3):
+            ds.GetRasterBand(i + 1).WriteArray(rgb[..., i])
+
+    finally:
+        ds = None
+
+    return path
+
+
+def export_image(path: str, rgb: np.ndarray, affine: GeoAffine=None, row: int=None, col: int=None, scale: int=1,
+                 metadata: dict=None) -> str:
+    """
+    Write an RGB mosaic to PNG or GeoTIFF, chosen by the file extension, with an optional pixel marker
+
+    Args:
+        path: Output file, ending in .png, .tif or .tiff
+        rgb: uint8 RGB image
+        affine: Geo transform of the image, required for GeoTIFF
+        row: Row of the pixel to outline, no outline if None
+        col: Column of the pixel to outline
+        scale: Number of output pixels along each side of an image pixel
+        metadata: Optional tags to add to a GeoTIFF
+
+    Returns:
+        The output file
+
+    """
+    if row is not None and col is not None:
+        rgb = burn_marker(rgb, row, col, scale)
+
+    elif scale > 1:
+        rgb = np.repeat(np.repeat(rgb, scale, axis=0), scale, axis=1)
+
+    if os.path.splitext(path)[1].lower() in ('.tif', '.tiff'):
+        if affine is None:
+            raise ValueError('A geo transform is required to write %s' % path)
+
+        affine = affine._replace(x_res=affine.x_res / scale, y_res=affine.y_res / scale)
+
+        path = write_geotiff(path, rgb, affine, metadata=metadata)
+
+    else:
+        path = write_png(path, rgb)
+
+    log.debug("ARD image saved to file {}".format(path))
+
+    return path
+
+
+def export_dates(chips, dates: Iterable[int], outdir: str, prefix: str, ext: str='.png', row: int=None,
+                 col: int=None, scale: int=1, keep_limits: bool=False, workers: int=4) -> List[str]:
+    """
+    Export the current view of a Chips mosaic for each of a list of acquisition dates.  The mosaics are made from the
+    chips in memory one after another, and written on a pool of threads while the next is made.
+
+    Args:
+        chips (Chips): The retrieved chips, left displaying the date it was on before
+        dates: Ordinal acquisition dates to export, within the retrieved window
+        outdir: Output directory
+        prefix: Start of each file name, the date is added to it
+        ext: '.png', '.tif' or '.tiff'
+        row: Row of the pixel to outline, no outline if None
+        col: Column of the pixel to outline
+        scale: Number of output pixels along each side of an image pixel
+        keep_limits: Use the current clipping limits for every date instead of calculating them for each
+        workers: Number of files to write at the same time
+
+    Returns:
+        The output files
+
+    """
+    current = chips.date
+
+    pool = ThreadPool(workers)
+
+    pending = list()
+
+    try:
+        for d in dates:
+            date = dt.datetime.fromordinal(int(d))
+
+            # The next render overwrites chips.rgb, so each write gets its own copy
+            rgb = chips.render(date=date, keep_limits=keep_limits).copy()
+
+            path = os.path.join(outdir, f'{prefix}_{chips.acquired.strftime("%Y%m%d")}{ext}')
+
+            pending.append(pool.apply_async(export_image, (path, rgb),
+                                            dict(affine=chips.image_affine, row=row, col=col, scale=scale,
+                                                 metadata={'DATE': chips.acquired.strftime('%Y-%m-%d')})))
+
+        return [p.get() for p in pending]
+
+    finally:
+        pool.close()
+
+        pool.join()
+
+        chips.render(date=current, keep_limits=keep_limits)
+
+
+def cloud_fraction(qa: np.ndarray) -> float:
+    """
+    Fraction of the pixels that aren't fill that also aren't clear, i.e. cloud, cloud shadow or snow
+
+    Args:
+        qa: PIXELQA values
+
+    Returns:
+        The fraction, 1.0 if everything is fill
+
+    """
+    mask_clear, mask_fill = Rescale.get_masks(qa)
+
+    valid = np.count_nonzero(mask_fill)
+
+    if not valid:
+        return 1.0
+
+    return 1.0 - np.count_nonzero(mask_clear & mask_fill) / valid
+
+
+def select_frames(chips, start: dt.datetime, stop: dt.datetime, cadence: int=1,
+                  max_cloud: float=0.5) -> List[Tuple[int, float]]:
+    """
+    Choose the acquisitions for a time-lapse.  The date range is split into periods of cadence days and the clearest
+    acquisition in each period is used, periods where even that is cloudier than max_cloud are skipped.
+
+    Args:
+        chips (Chips): The retrieved chips
+        start: First date of the time-lapse
+        stop: Last date of the time-lapse
+        cadence: Number of days in each period, 1 uses every acquisition
+        max_cloud: The most of a frame that may be cloud, shadow or snow
+
+    Returns:
+        Ordinal date and cloud fraction of each frame
+
+    """
+    start, stop = start.toordinal(), stop.toordinal()
+
+    periods = dict()
+
+    for d in chips.dates:
+        if not start <= d <= stop:
+            continue
+
+        cloud = cloud_fraction(chips.qa_mosaic(dt.datetime.fromordinal(int(d))))
+
+        if cloud > max_cloud:
+            continue
+
+        period = (d - start) // max(cadence, 1)
+
+        if period not in periods or cloud < periods[period][1]:
+            periods[period] = (int(d), cloud)
+
+    return [periods[p] for p in sorted(periods)]
+
+
+def _timelapse_frame(rgb: np.ndarray, row: int, col: int, scale: int) -> np.ndarray:
+    if row is not None and col is not None:
+        return burn_marker(rgb, row, col, scale)
+
+    if scale > 1:
+        return np.repeat(np.repeat(rgb, scale, axis=0), scale, axis=1)
+
+    return rgb
+
+
+def export_timelapse(chips, frames: Iterable[Tuple[int, float]], path: str, row: int=None, col: int=None,
+                     scale: int=1, fps: float=2.0, workers: int=4) -> List[str]:
+    """
+    Write a time-lapse of the current view of a Chips mosaic, as an animated GIF if path ends in .gif (requires
+    Pillow) or otherwise as numbered PNG files in the directory path.  Every frame is clipped with the limits of the
+    clearest frame, so that the frames are comparable.
+
+    Args:
+        chips (Chips): The retrieved chips, left displaying the date it was on before
+        frames: Ordinal date and cloud fraction of each frame, from select_frames
+        path: Output GIF file or directory
+        row: Row of the pixel to outline, no outline if None
+        col: Column of the pixel to outline
+        scale: Number of output pixels along each side of an image pixel
+        fps: Frames per second of a GIF
+        workers: Number of frames to prepare and write at the same time
+
+    Returns:
+        The output files
+
+    """
+    frames = list(frames)
+
+    if not frames:
+        log.warning('No clear enough acquisitions for a time-lapse')
+
+        return []
+
+    gif = os.path.splitext(path)[1].lower() == '.gif'
+
+    if gif and Image is None:
+        log.warning('Pillow is not installed, writing the time-lapse as PNG files instead of %s' % path)
+
+        path, gif = os.path.splitext(path)[0], False
+
+    if not gif:
+        os.makedirs(path, exist_ok=True)
+
+    current, limits = chips.date, chips.limits
+
+    pool = ThreadPool(workers)
+
+    pending = list()
+
+    try:
+        # One stretch for every frame, from the clearest of them
+        clearest = min(frames, key=lambda f: f[1])[0]
+
+        chips.render(date=dt.datetime.fromordinal(clearest))
+
+        for num, (d, _) in enumerate(frames):
+            # The next render overwrites chips.rgb, so each frame gets its own copy
+            rgb = chips.render(date=dt.datetime.fromordinal(d), keep_limits=True).copy()
+
+            if gif:
+                pending.append(pool.apply_async(_timelapse_frame, (rgb, row, col, scale)))
+
+            else:
+                name = os.path.join(path, f'{num:03d}_{chips.acquired.strftime("%Y%m%d")}.png')
+
+                pending.append(pool.apply_async(export_image, (name, rgb), dict(row=row, col=col, scale=scale)))
+
+        results = [p.get() for p in pending]
+
+    finally:
+        pool.close()
+
+        pool.join()
+
+        chips.limits = limits
+
+        chips.render(date=current, keep_limits=limits is not None)
+
+    if not gif:
+        return results
+
+    images = [Image.fromarray(rgb) for rgb in results]
+
+    images[0].save(path, save_all=True, append_images=images[1:], duration=int(1000 / fps), loop=0)
+
+    log.debug("Time-lapse saved to file {}".format(path))
+
+    return [path]
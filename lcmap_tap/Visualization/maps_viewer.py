@@ -4,19 +4,138 @@ import os
 import sys
 import glob
 import pkg_resources
+import numpy as np
+from collections import OrderedDict
 
-from PyQt5.QtCore import pyqtSignal, QPointF, QRectF, Qt
-from PyQt5.QtGui import QPixmap, QBrush, QPen, QColor, QMouseEvent, QWheelEvent, QIcon
+from PyQt5.QtCore import pyqtSignal, QPointF, QRectF, Qt, QThread
+from PyQt5.QtGui import QPixmap, QImage, QBrush, QPen, QColor, QMouseEvent, QWheelEvent, QIcon
 from PyQt5.QtWidgets import QFrame, QSlider, QMainWindow, QGraphicsView, QGraphicsScene, \
-    QGraphicsPixmapItem, QGraphicsRectItem, QSizePolicy
+    QGraphicsItem, QGraphicsRectItem, QSizePolicy, QStyleOptionGraphicsItem
 
 from lcmap_tap.Visualization.ui_maps_viewer import Ui_MapViewer
-from lcmap_tap.Visualization import PRODUCTS, VERSIONS
+from lcmap_tap.Visualization import PRODUCTS
+from lcmap_tap.Visualization.catalog import ProductCatalog
+from lcmap_tap.Visualization.tiles import TileCache, TileSource
 from lcmap_tap.logger import log, exc_handler
 
 sys.excepthook = exc_handler
 
 
+def to_qimage(rgba: np.ndarray) -> QImage:
+    """
+    Copy a decoded tile into a QImage
+
+    Args:
+        rgba: uint8 RGBA array, rows x columns x 4
+
+    Returns:
+        The image
+
+    """
+    rows, cols = rgba.shape[:2]
+
+    rgba = np.ascontiguousarray(rgba)
+
+    return QImage(rgba.data, cols, rows, cols * 4, QImage.Format_RGBA8888).copy()
+
+
+class TiledImageItem(QGraphicsItem):
+    """
+    Draw a TileSource in scene coordinates of full resolution raster pixels, reading only the tiles that are exposed
+    at the level that matches the view's scale
+    """
+
+    def __init__(self):
+        super(TiledImageItem, self).__init__()
+
+        self.source = None
+
+        # Gives paint the exposed area instead of the whole bounding rectangle
+        self.setFlag(QGraphicsItem.ItemUsesExtendedStyleOption)
+
+    def set_source(self, source: TileSource=None):
+        if self.boundingRect() != self.source_rect(source):
+            self.prepareGeometryChange()
+
+        self.source = source
+
+        self.update()
+
+    @staticmethod
+    def source_rect(source: TileSource=None) -> QRectF:
+        if source is None:
+            return QRectF()
+
+        return QRectF(0, 0, source.width, source.height)
+
+    def boundingRect(self):
+        return self.source_rect(self.source)
+
+    def paint(self, painter, option, widget=None):
+        if self.source is None:
+            return
+
+        scale = QStyleOptionGraphicsItem.levelOfDetailFromTransform(painter.worldTransform())
+
+        level = self.source.level_for(scale)
+
+        exposed = option.exposedRect
+
+        for tx, ty in self.source.tiles_in(exposed.left(), exposed.top(), exposed.right(), exposed.bottom(), level):
+            x, y, cols, rows = self.source.tile_rect(level, tx, ty)
+
+            painter.drawImage(QRectF(x, y, cols, rows), self.source.tile(level, tx, ty))
+
+
+class YearPrefetcher(QThread):
+    """
+    Decode the visible tiles of other years into the tile cache off of the GUI thread
+    """
+
+    # Keeps a reference to each running prefetcher, so closing its viewer doesn't destroy the thread while it runs
+    running = set()
+
+    def __init__(self, paths, area, level, cache):
+        """
+        Args:
+            paths (List[str]): Raster files in the order to decode them
+            area (QRectF): The visible area, in full resolution pixels
+            level (int): The tile level being displayed
+            cache (TileCache): The viewer's tile cache
+
+        """
+        super(YearPrefetcher, self).__init__()
+
+        self.paths = paths
+
+        self.area = area
+
+        self.level = level
+
+        self.cache = cache
+
+        self.running.add(self)
+
+        self.finished.connect(lambda: self.running.discard(self))
+
+    def run(self):
+        for path in self.paths:
+            if self.isInterruptionRequested():
+                break
+
+            try:
+                # A data set of its own, GDAL data sets can't be shared with the GUI thread
+                source = TileSource(path, cache=self.cache, convert=to_qimage)
+
+                count = source.prefetch(self.area.left(), self.area.top(), self.area.right(), self.area.bottom(),
+                                        self.level, stop=self.isInterruptionRequested)
+
+                log.debug("MAPS VIEWER, prefetched %d tiles of %s" % (count, path))
+
+            except Exception as e:
+                log.error("MAPS VIEWER, prefetching %s raised exception: %s" % (path, e), exc_info=True)
+
+
 class ImageViewer(QGraphicsView):
     image_clicked = pyqtSignal(QPointF)
 
@@ -29,7 +148,7 @@ class ImageViewer(QGraphicsView):
 
         self.scene = QGraphicsScene(self)
 
-        self._image = QGraphicsPixmapItem()
+        self._image = TiledImageItem()
 
         self._mouse_button = None
 
@@ -55,7 +174,7 @@ class ImageViewer(QGraphicsView):
         return not self._empty
 
     def fitInView(self, scale=True, **kwargs):
-        rect = QRectF(self._image.pixmap().rect())
+        rect = self._image.boundingRect()
 
         if not rect.isNull():
             self.setSceneRect(rect)
@@ -79,18 +198,18 @@ class ImageViewer(QGraphicsView):
 
             self._zoom = 0
 
-    def set_image(self, pixmap=None):
-        if pixmap and not pixmap.isNull():
+    def set_image(self, source: TileSource=None):
+        if source is not None:
             self._empty = False
 
-            self._image.setPixmap(pixmap)
+            self._image.set_source(source)
 
         else:
             self._empty = True
 
             self.setDragMode(QGraphicsView.NoDrag)
 
-            self._image.setPixmap(QPixmap())
+            self._image.set_source(None)
 
         if not self.view_holder:
             self.fitInView()
@@ -130,7 +249,7 @@ class ImageViewer(QGraphicsView):
         if self.dragMode() == QGraphicsView.ScrollHandDrag:
             self.setDragMode(QGraphicsView.NoDrag)
 
-        elif not self._image.pixmap().isNull():
+        elif self.has_image():
             self.setDragMode(QGraphicsView.ScrollHandDrag)
 
     def mousePressEvent(self, event: QMouseEvent):
@@ -184,7 +303,10 @@ class MapsViewer(QMainWindow):
 
         log.debug("MAP VIEWER, tile_pixel_rowcol: %s" % str(self.pixel_rowcol))
 
-        if not os.path.exists(os.path.join(self.root, version)):
+        # Product -> year -> raster for every version in the tile root, read from the saved copy when it is current
+        self.catalog = ProductCatalog.load(self.root)
+
+        if version not in self.catalog.versions:
             self.version = self.get_version()
 
         else:
@@ -206,7 +328,25 @@ class MapsViewer(QMainWindow):
 
         self.ui.scrollArea.setWidget(self.graphics_view)
 
-        self.img_list1 = list()
+        # <dict> year: raster file, for the selected product
+        self.product_files = dict()
+
+        # Decoded tiles of every product and year shown, so revisiting an area or a year doesn't read it again
+        self.tile_cache = TileCache()
+
+        # <OrderedDict> path: TileSource, for the most recently displayed years, least recently used first
+        self.sources = OrderedDict()
+
+        self.max_sources = 8
+
+        # Years decoded ahead of the slider in its direction of travel, and behind it
+        self.prefetch_ahead = 2
+
+        self.prefetch_behind = 1
+
+        self.prefetcher = None
+
+        self.last_year = None
 
         self.pixel_map = None
 
@@ -252,23 +392,7 @@ class MapsViewer(QMainWindow):
             version: The version identifier
 
         """
-        for version in VERSIONS:
-            temp_look = os.path.join(self.root, version)
-
-            if os.path.exists(temp_look):
-
-                change_test = os.path.join(temp_look, "ChangeMaps")
-                cover_test = os.path.join(temp_look, "CoverMaps")
-
-                if os.path.exists(change_test) and os.path.exists(cover_test):
-
-                    return version
-
-                else:
-                    continue
-
-            else:
-                continue
+        return self.catalog.default_version()
 
     def get_product_root_directories(self):
         """
@@ -280,8 +404,7 @@ class MapsViewer(QMainWindow):
 
         """
         for product in PRODUCTS.keys():
-            PRODUCTS[product]["root"] = os.path.join(self.root, PRODUCTS[product]["type"],
-                                                     PRODUCTS[product]["alias"])
+            PRODUCTS[product]["root"] = self.catalog.product_dir(self.version, product)
 
             log.debug("MAPS VIEWER, %s root dir: %s" % (str(product), str(PRODUCTS[product]["root"])))
 
@@ -363,10 +486,105 @@ class MapsViewer(QMainWindow):
 
         log.debug("MAPS VIEWER, show_image-> imgs: %s" % str(imgs))
 
-        self.pixel_map = QPixmap(imgs[0])
+        self.load_image(imgs[0])
+
+    def load_image(self, path: str):
+        """
+        Display a product raster.  Only the header is read here, tiles are read as they are drawn.
+
+        Args:
+            path: The raster file
+
+        Returns:
+            None
+
+        """
+        try:
+            self.pixel_map = self.get_source(path)
+
+        except IOError as e:
+            log.warning("MAPS VIEWER, %s" % str(e))
+
+            return
 
         self.graphics_view.set_image(self.pixel_map)
 
+    def get_source(self, path: str) -> TileSource:
+        """
+        Get the TileSource of a raster, opening it if it isn't one of the most recently displayed
+
+        Args:
+            path: The raster file
+
+        Returns:
+            The source
+
+        """
+        source = self.sources.pop(path, None)
+
+        if source is None:
+            source = TileSource(path, cache=self.tile_cache, convert=to_qimage)
+
+        self.sources[path] = source
+
+        while len(self.sources) > self.max_sources:
+            self.sources.popitem(last=False)
+
+        return source
+
+    def find_image(self, year: int) -> str:
+        """
+        Find the raster of the selected product for a year
+
+        Args:
+            year: The year
+
+        Returns:
+            The raster file, or None if there isn't one
+
+        """
+        return self.product_files.get(year)
+
+    def prefetch_years(self, year: int, step: int):
+        """
+        Decode the part of the neighbouring years' rasters that is in view, starting with the next year in the
+        direction the slider is moving.  Any prefetch still running for an earlier position is stopped.
+
+        Args:
+            year: The displayed year
+            step: 1 if the slider moved right, -1 if it moved left
+
+        Returns:
+            None
+
+        """
+        if self.prefetcher is not None and self.prefetcher.isRunning():
+            self.prefetcher.requestInterruption()
+
+        if self.pixel_map is None:
+            return
+
+        years = [year + step * i for i in range(1, self.prefetch_ahead + 1)] + \
+                [year - step * i for i in range(1, self.prefetch_behind + 1)]
+
+        paths = [self.find_image(y) for y in years
+                 if self.ui.date_slider.minimum() <= y <= self.ui.date_slider.maximum()]
+
+        paths = [p for p in paths if p is not None]
+
+        if not paths:
+            return
+
+        view = self.graphics_view
+
+        area = QRectF(view.mapToScene(0, 0), view.mapToScene(view.viewport().width(), view.viewport().height()))
+
+        level = self.pixel_map.level_for(QStyleOptionGraphicsItem.levelOfDetailFromTransform(view.transform()))
+
+        self.prefetcher = YearPrefetcher(paths, area, level, self.tile_cache)
+
+        self.prefetcher.start()
+
     def date_changed(self, value):
         """
         Display the current year,
@@ -381,21 +599,18 @@ class MapsViewer(QMainWindow):
                                                 self.graphics_view.mapToScene(self.graphics_view.width(),
                                                                               self.graphics_view.height()))
 
-        try:
-            temp1 = [img for img in self.img_list1 if str(value) in img][0]
-            self.pixel_map = QPixmap(temp1)
-
-            self.graphics_view.set_image(self.pixel_map)
+        step = -1 if self.last_year is not None and value < self.last_year else 1
 
-            if self.graphics_view.view_holder:
-                view_rect = self.graphics_view.viewport().rect()
+        self.last_year = value
 
-                scene_rect = self.graphics_view.transform().mapRect(self.graphics_view.view_holder)
+        try:
+            temp1 = self.find_image(value)
 
-                factor = min(view_rect.width() / scene_rect.width(),
-                             view_rect.height() / scene_rect.height())
+            if temp1 is not None:
+                # Same size as the previous year, so the view keeps its extent and only the exposed tiles are read
+                self.load_image(temp1)
 
-                self.graphics_view.scale(factor, factor)
+                self.prefetch_years(value, step)
 
         except (TypeError, IndexError, AttributeError):
             pass
@@ -465,23 +680,14 @@ class MapsViewer(QMainWindow):
         if product is not "":
 
             try:
-                self.img_list1 = glob.glob(PRODUCTS[product]["root"] + os.sep + "*.tif")
-
-                temp = [img for img in self.img_list1 if str(self.ui.date_slider.value()) in img][0]
-
-                self.pixel_map = QPixmap(temp)
-
-                self.graphics_view.set_image(self.pixel_map)
-
-                if self.graphics_view.view_holder:
-                    view_rect = self.graphics_view.viewport().rect()
+                self.product_files = self.catalog.files(self.version, product)
 
-                    scene_rect = self.graphics_view.transform().mapRect(self.graphics_view.view_holder)
+                temp = self.find_image(self.ui.date_slider.value())
 
-                    factor = min(view_rect.width() / scene_rect.width(),
-                                 view_rect.height() / scene_rect.height())
+                if temp is not None:
+                    self.load_image(temp)
 
-                    self.graphics_view.scale(factor, factor)
+                    self.prefetch_years(self.ui.date_slider.value(), 1)
 
             except IndexError:
                 pass
@@ -8,7 +8,19 @@ sys.excepthook = exc_handler
 
 
 class Rescale:
-    def __init__(self, array, qa, lower_percentile=1, upper_percentile=99):
+    def __init__(self, array, qa, lower_percentile=1, upper_percentile=99, limits=None, masks=None, out=None):
+        """
+        Args:
+            array (np.ndarray): The input data
+            qa (np.ndarray): The PIXELQA values used to ignore cloud/shadow/fill
+            lower_percentile (float): Lower percentage clipping threshold
+            upper_percentile (float): Upper percentage clipping threshold
+            limits (List[float, float]): Clip to these values instead of calculating them from the percentiles
+            masks (Tuple[np.ndarray, np.ndarray]): The clear and fill masks from get_masks, to share them between
+                channels with the same qa
+            out (np.ndarray): uint8 array to write the rescaled values to
+
+        """
         self.lower_percentile = lower_percentile
 
         self.upper_percentile = upper_percentile
@@ -17,9 +29,13 @@ class Rescale:
 
         self.qa = qa
 
-        self.mask_clear, self.mask_fill = self.get_masks(self.qa)
+        self.mask_clear, self.mask_fill = masks if masks is not None else self.get_masks(self.qa)
 
-        if not np.any(self.mask_clear is True):
+        if limits is not None:
+            self.limits = limits
+
+        # Use the clear observations for the stretch, or anything that isn't fill if there are none
+        elif not np.any(self.mask_clear):
             self.limits = self.get_percentiles(self.array, self.mask_fill,
                                                self.lower_percentile, self.upper_percentile)
 
@@ -27,9 +43,7 @@ class Rescale:
             self.limits = self.get_percentiles(self.array, self.mask_clear,
                                                self.lower_percentile, self.upper_percentile)
 
-        self.clipped = self.clip_array(self.array, self.limits)
-
-        self.rescaled = self.rescale_array(self.clipped, self.mask_fill)
+        self.rescaled = self.rescale_array(self.array, self.mask_fill, self.limits, out=out)
 
     @staticmethod
     def get_masks(qa):
@@ -51,7 +65,9 @@ class Rescale:
     @staticmethod
     def get_percentiles(data, truth_mask, lower_percentile, upper_percentile):
         """
-        Return the upper and lower percentiles for the input data and use a mask to ignore specific values
+        Return the upper and lower percentiles for the input data and use a mask to ignore specific values.  Both are
+        found in one pass, from a histogram for 8 and 16 bit integers or a partial sort otherwise, and match
+        np.percentile.
 
         Args:
             data (np.ndarray): The original data array
@@ -60,11 +76,45 @@ class Rescale:
             upper_percentile
 
         Returns:
-            List[int, int]
+            List[float, float]
 
         """
-        return [np.percentile(data[truth_mask], lower_percentile),
-                np.percentile(data[truth_mask], upper_percentile)]
+        values = data[truth_mask]
+
+        if values.size == 0:
+            return [0.0, 0.0]
+
+        # Positions of the percentiles in the sorted values, and the neighbouring values to interpolate between
+        ranks = np.array([lower_percentile, upper_percentile], dtype=np.float64) / 100 * (values.size - 1)
+
+        below = np.floor(ranks).astype(np.int64)
+
+        above = np.minimum(below + 1, values.size - 1)
+
+        if values.dtype.kind in 'iu' and values.dtype.itemsize <= 2:
+            offset = -int(np.iinfo(values.dtype).min)
+
+            counts = np.cumsum(np.bincount(values.astype(np.int32) + offset))
+
+            a = np.searchsorted(counts, below, side='right').astype(np.float64) - offset
+
+            b = np.searchsorted(counts, above, side='right').astype(np.float64) - offset
+
+        else:
+            part = np.partition(values, np.unique(np.concatenate([below, above])))
+
+            a = part[below].astype(np.float64)
+
+            b = part[above].astype(np.float64)
+
+        # The same linear interpolation as np.percentile
+        t = ranks - below
+
+        diff = b - a
+
+        lerp = np.where(t >= 0.5, b - diff * (1 - t), a + diff * t)
+
+        return [lerp[0], lerp[1]]
 
     @staticmethod
     def clip_array(data, limits):
@@ -79,20 +129,19 @@ class Rescale:
             np.ndarray
 
         """
-        clipped = np.zeros_like(data)
-
-        np.clip(a=data, a_min=limits[0], a_max=limits[1], out=clipped)
-
-        return clipped
+        # Fractional limits on integer data give a floating point result
+        return np.clip(a=data, a_min=limits[0], a_max=limits[1])
 
     @staticmethod
-    def rescale_array(data, fill_mask, out_min=1.0, out_max=255.0):
+    def rescale_array(data, fill_mask, limits, out=None, out_min=1.0, out_max=255.0):
         """
-        Take an input array and rescale it to a range of values fitting in 8 bits by default
+        Clip the input array to the limits and rescale it to a range of values fitting in 8 bits, fill is 0
 
         Args:
             data (np.ndarray): The input data array
             fill_mask (np.ndarray): The fill-value mask
+            limits (List[float, float]: The lower and upper limits to use
+            out (np.ndarray): uint8 array to write to, a new one is made if this is None
             out_min (float): Minimum bounding value, default is 1.0
             out_max (float): Maximum bounding value, default is 255.0
 
@@ -100,12 +149,24 @@ class Rescale:
             np.ndarray
 
         """
-        out_data = np.zeros_like(data, dtype=np.int32)
+        if out is None:
+            out = np.empty(data.shape, dtype=np.uint8)
+
+        out[...] = 0
+
+        span = limits[1] - limits[0]
+
+        if not span > 0:
+            return out
+
+        scaled = np.subtract(data, limits[0], dtype=np.float64)
+
+        np.clip(scaled, 0, span, out=scaled)
+
+        scaled *= out_max - out_min
+
+        scaled /= span
 
-        out_data[fill_mask] = (
-                (data[fill_mask] - np.min(data[fill_mask])) * (out_max - out_min)
-                /
-                (np.max(data[fill_mask]) - np.min(data[fill_mask]))
-        )
+        np.copyto(out, scaled, casting='unsafe', where=fill_mask)
 
-        return out_data
+        return out
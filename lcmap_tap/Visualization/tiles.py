@@ -0,0 +1,354 @@
+"""Read product rasters a tile at a time, at the overview level that matches the display scale"""
+
+import math
+import sys
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable, List, Tuple
+
+import numpy as np
+from osgeo import gdal
+
+from lcmap_tap.logger import log, exc_handler
+
+sys.excepthook = exc_handler
+
+# Edge length in display pixels of a tile, at every level
+TILE_SIZE = 256
+
+
+class TileCache:
+    """
+    Least recently used cache of decoded tiles, shared by every raster shown in a viewer and by the threads that
+    decode tiles ahead of time
+    """
+
+    def __init__(self, maxsize: int=256):
+        """
+        Args:
+            maxsize: The most tiles to keep, at TILE_SIZE 256 each RGBA tile is 256 KB
+
+        """
+        self.maxsize = maxsize
+
+        # <OrderedDict> (path, level, tile column, tile row): tile, least recently used first
+        self._tiles = OrderedDict()
+
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._tiles)
+
+    def __contains__(self, key: Hashable):
+        with self._lock:
+            return key in self._tiles
+
+    def get(self, key: Hashable):
+        """
+        Get a tile and mark it as the most recently used
+
+        Args:
+            key: (path, level, tile column, tile row)
+
+        Returns:
+            The tile, or None if it isn't kept
+
+        """
+        with self._lock:
+            tile = self._tiles.pop(key, None)
+
+            if tile is not None:
+                self._tiles[key] = tile
+
+        return tile
+
+    def put(self, key: Hashable, tile) -> None:
+        """
+        Keep a tile, dropping the least recently used ones if there are too many
+
+        Args:
+            key: (path, level, tile column, tile row)
+            tile: The decoded tile
+
+        Returns:
+            None
+
+        """
+        with self._lock:
+            self._tiles.pop(key, None)
+
+            self._tiles[key] = tile
+
+            while len(self._tiles) > self.maxsize:
+                self._tiles.popitem(last=False)
+
+    def clear(self, path: str=None) -> None:
+        """
+        Drop the tiles of one raster, or all of them
+
+        Args:
+            path: The raster to drop, or None for all
+
+        Returns:
+            None
+
+        """
+        with self._lock:
+            if path is None:
+                self._tiles.clear()
+
+            else:
+                for key in [k for k in self._tiles if k[0] == path]:
+                    del self._tiles[key]
+
+
+class TileSource:
+    """
+    A product raster divided into tiles.  Level n is the raster at 1 / 2**n of its full resolution, and each tile is
+    read from the GDAL data set with a window covering only that tile and a buffer of the tile's display size, so
+    GDAL reads from the internal or external overview closest to the level when the file has them.
+    """
+
+    def __init__(self, path: str, cache: TileCache=None, convert: Callable=None, tile_size: int=TILE_SIZE):
+        """
+        Args:
+            path: The raster file
+            cache: Where decoded tiles are kept, nothing is kept if None
+            convert: Applied to each decoded RGBA array before it is cached, e.g. to make a QImage
+            tile_size: Edge length of a tile in display pixels
+
+        """
+        self.path = path
+
+        self.cache = cache
+
+        self.convert = convert
+
+        self.tile_size = tile_size
+
+        self.ds = gdal.Open(path, gdal.GA_ReadOnly)
+
+        if self.ds is None:
+            raise IOError("Could not open raster %s" % path)
+
+        self.width = self.ds.RasterXSize
+
+        self.height = self.ds.RasterYSize
+
+        band = self.ds.GetRasterBand(1)
+
+        self.nodata = band.GetNoDataValue()
+
+        self.lut = self.get_lut(band)
+
+        self.limits = None
+
+        if self.ds.RasterCount < 3 and self.lut is None and band.DataType != gdal.GDT_Byte:
+            self.limits = band.ComputeRasterMinMax(True)
+
+        # Coarsest level is the one where the whole raster fits in a single tile
+        self.max_level = max(0, math.ceil(math.log2(max(self.width, self.height) / self.tile_size)))
+
+        log.debug("TILES, %s: %d x %d, %d overviews, %d levels" % (path, self.width, self.height,
+                                                                  band.GetOverviewCount(), self.max_level + 1))
+
+    @staticmethod
+    def get_lut(band) -> np.ndarray:
+        """
+        Make a lookup table from a band's color table
+
+        Args:
+            band (gdal.Band): The paletted band
+
+        Returns:
+            Value: RGBA, or None if the band has no color table
+
+        """
+        ct = band.GetColorTable()
+
+        if ct is None:
+            return None
+
+        lut = np.zeros((max(ct.GetCount(), 256), 4), dtype=np.uint8)
+
+        for i in range(ct.GetCount()):
+            lut[i] = ct.GetColorEntry(i)
+
+        return lut
+
+    def level_for(self, scale: float) -> int:
+        """
+        Find the level to display at a scale, the coarsest one that still has at least one raster pixel for each
+        screen pixel
+
+        Args:
+            scale: Screen pixels per full resolution raster pixel
+
+        Returns:
+            The level
+
+        """
+        if scale <= 0:
+            return self.max_level
+
+        return int(min(max(math.floor(math.log2(1 / scale)), 0), self.max_level))
+
+    def tile_rect(self, level: int, tx: int, ty: int) -> Tuple[int, int, int, int]:
+        """
+        The full resolution pixels covered by a tile
+
+        Args:
+            level: The tile level
+            tx: Tile column
+            ty: Tile row
+
+        Returns:
+            Column offset, row offset, number of columns, number of rows
+
+        """
+        span = self.tile_size << level
+
+        x, y = tx * span, ty * span
+
+        return x, y, min(span, self.width - x), min(span, self.height - y)
+
+    def tiles_in(self, left: float, top: float, right: float, bottom: float, level: int) -> List[Tuple[int, int]]:
+        """
+        Find the tiles that overlap an area of the raster
+
+        Args:
+            left: First column of the area, in full resolution pixels
+            top: First row
+            right: Last column
+            bottom: Last row
+            level: The tile level
+
+        Returns:
+            Tile column and row of each tile, row by row
+
+        """
+        span = self.tile_size << level
+
+        left, top = max(left, 0), max(top, 0)
+
+        right, bottom = min(right, self.width - 1), min(bottom, self.height - 1)
+
+        if right < left or bottom < top:
+            return []
+
+        return [(tx, ty)
+                for ty in range(int(top) // span, int(bottom) // span + 1)
+                for tx in range(int(left) // span, int(right) // span + 1)]
+
+    def read(self, level: int, tx: int, ty: int) -> np.ndarray:
+        """
+        Read and decode one tile
+
+        Args:
+            level: The tile level
+            tx: Tile column
+            ty: Tile row
+
+        Returns:
+            uint8 RGBA array, rows x columns x 4, nodata is transparent
+
+        """
+        x, y, cols, rows = self.tile_rect(level, tx, ty)
+
+        buf_cols, buf_rows = max(1, -(-cols >> level)), max(1, -(-rows >> level))
+
+        def read_band(i):
+            return self.ds.GetRasterBand(i).ReadAsArray(x, y, cols, rows, buf_xsize=buf_cols, buf_ysize=buf_rows)
+
+        data = read_band(1)
+
+        if self.lut is not None:
+            rgba = self.lut[np.clip(data, 0, len(self.lut) - 1)]
+
+        else:
+            rgba = np.empty((buf_rows, buf_cols, 4), dtype=np.uint8)
+
+            rgba[..., 3] = 255
+
+            if self.ds.RasterCount >= 3:
+                rgba[..., 0] = data
+
+                rgba[..., 1] = read_band(2)
+
+                rgba[..., 2] = read_band(3)
+
+            elif self.limits is not None:
+                lower, upper = self.limits
+
+                span = upper - lower if upper > lower else 1
+
+                rgba[..., :3] = (np.clip((data - lower) / span, 0, 1) * 255)[..., np.newaxis]
+
+            else:
+                rgba[..., :3] = data[..., np.newaxis]
+
+        if self.nodata is not None:
+            rgba[data == self.nodata, 3] = 0
+
+        return rgba
+
+    def tile(self, level: int, tx: int, ty: int):
+        """
+        Get a decoded tile, from the cache if it is there
+
+        Args:
+            level: The tile level
+            tx: Tile column
+            ty: Tile row
+
+        Returns:
+            The tile, after convert if one was given
+
+        """
+        key = (self.path, level, tx, ty)
+
+        tile = self.cache.get(key) if self.cache is not None else None
+
+        if tile is None:
+            tile = self.read(level, tx, ty)
+
+            if self.convert is not None:
+                tile = self.convert(tile)
+
+            if self.cache is not None:
+                self.cache.put(key, tile)
+
+        return tile
+
+    def prefetch(self, left: float, top: float, right: float, bottom: float, level: int,
+                 stop: Callable[[], bool]=None) -> int:
+        """
+        Decode the tiles overlapping an area into the cache, skipping those already there.  A GDAL data set must not
+        be shared between threads, so a thread prefetching a raster opens its own TileSource for it.
+
+        Args:
+            left: First column of the area, in full resolution pixels
+            top: First row
+            right: Last column
+            bottom: Last row
+            level: The tile level
+            stop: Checked before each tile, returns True to give up early
+
+        Returns:
+            The number of tiles decoded
+
+        """
+        count = 0
+
+        for tx, ty in self.tiles_in(left, top, right, bottom, level):
+            if stop is not None and stop():
+                break
+
+            if self.cache is not None and (self.path, level, tx, ty) in self.cache:
+                continue
+
+            self.tile(level, tx, ty)
+
+            count += 1
+
+        return count
@@ -0,0 +1,320 @@
+"""
+Benchmarks for the mapify pipeline, run against synthetic chip inputs.
+
+    python -m mapify.benchmark run -o before.json
+    python -m mapify.benchmark run -o after.json
+    python -m mapify.benchmark compare before.json after.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import tempfile
+import argparse
+import statistics
+import datetime as dt
+from typing import Callable, Sequence, Tuple
+
+import numpy as np
+from osgeo import gdal
+
+from mapify.ccdc import spatialccdc
+from mapify.products import prodmap, prodvalues, packmodels, chipchange
+from mapify.spatial import create, write, buildaff
+from mapify.app import band_names as _band_names
+
+
+_begin = dt.date(1984, 1, 1).toordinal()
+_end = dt.date(2018, 12, 31).toordinal()
+
+_dates = ('1985-07-01', '2000-07-01', '2018-07-01')
+
+
+def synthmodel(rng: np.random.RandomState, start: int, end: int, brk: int,
+               band_names: Sequence=_band_names) -> dict:
+    """
+    Fake PyCCD change model.
+
+    Args:
+        rng: random state
+        start: start day ordinal
+        end: end day ordinal
+        brk: break day ordinal, 0 if the segment doesn't end in a break
+
+    Returns:
+        change model dictionary
+    """
+    model = {'start_day': start,
+             'end_day': end,
+             'break_day': brk,
+             'observation_count': int((end - start) / 16),
+             'change_probability': 1.0 if brk else 0.0,
+             'curve_qa': int(rng.choice([4, 8, 14, 24, 44, 54]))}
+
+    for b in band_names:
+        model[b] = {'magnitude': float(rng.normal(0, 300)),
+                    'rmse': float(rng.uniform(50, 300)),
+                    'intercept': float(rng.uniform(-1e5, 1e5)),
+                    'coefficients': [float(rng.normal(0, 1e-1))] + list(rng.normal(0, 100, 6))}
+
+    return model
+
+
+def synthclass(rng: np.random.RandomState, start: int, end: int, nclasses: int=9) -> dict:
+    """
+    Fake classification result for a segment.
+    """
+    return {'start_day': start,
+            'end_day': end,
+            'class_probs': list(rng.dirichlet(np.ones(nclasses))),
+            'class_vals': list(range(nclasses))}
+
+
+def synthpixel(rng: np.random.RandomState) -> Tuple[dict, list]:
+    """
+    Fake change and classification results for one pixel. Segment counts are
+    mostly one to three, with the odd busy pixel, and breaks land anywhere in
+    the time series. Some segments are split into two classifications at a
+    July 1st, like the real classification results.
+
+    Returns:
+        change results, classification results
+    """
+    nsegs = min(int(rng.geometric(0.45)), 8)
+    bounds = np.sort(rng.randint(_begin + 365, _end - 365, nsegs - 1))
+    starts = np.concatenate(([_begin + rng.randint(0, 60)], bounds + rng.randint(10, 120, nsegs - 1)))
+    ends = np.concatenate((bounds, [_end - rng.randint(0, 60)]))
+
+    segs = [(s, e) for s, e in zip(starts.tolist(), ends.tolist()) if s < e]
+
+    # Like PyCCD, a break lands on the first observation of the next model
+    breaks = [s for s, _ in segs[1:]] + [0 if rng.rand() < 0.8 else segs[-1][1] + 16]
+
+    models, classes = [], []
+    for (s, e), b in zip(segs, breaks):
+        models.append(synthmodel(rng, s, e, b))
+
+        split = dt.date(dt.date.fromordinal(s).year + 1, 7, 1).toordinal()
+        if e - s > 3650 and rng.rand() < 0.3 and split < e:
+            classes.append(synthclass(rng, s, split))
+            classes.append(synthclass(rng, split, e))
+        else:
+            classes.append(synthclass(rng, s, e))
+
+    return {'change_models': models}, classes
+
+
+def synthchip(chip_x: int=-2565585, chip_y: int=3314805,
+              seed: int=0) -> Tuple[list, list]:
+    """
+    Fake chip level inputs in the same form as the JSON and pickle files.
+
+    Args:
+        chip_x: chip upper left projected x
+        chip_y: chip upper left projected y
+        seed: random seed
+
+    Returns:
+        JSON deserialization, pickle deserialization
+    """
+    rng = np.random.RandomState(seed)
+    jdata, pdata = [], []
+
+    for row in range(100):
+        for col in range(100):
+            ccd, classes = synthpixel(rng)
+            jdata.append({'chip_x': chip_x,
+                          'chip_y': chip_y,
+                          'x': chip_x + col * 30,
+                          'y': chip_y - row * 30,
+                          'result': json.dumps(ccd)})
+            pdata.append(classes)
+
+    return jdata, pdata
+
+
+def timeit(func: Callable, repeat: int=3) -> dict:
+    """
+    Time a function call.
+
+    Args:
+        func: function to call with no arguments
+        repeat: number of times to call it
+
+    Returns:
+        dictionary with the min, median and each of the run times in seconds
+    """
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - t0)
+
+    return {'min': min(times), 'median': statistics.median(times), 'times': times}
+
+
+def bench_spatialccdc(jdata: list, pdata: list, repeat: int=3) -> dict:
+    return {'spatialccdc': timeit(lambda: spatialccdc(jdata, pdata), repeat),
+            'spatialccdc_packed': timeit(lambda: spatialccdc(jdata, pdata, packed=True), repeat)}
+
+
+def bench_products(models: list, dates: Sequence[str]=_dates, repeat: int=3) -> dict:
+    ordinals = [dt.datetime.strptime(d, '%Y-%m-%d').toordinal() for d in dates]
+    out = {}
+
+    for name, (func, _) in prodmap().items():
+        out[f'product_{name}'] = timeit(lambda: [func(m, o, fill_nodataval=0)
+                                                 for o in ordinals
+                                                 for m in models],
+                                        repeat)
+
+    names = list(prodmap())
+    out['products_shared'] = timeit(lambda: [prodvalues(m, o, names, fill_nodataval=0)
+                                             for o in ordinals
+                                             for m in models],
+                                    repeat)
+
+    return out
+
+
+def bench_write(outdir: str, repeat: int=3) -> dict:
+    aff = buildaff(-2565585, 3314805, 30)
+    chip = np.random.randint(0, 255, size=(100, 100)).astype(np.uint8)
+    tile = np.random.randint(0, 255, size=(5000, 5000)).astype(np.uint8)
+
+    def writechips():
+        ds = create(os.path.join(outdir, 'chips.tif'), 5000, 5000, aff, gdal.GDT_Byte)
+        for row in range(0, 5000, 100):
+            for col in range(0, 5000, 100):
+                write(ds, chip, col, row)
+        ds = None
+
+    def writetile():
+        ds = create(os.path.join(outdir, 'tile.tif'), 5000, 5000, aff, gdal.GDT_Byte)
+        write(ds, tile)
+        ds = None
+
+    def writeone():
+        ds = create(os.path.join(outdir, 'chip.tif'), 100, 100, aff, gdal.GDT_Byte)
+        write(ds, chip)
+        ds = None
+
+    return {'write_chip': timeit(writeone, repeat),
+            'write_tile_by_chip': timeit(writechips, repeat),
+            'write_tile': timeit(writetile, repeat)}
+
+
+def run(repeat: int=3, seed: int=0, writes: bool=True) -> dict:
+    """
+    Run all the benchmarks.
+
+    Args:
+        repeat: number of times to run each benchmark
+        seed: random seed for the synthetic inputs
+        writes: include the GeoTIFF write benchmarks
+
+    Returns:
+        dictionary of run info and results
+    """
+    jdata, pdata = synthchip(seed=seed)
+    models = spatialccdc(jdata, pdata)
+
+    results = {}
+    results.update(bench_spatialccdc(jdata, pdata, repeat))
+    results.update(bench_products(models, repeat=repeat))
+
+    chip = packmodels(models)
+    ordinals = [dt.datetime.strptime(d, '%Y-%m-%d').toordinal() for d in _dates]
+    results['chipchange'] = timeit(lambda: [chipchange(chip, o) for o in ordinals], repeat)
+
+    if writes:
+        outdir = tempfile.mkdtemp()
+        try:
+            results.update(bench_write(outdir, repeat))
+        finally:
+            shutil.rmtree(outdir, ignore_errors=True)
+
+    return {'info': {'created': dt.datetime.now().isoformat(),
+                     'python': platform.python_version(),
+                     'numpy': np.__version__,
+                     'gdal': gdal.__version__,
+                     'machine': platform.node(),
+                     'repeat': repeat,
+                     'seed': seed,
+                     'segments': sum(len(m) for m in models)},
+            'results': results}
+
+
+def compare(old: dict, new: dict, threshold: float=0.1) -> list:
+    """
+    Compare two benchmark runs by their minimum times.
+
+    Args:
+        old: baseline results
+        new: new results
+        threshold: fractional slow down to count as a regression
+
+    Returns:
+        list of (name, old seconds, new seconds, ratio, regressed) sorted by name
+    """
+    out = []
+
+    for name in sorted(set(old['results']) & set(new['results'])):
+        o = old['results'][name]['min']
+        n = new['results'][name]['min']
+        ratio = n / o if o > 0 else float('inf')
+        out.append((name, o, n, ratio, ratio > 1 + threshold))
+
+    return out
+
+
+def main(argv: Sequence[str]=None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark the mapify pipeline')
+    sub = parser.add_subparsers(dest='cmd')
+
+    runp = sub.add_parser('run', help='run the benchmarks')
+    runp.add_argument('-o', '--output', default='benchmark.json')
+    runp.add_argument('--repeat', type=int, default=3)
+    runp.add_argument('--seed', type=int, default=0)
+    runp.add_argument('--no-writes', action='store_true')
+
+    cmpp = sub.add_parser('compare', help='compare two benchmark runs')
+    cmpp.add_argument('old')
+    cmpp.add_argument('new')
+    cmpp.add_argument('--threshold', type=float, default=0.1)
+
+    args = parser.parse_args(argv)
+
+    if args.cmd == 'run':
+        res = run(args.repeat, args.seed, not args.no_writes)
+
+        with open(args.output, 'w') as f:
+            json.dump(res, f, indent=2)
+
+        for name, r in res['results'].items():
+            print(f'{name:<32}{r["min"]:>12.4f}s')
+
+        return 0
+
+    elif args.cmd == 'compare':
+        with open(args.old, 'r') as f:
+            old = json.load(f)
+        with open(args.new, 'r') as f:
+            new = json.load(f)
+
+        regressed = False
+        for name, o, n, ratio, reg in compare(old, new, args.threshold):
+            regressed |= reg
+            print(f'{name:<32}{o:>12.4f}s{n:>12.4f}s{ratio:>8.2f}x{"  REGRESSION" if reg else ""}')
+
+        return 1 if regressed else 0
+
+    parser.print_help()
+    return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
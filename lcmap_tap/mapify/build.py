@@ -0,0 +1,215 @@
+"""
+Build tile level map products from the chip level CCDC results.
+
+Progress is tracked in a manifest kept beside the products, so a rebuild only
+recomputes the chips whose input files or product parameters have changed, and
+an interrupted build picks up after the last chip that was completed.
+"""
+
+import os
+import logging
+import datetime as dt
+from typing import Sequence, Tuple
+
+import numpy as np
+from osgeo import gdal
+
+from mapify import manifest as mf
+from mapify.ccdc import jsonpaths, picklepaths, pairpaths, pathcoords, loadjfile, loadpfile, spatialccdc
+from mapify.products import prodmap, prodvalues, is_lc, lc_color
+from mapify.spatial import create, update, write, buildaff, transform_geo, determine_hv
+from mapify.app import cu_tileaff as _cu_tileaff
+
+
+log = logging.getLogger()
+
+MANIFEST_NAME = 'manifest.json'
+
+_datatypes = {gdal.GDT_Byte: np.uint8,
+              gdal.GDT_UInt16: np.uint16,
+              gdal.GDT_Int16: np.int16,
+              gdal.GDT_UInt32: np.uint32,
+              gdal.GDT_Int32: np.int32,
+              gdal.GDT_Float32: np.float32,
+              gdal.GDT_Float64: np.float64}
+
+
+def tileaff(chip_x: float, chip_y: float, tile_affine: tuple=_cu_tileaff) -> tuple:
+    """
+    Build the GeoTransform for the 30m ARD tile that contains the given chip.
+
+    Args:
+        chip_x: chip upper left projected x coord
+        chip_y: chip upper left projected y coord
+        tile_affine: tile grid GeoTransform
+
+    Returns:
+        affine tuple
+    """
+    h, v = determine_hv(chip_x, chip_y, tile_affine)
+
+    return buildaff(tile_affine[0] + h * tile_affine[1],
+                    tile_affine[3] + v * tile_affine[5],
+                    30)
+
+
+def prodpath(outdir: str, name: str, date: str) -> str:
+    """
+    File path for a product on a given date.
+
+    Args:
+        outdir: output directory
+        name: product name
+        date: date string, YYYY-MM-DD
+
+    Returns:
+        file path
+    """
+    return os.path.join(outdir, f'{name}_{date}.tif')
+
+
+def chipproducts(models: Sequence, names: Sequence[str], ordinal: int, params: dict) -> dict:
+    """
+    Compute the requested products for every pixel in a chip.
+
+    Args:
+        models: per pixel sequences of CCDC models for the chip
+        names: product names to compute
+        ordinal: standard python ordinal for the product date
+        params: keyword arguments passed along to the product functions
+
+    Returns:
+        dictionary of product name -> (bands, 100, 100) ndarray
+    """
+    prods = prodmap()
+    pixels = [prodvalues(m, ordinal, names, **params) for m in models]
+    out = {}
+
+    for name in names:
+        vals = np.array([px[name] for px in pixels], dtype=_datatypes[prods[name][1]])
+
+        out[name] = vals.reshape(len(models), -1).T.reshape(-1, 100, 100)
+
+    return out
+
+
+def openproduct(path: str, name: str, affine: tuple, bands: int) -> gdal.Dataset:
+    """
+    Open a product raster for writing, creating it if it doesn't exist yet.
+
+    Args:
+        path: file path
+        name: product name
+        affine: tile GeoTransform
+        bands: number of bands in the product
+
+    Returns:
+        gdal data set
+    """
+    if os.path.exists(path):
+        return update(path)
+
+    datatype = prodmap()[name][1]
+    ct = [lc_color()] if is_lc(name) else None
+
+    return create(path, 5000, 5000, affine, datatype, bands=bands, ct=ct)
+
+
+def buildchip(jpath: str, ppath: str, names: Sequence[str], dates: Sequence[str],
+              outdir: str, params: dict, datasets: dict) -> None:
+    """
+    Compute and write all the products for a single chip.
+
+    Args:
+        jpath: change results JSON file path
+        ppath: classification pickle file path
+        names: product names
+        dates: product dates, YYYY-MM-DD
+        outdir: output directory
+        params: keyword arguments passed along to the product functions
+        datasets: open data sets by path, reused between chips
+    """
+    chip_x, chip_y = pathcoords(jpath)
+    aff = tileaff(chip_x, chip_y)
+    row_off, col_off = transform_geo(chip_x, chip_y, aff)
+
+    models = spatialccdc(loadjfile(jpath), loadpfile(ppath))
+
+    for date in dates:
+        ordinal = dt.datetime.strptime(date, '%Y-%m-%d').toordinal()
+
+        for name, data in chipproducts(models, names, ordinal, params).items():
+            path = prodpath(outdir, name, date)
+
+            if path not in datasets:
+                datasets[path] = openproduct(path, name, aff, data.shape[0])
+
+            for band, arr in enumerate(data, start=1):
+                write(datasets[path], arr, col_off, row_off, band)
+
+    # Make sure the chip is on disk before it goes in the manifest
+    for ds in datasets.values():
+        ds.FlushCache()
+
+
+def buildtile(jroot: str, proot: str, outdir: str, names: Sequence[str],
+              dates: Sequence[str], params: dict=None, hashed: bool=False) -> Tuple[int, int]:
+    """
+    Build the products for a tile, only touching the chips that have changed
+    since the last build.
+
+    Args:
+        jroot: directory containing the change results JSON files
+        proot: directory containing the classification pickle files
+        outdir: output directory for the products and the manifest
+        names: product names
+        dates: product dates, YYYY-MM-DD
+        params: keyword arguments passed along to the product functions, over
+            the default of fill_nodataval=0
+        hashed: compare input files by content hash instead of modification time
+
+    Returns:
+        number of chips built, number of chips skipped
+    """
+    # The product functions return None for nodata unless they're given a fill value
+    params = dict({'fill_nodataval': 0}, **(params or {}))
+
+    os.makedirs(outdir, exist_ok=True)
+
+    manpath = os.path.join(outdir, MANIFEST_NAME)
+    manifest = mf.load(manpath)
+
+    fullparams = {'names': sorted(names), 'dates': sorted(dates), 'params': params}
+
+    built, skipped = 0, 0
+    datasets = {}
+
+    try:
+        for jpath, ppath in pairpaths(jsonpaths(jroot), picklepaths(proot)):
+            if ppath is None:
+                log.warning(f'No classification results for {jpath}')
+                continue
+
+            key = '{}_{}'.format(*pathcoords(jpath))
+
+            # Products that went missing need every chip written again
+            missing = any(not os.path.exists(prodpath(outdir, n, d)) for n in names for d in dates)
+            entry = mf.chipentry([jpath, ppath], fullparams, hashed)
+
+            if not missing and not mf.stale(manifest, key, entry):
+                skipped += 1
+                continue
+
+            if missing:
+                manifest = mf.empty()
+
+            log.debug(f'Building chip {key}')
+            buildchip(jpath, ppath, names, dates, outdir, params, datasets)
+
+            mf.save(mf.record(manifest, key, entry), manpath)
+            built += 1
+    finally:
+        for path in list(datasets):
+            datasets[path] = None
+
+    return built, skipped
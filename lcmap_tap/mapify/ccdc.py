@@ -5,11 +5,11 @@ import os
 import json
 import pickle
 import logging
-from typing import Tuple, List, Sequence
+from typing import Tuple, List, Sequence, Union
 
 import numpy as np
 
-from mapify.products import BandModel, CCDCModel
+from mapify.products import BandModel, CCDCModel, CCDCChip, segmentdtype, fillprobs
 from mapify.spatial import buildaff, transform_geo
 from mapify.app import band_names as _band_names
 
@@ -61,6 +61,37 @@ def pathcoords(path: str) -> Tuple[int, int]:
     return int(parts[1]), int(parts[2][:-5])
 
 
+def picklecoords(path: str) -> Tuple[int, int]:
+    """
+    Pull the Chip X and Chip Y coords from a classification pickle file path.
+
+    Args:
+        path: file path
+
+    Returns:
+        chip upper left x/y based on the file name
+    """
+    parts = os.path.split(path)[-1].split('_')
+    return int(parts[1]), int(parts[2])
+
+
+def pairpaths(jpaths: Sequence[str], ppaths: Sequence[str]) -> List[Tuple[str, str]]:
+    """
+    Match up the change result files with the classification files for the
+    same chip. Chips without a classification file get None.
+
+    Args:
+        jpaths: JSON file paths
+        ppaths: pickle file paths
+
+    Returns:
+        list of (JSON path, pickle path) pairs
+    """
+    pickles = {picklecoords(p): p for p in ppaths}
+
+    return [(j, pickles.get(pathcoords(j))) for j in jpaths]
+
+
 def loadjfile(path: str) -> list:
     """
     Load a JSON formatted file into a dictionary.
@@ -198,26 +229,26 @@ def buildccdc(chgmodel: dict, cl1model: dict=None,
                          class_vals=cl1model['class_vals'])
 
 
-def unify(ccd: dict, classified: list) -> List[CCDCModel]:
+def pairmodels(ccd: dict, classified: list) -> List[tuple]:
     """
-    Combine the two disparate models for a given pixel and make a list of unified models.
+    Match up the change models for a pixel with the classification models
+    that go with them.
 
     Args:
         ccd: pyccd results for a pixel
         classified: test classification results for the pixel from a pickle file
-    
+
     Returns:
-        unified CCDC models
+        (change model, first classification, second classification) for each
+        change model, the classifications are None where there isn't a match
     """
-    models = []
-    # log.debug(len(classified))
-    # log.debug(len(ccd['change_models']))
+    pairs = []
     for change in ccd['change_models']:
         found = False
         for cl1 in classified:
             # One for one
             if cl1['start_day'] == change['start_day'] and cl1['end_day'] == change['end_day']:
-                models.append(buildccdc(change, cl1))
+                pairs.append((change, cl1, None))
                 found = True
                 break
 
@@ -225,16 +256,74 @@ def unify(ccd: dict, classified: list) -> List[CCDCModel]:
             elif cl1['start_day'] == change['start_day']:
                 for cl2 in classified:
                     if cl2['end_day'] == change['end_day']:
-                        models.append(buildccdc(change, cl1, cl2))
+                        pairs.append((change, cl1, cl2))
                         found = True
                         break
                 break
 
         # Looks like a segment that didn't fall on July 1st ... blah
         if found is False:
-            models.append(buildccdc(change))
+            pairs.append((change, None, None))
+
+    return pairs
 
-    return models
+
+def buildrecord(rec: np.record, chgmodel: dict, cl1model: dict=None,
+                cl2model: dict=None, band_names: Sequence=_band_names) -> np.record:
+    """
+    Fill a segment record in place, the array-backed equivalent of buildccdc.
+
+    Args:
+        rec: record from an array using the segmentdtype layout
+        chgmodel: dictionary representation of a change model
+        cl1model: dictionary representation of a classification model
+        cl2model: dictionary representation of the second part of annualized classification (if it exists for this segment)
+        band_names: band names present in the change model
+
+    Returns:
+        the filled record
+    """
+    rec.start_day = chgmodel['start_day']
+    rec.end_day = chgmodel['end_day']
+    rec.break_day = chgmodel['break_day']
+    rec.obs_count = chgmodel['observation_count']
+    rec.change_prob = chgmodel['change_probability']
+    rec.curve_qa = chgmodel['curve_qa']
+
+    for idx, name in enumerate(band_names):
+        rec.magnitude[idx] = chgmodel[name]['magnitude']
+        rec.rmse[idx] = chgmodel[name]['rmse']
+        rec.intercept[idx] = chgmodel[name]['intercept']
+        rec.coefficients[idx] = chgmodel[name]['coefficients']
+
+    rec.class_probs1[:] = -1
+    rec.class_probs2[:] = -1
+
+    if cl1model is not None:
+        fillprobs(rec.class_probs1, cl1model['class_probs'])
+        rec.class_vals[:len(cl1model['class_vals'])] = cl1model['class_vals']
+
+    if cl2model is not None:
+        rec.class_split = cl2model['start_day']
+        fillprobs(rec.class_probs2, cl2model['class_probs'])
+
+    return rec
+
+
+def unify(ccd: dict, classified: list) -> List[CCDCModel]:
+    """
+    Combine the two disparate models for a given pixel and make a list of unified models.
+
+    Args:
+        ccd: pyccd results for a pixel
+        classified: test classification results for the pixel from a pickle file
+    
+    Returns:
+        unified CCDC models
+    """
+    # log.debug(len(classified))
+    # log.debug(len(ccd['change_models']))
+    return [buildccdc(change, cl1, cl2) for change, cl1, cl2 in pairmodels(ccd, classified)]
 
 
 def spatialccd(jdata: list) -> list:
@@ -279,7 +368,8 @@ def spatialccd(jdata: list) -> list:
 #     return np.array(pdata).reshape(100, 100)
 
 
-def spatialccdc(jdata: list, pdata: list) -> list:
+def spatialccdc(jdata: list, pdata: list, packed: bool=False,
+                band_names: Sequence=_band_names) -> Union[list, CCDCChip]:
     """
     Provide a unified CCDC model in a pseudo-spatial chip, as represented by a
     flattened list of lists.
@@ -287,16 +377,51 @@ def spatialccdc(jdata: list, pdata: list) -> list:
     Args:
         jdata: initial JSON deserialization of change results for a chip
         pdata: pickle deserialization of classification results for a chip
+        packed: build the array-backed CCDCChip container instead of namedtuples
+        band_names: band names present in the change models
 
     Returns:
-        ndarray of lists(of CCDC namedtuples)
+        ndarray of lists(of CCDC namedtuples), or a CCDCChip if packed
     """
     # cl = spatialcl(pdata).flatten()
     ccd = spatialccd(jdata)
 
+    if packed:
+        return packccdc(ccd, pdata, band_names)
+
     return [unify(c, cl1) for c, cl1 in zip(ccd, pdata)]
 
 
+def packccdc(ccd: list, pdata: list, band_names: Sequence=_band_names) -> CCDCChip:
+    """
+    Build the array-backed chip container straight from the deserialized
+    results, without going through the CCDCModel namedtuples.
+
+    Args:
+        ccd: spatially aligned change results for a chip
+        pdata: pickle deserialization of classification results for a chip
+        band_names: band names present in the change models
+
+    Returns:
+        CCDCChip
+    """
+    band_names = tuple(band_names)
+    pairs = [pairmodels(c, cl1) for c, cl1 in zip(ccd, pdata)]
+
+    offsets = np.zeros(shape=(len(pairs) + 1,), dtype=np.int64)
+    np.cumsum([len(p) for p in pairs], out=offsets[1:])
+
+    segments = np.zeros(shape=(offsets[-1],), dtype=segmentdtype(band_names)).view(np.recarray)
+
+    idx = 0
+    for pixel in pairs:
+        for change, cl1, cl2 in pixel:
+            buildrecord(segments[idx], change, cl1, cl2, band_names)
+            idx += 1
+
+    return CCDCChip(segments=segments, offsets=offsets, band_names=band_names)
+
+
 def validate(jpaths: list, ppaths: list) -> list:
     """
 
@@ -0,0 +1,169 @@
+"""
+Build manifest used to track which chips of a tile have had their products
+built, and from what inputs, so that rebuilds only touch what changed.
+"""
+
+import os
+import json
+import hashlib
+from typing import Sequence
+
+
+MANIFEST_VERSION = 1
+
+
+def filehash(path: str, blocksize: int=2 ** 20) -> str:
+    """
+    SHA-1 digest of a file's contents.
+
+    Args:
+        path: file path
+        blocksize: number of bytes to read at a time
+
+    Returns:
+        hex digest
+    """
+    sha = hashlib.sha1()
+
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(blocksize), b''):
+            sha.update(block)
+
+    return sha.hexdigest()
+
+
+def fileinfo(path: str, hashed: bool=False) -> dict:
+    """
+    Describe an input file well enough to tell if it has changed.
+
+    Args:
+        path: file path
+        hashed: use a content hash instead of the modification time
+
+    Returns:
+        dictionary with the path, size, and either mtime or sha1
+    """
+    stat = os.stat(path)
+
+    info = {'path': os.path.abspath(path),
+            'size': stat.st_size}
+
+    if hashed:
+        info['sha1'] = filehash(path)
+    else:
+        info['mtime'] = stat.st_mtime
+
+    return info
+
+
+def paramdigest(params: dict) -> str:
+    """
+    Stable digest of the product parameters.
+
+    Args:
+        params: JSON serializable product parameters
+
+    Returns:
+        hex digest
+    """
+    return hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def chipentry(paths: Sequence[str], params: dict, hashed: bool=False) -> dict:
+    """
+    Manifest entry for a single chip.
+
+    Args:
+        paths: input file paths for the chip
+        params: product parameters used for the chip
+        hashed: use content hashes instead of modification times
+
+    Returns:
+        manifest entry
+    """
+    return {'inputs': [fileinfo(p, hashed) for p in paths if p is not None],
+            'params': paramdigest(params)}
+
+
+def empty() -> dict:
+    """
+    A manifest with no chips recorded.
+
+    Returns:
+        manifest
+    """
+    return {'version': MANIFEST_VERSION, 'chips': {}}
+
+
+def load(path: str) -> dict:
+    """
+    Read a manifest from disk, starting fresh if it doesn't exist or is from
+    a different manifest version.
+
+    Args:
+        path: manifest file path
+
+    Returns:
+        manifest
+    """
+    if not os.path.exists(path):
+        return empty()
+
+    with open(path, 'r') as f:
+        manifest = json.load(f)
+
+    if manifest.get('version') != MANIFEST_VERSION:
+        return empty()
+
+    return manifest
+
+
+def save(manifest: dict, path: str) -> None:
+    """
+    Write the manifest to disk. The file is written beside the target and
+    renamed into place, so a crash never leaves a partial manifest behind.
+
+    Args:
+        manifest: manifest to write
+        path: manifest file path
+    """
+    tmp = f'{path}.tmp'
+
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+        f.flush()
+        os.fsync(f.fileno())
+
+    os.replace(tmp, path)
+
+
+def stale(manifest: dict, key: str, entry: dict) -> bool:
+    """
+    Whether a chip needs to be rebuilt.
+
+    Args:
+        manifest: current manifest
+        key: chip identifier
+        entry: manifest entry describing the current inputs and parameters
+
+    Returns:
+        True if the chip has not been built with these inputs and parameters
+    """
+    return manifest['chips'].get(key) != entry
+
+
+def record(manifest: dict, key: str, entry: dict) -> dict:
+    """
+    Mark a chip as built.
+
+    Args:
+        manifest: current manifest
+        key: chip identifier
+        entry: manifest entry describing the inputs and parameters used
+
+    Returns:
+        the updated manifest
+    """
+    manifest['chips'][key] = entry
+
+    return manifest
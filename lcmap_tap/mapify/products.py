@@ -1,5 +1,8 @@
 """
 Functions for producing product values from CCDC results.
+
+The per-pixel product functions accept either a sequence of CCDCModel
+namedtuples, or the record array view of a pixel from a CCDCChip container.
 """
 
 import datetime as dt
@@ -15,10 +18,15 @@ from mapify.app import chg_begining as _chg_begining
 from mapify.app import chg_magbands as _chg_magbands
 from mapify.app import lc_map as _lc_map
 from mapify.app import nlcdxwalk as _nlcdxwalk
+from mapify.app import band_names as _band_names
+from mapify.spatial import windows
 
 
 __ordbegin = dt.datetime.strptime(_chg_begining, '%Y-%m-%d').toordinal()
 
+# Python ordinal of the numpy datetime64 epoch, 1970-01-01
+__epochord = dt.date(1970, 1, 1).toordinal()
+
 
 class BandModel(NamedTuple):
     """
@@ -48,6 +56,213 @@ class CCDCModel(NamedTuple):
     class_vals: tuple
 
 
+class DateLUT(NamedTuple):
+    """
+    Lookup tables indexed by python ordinal - offset.
+
+    year and doy are the calendar year and day of year, prevyear is the
+    ordinal for the same month and day of the previous year, clamped to the
+    end of the month for leap days.
+    """
+    offset: int
+    year: np.ndarray
+    doy: np.ndarray
+    prevyear: np.ndarray
+
+
+class Position(NamedTuple):
+    """
+    Where an ordinal date falls relative to a pixel's models.
+
+    kind is one of the POS_ constants. index is the model the date falls in
+    for POS_INSIDE, and the model after the gap for POS_PREBREAK and
+    POS_POSTBREAK, so the model before the gap is index - 1.
+    """
+    kind: int
+    index: int
+
+
+POS_NOMODEL = 0     # no models at all
+POS_BEFORE = 1      # before the first model starts
+POS_INSIDE = 2      # within a model
+POS_PREBREAK = 3    # in a gap, before the previous model's break day
+POS_POSTBREAK = 4   # in a gap, on or after the previous model's break day
+POS_AFTER = 5       # after the last model ends
+
+
+class CCDCChip(NamedTuple):
+    """
+    Array-backed container for the unified CCDC models of a whole chip.
+
+    segments holds one record per model, using the segmentdtype layout, and is
+    grouped by pixel. The models for pixel i are segments[offsets[i]:offsets[i + 1]].
+    """
+    segments: np.ndarray
+    offsets: np.ndarray
+    band_names: tuple
+
+
+@lru_cache()
+def segmentdtype(band_names: Sequence=_band_names, nclasses: int=9) -> np.dtype:
+    """
+    Fixed width record layout for a single unified CCDC model. Floating point
+    fields are float64 like the values they are copied from, so the products
+    made from records match those made from CCDCModel namedtuples. The band
+    order is kept in the data type's metadata, under 'band_names'.
+
+    Args:
+        band_names: spectral bands held by each record, in order
+        nclasses: width of the class probability and class value fields
+
+    Returns:
+        numpy structured data type
+    """
+    nbands = len(band_names)
+
+    return np.dtype([('start_day', np.int32),
+                     ('end_day', np.int32),
+                     ('break_day', np.int32),
+                     ('obs_count', np.int32),
+                     ('change_prob', np.float64),
+                     ('curve_qa', np.int32),
+                     ('magnitude', np.float64, (nbands,)),
+                     ('rmse', np.float64, (nbands,)),
+                     ('intercept', np.float64, (nbands,)),
+                     ('coefficients', np.float64, (nbands, 7)),
+                     ('class_split', np.int32),
+                     ('class_probs1', np.float64, (nclasses,)),
+                     ('class_probs2', np.float64, (nclasses,)),
+                     ('class_vals', np.int16, (nclasses,))],
+                    metadata={'band_names': tuple(band_names)})
+
+
+def fillprobs(field: np.ndarray, probs: Sequence) -> None:
+    """
+    Copy class probabilities into a fixed width record field. Unused trailing
+    slots are set to -1 so they never out-rank a real probability.
+
+    Args:
+        field: record field to fill
+        probs: class probabilities
+    """
+    field[:] = -1
+    field[:len(probs)] = probs
+
+
+def packmodels(pixels: Sequence, band_names: Sequence=_band_names) -> CCDCChip:
+    """
+    Convert sequences of CCDCModel namedtuples, one sequence per pixel, into
+    the array-backed chip container.
+
+    Args:
+        pixels: sequence of CCDC namedtuple sequences, in pixel order
+        band_names: bands to carry over, in order
+
+    Returns:
+        CCDCChip
+    """
+    band_names = tuple(band_names)
+    counts = np.array([len(p) for p in pixels], dtype=np.int64)
+
+    offsets = np.zeros(shape=(len(pixels) + 1,), dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+
+    segments = np.zeros(shape=(offsets[-1],), dtype=segmentdtype(band_names)).view(np.recarray)
+
+    idx = 0
+    for models in pixels:
+        for m in models:
+            rec = segments[idx]
+            rec.start_day = m.start_day
+            rec.end_day = m.end_day
+            rec.break_day = m.break_day
+            rec.obs_count = m.obs_count
+            rec.change_prob = m.change_prob
+            rec.curve_qa = m.curve_qa
+            rec.class_split = m.class_split
+
+            for bidx, name in enumerate(band_names):
+                band = bandmodel(m, name)
+                rec.magnitude[bidx] = band.magnitude
+                rec.rmse[bidx] = band.rmse
+                rec.intercept[bidx] = band.intercept
+                rec.coefficients[bidx] = band.coefficients
+
+            fillprobs(rec.class_probs1, m.class_probs1)
+            fillprobs(rec.class_probs2, m.class_probs2)
+            rec.class_vals[:len(m.class_vals)] = m.class_vals
+
+            idx += 1
+
+    return CCDCChip(segments=segments, offsets=offsets, band_names=band_names)
+
+
+def pixelmodels(chip: CCDCChip, idx: int) -> np.recarray:
+    """
+    The models belonging to a single pixel in the chip container. The returned
+    records support the same attribute access as CCDCModel, and can be handed
+    directly to the product functions.
+
+    Args:
+        chip: array-backed chip container
+        idx: flattened pixel index, row * 100 + col
+
+    Returns:
+        record array view, in the order the models were packed. PyCCD writes
+        a pixel's change models in time order and neither packmodels nor
+        packccdc reorders them, which position and the product functions
+        rely on.
+    """
+    return chip.segments[chip.offsets[idx]:chip.offsets[idx + 1]]
+
+
+def chipmodels(chip: CCDCChip) -> list:
+    """
+    Pixel model views for every pixel in the chip container, in pixel order.
+
+    Args:
+        chip: array-backed chip container
+
+    Returns:
+        list of record array views
+    """
+    return [pixelmodels(chip, i) for i in range(len(chip.offsets) - 1)]
+
+
+def bandmodel(model: Union[CCDCModel, np.record], name: str,
+              band_names: Sequence=None) -> Union[BandModel, None]:
+    """
+    Pull an individual band model out of either model representation.
+
+    Args:
+        model: CCDCModel namedtuple or segment record
+        name: band name
+        band_names: band order used by the segment record, by default the
+            order recorded in the record's data type by segmentdtype
+
+    Returns:
+        individual band model, None if the band is not present
+    """
+    if isinstance(model, CCDCModel):
+        for band in model.bands:
+            if band.name == name:
+                return band
+        return None
+
+    if band_names is None:
+        band_names = (model.dtype.metadata or {}).get('band_names', _band_names)
+
+    if name not in band_names:
+        return None
+
+    idx = band_names.index(name)
+    return BandModel(name=name,
+                     magnitude=float(model.magnitude[idx]),
+                     rmse=float(model.rmse[idx]),
+                     intercept=float(model.intercept[idx]),
+                     coefficients=tuple(model.coefficients[idx]))
+
+
 def sortmodels(models: Sequence, key: str='start_day') -> list:
     """
     Sort a sequence of CCDC models based upon given key.
@@ -62,6 +277,42 @@ def sortmodels(models: Sequence, key: str='start_day') -> list:
     return sorted(models, key=attrgetter(key))
 
 
+def position(models: Sequence, ordinal: int) -> Position:
+    """
+    Work out where the ordinal date falls relative to the models, so the
+    product functions can share it instead of each walking the models again.
+    This assumes the models are sorted and don't overlap, and that a model's
+    break day doesn't fall after the start of the next model.
+
+    Args:
+        models: sorted sequence of CCDC namedtuples that represent the pixel history
+        ordinal: standard python ordinal starting on day 1 of year 1
+
+    Returns:
+        Position
+    """
+    if len(models) == 0:
+        return Position(POS_NOMODEL, -1)
+
+    if ordinal < models[0].start_day:
+        return Position(POS_BEFORE, 0)
+
+    if ordinal > models[-1].end_day:
+        return Position(POS_AFTER, len(models) - 1)
+
+    for idx, m in enumerate(models):
+        if ordinal <= m.end_day:
+            if ordinal >= m.start_day:
+                return Position(POS_INSIDE, idx)
+
+            if ordinal < models[idx - 1].break_day:
+                return Position(POS_PREBREAK, idx)
+
+            return Position(POS_POSTBREAK, idx)
+
+    raise ValueError
+
+
 # @lru_cache()
 def modelprobs(model: CCDCModel, ordinal: int) -> np.ndarray:
     """
@@ -211,7 +462,7 @@ def noclass(model: CCDCModel, ordinal: int, rank: int) -> bool:
 def landcover(models: Sequence, ordinal: int, rank: int, dfcmap: dict=_dfc,
               fill_begin: bool=True, fill_end: bool=True, fill_samelc: bool=True,
               fill_difflc: bool=True, fill_nodata: bool=True, fill_nodataval: int=None,
-              **kwargs) -> int:
+              pos: Position=None, **kwargs) -> int:
     """
     Given a sequence of CCDC models representing pixel history and an ordinal date,
     what is the Primary Land Cover value?
@@ -234,55 +485,54 @@ def landcover(models: Sequence, ordinal: int, rank: int, dfcmap: dict=_dfc,
             if the date falls after the break date, then use the second
         fill_nodata: whether fill where there is no models at all
         fill_nodataval: value to use when there is no data
+        pos: precomputed position of the ordinal relative to the models
 
     Returns:
         primary land cover class value
 
     """
-    if ordinal <= 0 or not models:
+    if ordinal <= 0 or len(models) == 0:
         if fill_nodata:
             return fill_nodataval
         return dfcmap['lc_insuff']
 
+    if pos is None:
+        pos = position(models, ordinal)
+
     # ord date before time series models -> cover back
-    if ordinal < models[0].start_day:
+    if pos.kind == POS_BEFORE:
         if fill_begin:
             return modelclass(models[0], ordinal, rank)
         return dfcmap['lc_insuff']
 
     # ord date after time series models -> cover forward
-    if ordinal > models[-1].end_day:
+    if pos.kind == POS_AFTER:
         if fill_end:
             return modelclass(models[-1], ordinal, rank)
         return dfcmap['lc_insuff']
 
-    prev_end = 0
-    prev_br = 0
-    prev_class = 0
-    for m in models:
-        curr_class = modelclass(m, ordinal, rank)
-        # Date is contained within the model
-        if m.start_day <= ordinal <= m.end_day:
-            return curr_class
-        # Same land cover fill
-        elif fill_samelc and curr_class == prev_class and prev_end < ordinal < m.start_day:
-            return curr_class
-        # Different land cover fill, previous break -> current model
-        elif fill_difflc and prev_br <= ordinal < m.start_day:
-            return curr_class
-        # Different land cover fill, model end -> break
-        elif fill_difflc and m.end_day < ordinal < m.break_day:
-            return curr_class
-
-        prev_end = m.end_day
-        prev_br = m.break_day
-        prev_class = curr_class
+    # Date is contained within the model
+    if pos.kind == POS_INSIDE:
+        return modelclass(models[pos.index], ordinal, rank)
+
+    prev_class = modelclass(models[pos.index - 1], ordinal, rank)
+    curr_class = modelclass(models[pos.index], ordinal, rank)
+
+    # Different land cover fill, model end -> break
+    if fill_difflc and pos.kind == POS_PREBREAK:
+        return prev_class
+    # Same land cover fill
+    elif fill_samelc and curr_class == prev_class:
+        return curr_class
+    # Different land cover fill, previous break -> current model
+    elif fill_difflc and pos.kind == POS_POSTBREAK:
+        return curr_class
 
     return dfcmap['lc_inbtw']
 
 
 def landcover_conf(models: Sequence, ordinal: int, rank: int, dfcmap: dict=_dfc,
-                   **kwargs) -> int:
+                   pos: Position=None, **kwargs) -> int:
     """
     Given a sequence of CCDC models representing pixel history and an ordinal date,
     what is the Primary Land Cover Confidence value?
@@ -294,60 +544,112 @@ def landcover_conf(models: Sequence, ordinal: int, rank: int, dfcmap: dict=_dfc,
             0 - primary, 1- secondary, 2 - tertiary ...
         dfcmap: data format mapping, determines what values to assign for the
             various conditionals that could occur
+        pos: precomputed position of the ordinal relative to the models
 
     Returns:
         primary land cover confidence value
     """
-    if ordinal <= 0 or not models:
+    if ordinal <= 0 or len(models) == 0:
         return dfcmap['lcc_nomodel']
 
+    if pos is None:
+        pos = position(models, ordinal)
+
     # ord date before time series models
-    if ordinal < models[0].start_day:
+    if pos.kind == POS_BEFORE:
         return dfcmap['lcc_back']
 
     # ord date after time series models
-    if ordinal > models[-1].end_day:
+    if pos.kind == POS_AFTER:
         if models[-1].change_prob == 1:
             return dfcmap['lcc_afterbr']
 
         return dfcmap['lcc_forwards']
 
-    prev_end = 0
-    prev_class = 0
-    for m in models:
-        curr_class = modelclass(m, ordinal, rank)
-        # Date is contained within the model
-        if m.start_day <= ordinal <= m.end_day:
-            # Annualized classification mucking jazz
-            if growth(m):
-                return dfcmap['lcc_growth']
-            elif decline(m):
-                return dfcmap['lcc_decline']
-            return scaleprob(modelprob(m, ordinal, rank))
-        elif curr_class == prev_class and prev_end < ordinal < m.start_day:
-            return dfcmap['lcc_samelc']
-        elif prev_end <= ordinal < m.start_day:
-            return dfcmap['lcc_difflc']
-
-        prev_end = m.end_day
-        prev_class = curr_class
+    # Date is contained within the model
+    if pos.kind == POS_INSIDE:
+        m = models[pos.index]
+        # Annualized classification mucking jazz
+        if growth(m):
+            return dfcmap['lcc_growth']
+        elif decline(m):
+            return dfcmap['lcc_decline']
+        return scaleprob(modelprob(m, ordinal, rank))
 
-    raise ValueError
+    if modelclass(models[pos.index], ordinal, rank) == modelclass(models[pos.index - 1], ordinal, rank):
+        return dfcmap['lcc_samelc']
+
+    return dfcmap['lcc_difflc']
+
+
+@lru_cache()
+def _xwalklut(items: tuple, dtype: str) -> np.ndarray:
+    """
+    Cached construction of the lookup table, see xwalklut.
+    """
+    dtype = np.dtype(dtype)
+    udtype = np.dtype(f'u{dtype.itemsize}')
+    info = np.iinfo(dtype)
+
+    # Identity table indexed by the unsigned view of the values, so that
+    # signed types work with the same single take.
+    lut = np.arange(2 ** (8 * dtype.itemsize), dtype=np.int64).astype(udtype).view(dtype)
+
+    for old, new in items:
+        if info.min <= old <= info.max:
+            lut[np.array(old, dtype=dtype).view(udtype)] = new
+
+    lut.setflags(write=False)
+
+    return lut
 
 
-def crosswalk(inarr: np.ndarray, xwalkmap: dict=_nlcdxwalk, **kwargs) -> np.ndarray:
+def xwalklut(xwalkmap: dict=_nlcdxwalk, dtype: np.dtype=np.uint8) -> np.ndarray:
+    """
+    Build a lookup table covering every value of an 8 or 16 bit integer type,
+    values not present in the mapping are passed through unchanged.
+
+    The table is indexed by the unsigned view of the data, use with
+    np.take(lut, arr.view(unsigned type)), which is what crosswalk does.
+
+    Args:
+        xwalkmap: mapping of how to crosswalk
+        dtype: integer data type of the values to crosswalk
+
+    Returns:
+        read-only lookup table of the given type
+    """
+    return _xwalklut(tuple(sorted(xwalkmap.items())), np.dtype(dtype).str)
+
+
+def crosswalk(inarr: np.ndarray, xwalkmap: dict=_nlcdxwalk, out: np.ndarray=None,
+              **kwargs) -> np.ndarray:
     """
     Cross-walks values in a data set to another set of values.
 
+    8 and 16 bit integer data is remapped through a precomputed lookup table
+    in a single indexing operation, anything else falls back to remapping one
+    value at a time.
+
     Args:
         inarr: values to crosswalk
         xwalkmap: mapping of how to crosswalk
+        out: optional array to write the results to, same shape and type as inarr
 
     Returns:
         np array of cross-walked values
     """
+    if inarr.dtype.kind in 'ui' and inarr.dtype.itemsize <= 2:
+        lut = xwalklut(xwalkmap, inarr.dtype)
+        idx = inarr.view(f'u{inarr.dtype.itemsize}')
+
+        return np.take(lut, idx, out=out)
 
-    outarr = np.copy(inarr)
+    if out is None:
+        outarr = np.copy(inarr)
+    else:
+        outarr = out
+        np.copyto(outarr, inarr)
 
     for old, new in xwalkmap.items():
         outarr[inarr == old] = new
@@ -355,6 +657,30 @@ def crosswalk(inarr: np.ndarray, xwalkmap: dict=_nlcdxwalk, **kwargs) -> np.ndar
     return outarr
 
 
+def crosswalkds(src: gdal.Dataset, dst: gdal.Dataset, xwalkmap: dict=_nlcdxwalk,
+                src_band: int=1, dst_band: int=1, rows: int=512) -> None:
+    """
+    Cross-walk a raster band into another data set, one strip of rows at a
+    time, so a whole tile never has to be held in memory.
+
+    Args:
+        src: gdal data set to read from
+        dst: gdal data set to write to, same dimensions as src
+        xwalkmap: mapping of how to crosswalk
+        src_band: band to read
+        dst_band: band to write
+        rows: approximate number of rows to process at a time
+    """
+    inband = src.GetRasterBand(src_band)
+    outband = dst.GetRasterBand(dst_band)
+
+    for col_off, row_off, num_cols, num_rows in windows(src, rows, src_band):
+        data = inband.ReadAsArray(col_off, row_off, num_cols, num_rows)
+        outband.WriteArray(crosswalk(data, xwalkmap), col_off, row_off)
+
+    outband.FlushCache()
+
+
 def lc_nodatafill(lc_arr: np.ndarray, nlcd: np.ndarray, lcc_arr: np.ndarray=None,
                   xwalk: bool=True, xwalkmap: dict=_nlcdxwalk,
                   dfcmap: dict=_dfc, **kwargs) -> Tuple[np.ndarray, np.ndarray]:
@@ -380,15 +706,229 @@ def lc_nodatafill(lc_arr: np.ndarray, nlcd: np.ndarray, lcc_arr: np.ndarray=None
     outlcc = None
 
     mask = outlc == dfcmap['lc_insuff']
-    outlc[mask] = nlcd[mask]
+    np.copyto(outlc, nlcd, where=mask, casting='unsafe')
 
-    if lcc_arr:
+    if lcc_arr is not None:
         outlcc = np.copy(lcc_arr)
-        outlcc[mask] = dfcmap['lccf_nomodel']
+        outlcc[mask] = dfcmap['lcc_nomodel']
 
     return outlc, outlcc
 
 
+def lc_nodatafillds(lc_ds: gdal.Dataset, nlcd_ds: gdal.Dataset, out_ds: gdal.Dataset,
+                    lcc_ds: gdal.Dataset=None, lccout_ds: gdal.Dataset=None,
+                    xwalk: bool=True, xwalkmap: dict=_nlcdxwalk, dfcmap: dict=_dfc,
+                    rows: int=512) -> None:
+    """
+    Windowed version of lc_nodatafill that works directly against gdal data
+    sets covering the same extent.
+
+    Args:
+        lc_ds: land cover data set
+        nlcd_ds: NLCD data set
+        out_ds: data set to write the filled land cover to
+        lcc_ds: land cover confidence data set
+        lccout_ds: data set to write the filled confidence to, required with lcc_ds
+        xwalk: boolean if the NLCD values need to be cross-walked
+        xwalkmap: mapping to on how to cross-walk the NLCD values
+        dfcmap: data format mapping, determines what values to assign for the
+            various conditionals that could occur
+        rows: approximate number of rows to process at a time
+    """
+    for col_off, row_off, num_cols, num_rows in windows(lc_ds, rows):
+        window = (col_off, row_off, num_cols, num_rows)
+
+        lcc = None
+        if lcc_ds is not None:
+            lcc = lcc_ds.GetRasterBand(1).ReadAsArray(*window)
+
+        outlc, outlcc = lc_nodatafill(lc_ds.GetRasterBand(1).ReadAsArray(*window),
+                                      nlcd_ds.GetRasterBand(1).ReadAsArray(*window),
+                                      lcc, xwalk, xwalkmap, dfcmap)
+
+        out_ds.GetRasterBand(1).WriteArray(outlc, col_off, row_off)
+
+        if outlcc is not None:
+            lccout_ds.GetRasterBand(1).WriteArray(outlcc, col_off, row_off)
+
+
+def _dateparts(ordinals: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Vectorized year, day of year, and previous year ordinal for an array of
+    python ordinals.
+    """
+    days = (np.asarray(ordinals, dtype=np.int64) - __epochord).astype('datetime64[D]')
+    years = days.astype('datetime64[Y]')
+    months = days.astype('datetime64[M]')
+
+    doy = (days - years.astype('datetime64[D]')).astype(np.int64) + 1
+    prev = np.minimum((months - 12).astype('datetime64[D]') + (days - months.astype('datetime64[D]')),
+                      (months - 11).astype('datetime64[D]') - 1)
+
+    return (years.astype(np.int64) + 1970,
+            doy,
+            prev.astype(np.int64) + __epochord)
+
+
+@lru_cache()
+def datelut(begin: str='1950-01-01', end: str='2100-12-31') -> DateLUT:
+    """
+    Build the date lookup tables covering the archive span, so the products
+    never need to build datetime objects per model.
+
+    Args:
+        begin: first date in the tables, YYYY-MM-DD
+        end: last date in the tables, YYYY-MM-DD
+
+    Returns:
+        DateLUT
+    """
+    offset = dt.datetime.strptime(begin, '%Y-%m-%d').toordinal()
+    ords = np.arange(offset, dt.datetime.strptime(end, '%Y-%m-%d').toordinal() + 1)
+    years, doy, prev = _dateparts(ords)
+
+    return DateLUT(offset=offset,
+                   year=years.astype(np.int16),
+                   doy=doy.astype(np.int16),
+                   prevyear=prev.astype(np.int32))
+
+
+@lru_cache()
+def _datelists() -> Tuple[int, list, list, list]:
+    """
+    The date lookup tables as python lists, indexing a list is a good deal
+    quicker than pulling scalars out of an ndarray one at a time.
+    """
+    lut = datelut()
+    return lut.offset, lut.year.tolist(), lut.doy.tolist(), lut.prevyear.tolist()
+
+
+def ordyear(ordinal: int) -> int:
+    """
+    Calendar year of an ordinal date.
+
+    Args:
+        ordinal: standard python ordinal starting on day 1 of year 1
+
+    Returns:
+        year
+    """
+    offset, years, _, _ = _datelists()
+    idx = ordinal - offset
+
+    if 0 <= idx < len(years):
+        return years[idx]
+
+    return dt.date.fromordinal(ordinal).year
+
+
+def ordyeardoy(ordinal: int) -> Tuple[int, int]:
+    """
+    Calendar year and day of year of an ordinal date.
+
+    Args:
+        ordinal: standard python ordinal starting on day 1 of year 1
+
+    Returns:
+        year, day of year
+    """
+    offset, years, doys, _ = _datelists()
+    idx = ordinal - offset
+
+    if 0 <= idx < len(years):
+        return years[idx], doys[idx]
+
+    date = dt.date.fromordinal(ordinal)
+    return date.year, date.timetuple().tm_yday
+
+
+def prevyear(ordinal: int) -> int:
+    """
+    Ordinal for the same month and day in the previous year. Feb 29th maps to
+    Feb 28th.
+
+    Args:
+        ordinal: standard python ordinal starting on day 1 of year 1
+
+    Returns:
+        ordinal
+    """
+    offset, _, _, prevs = _datelists()
+    idx = ordinal - offset
+
+    if 0 <= idx < len(prevs):
+        return prevs[idx]
+
+    return int(_dateparts([ordinal])[2][0])
+
+
+def breakyears(breaks: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Vectorized calendar year and day of year for an array of break days.
+    Break days of 0, no break, come back as year 0 and day 0.
+
+    Args:
+        breaks: break day ordinals
+
+    Returns:
+        years, days of year
+    """
+    breaks = np.asarray(breaks, dtype=np.int64)
+    lut = datelut()
+    idx = breaks - lut.offset
+    inlut = (idx >= 0) & (idx < len(lut.year))
+
+    years = np.zeros(breaks.shape, dtype=np.int64)
+    doy = np.zeros(breaks.shape, dtype=np.int64)
+    years[inlut] = lut.year[idx[inlut]]
+    doy[inlut] = lut.doy[idx[inlut]]
+
+    outside = ~inlut & (breaks > 0)
+    if outside.any():
+        years[outside], doy[outside], _ = _dateparts(breaks[outside])
+
+    return years, doy
+
+
+def chipchange(chip: CCDCChip, ordinal: int,
+               bands: Sequence=_chg_magbands) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Whole chip equivalent of chg_doy and chg_mag, done as array operations
+    over the packed segments.
+
+    Args:
+        chip: CCDCChip container
+        ordinal: standard python ordinal starting on day 1 of year 1
+        bands: spectral band names to perform the magnitude calculation over
+
+    Returns:
+        change day of year, change magnitude, one value per pixel
+    """
+    npix = len(chip.offsets) - 1
+    doy = np.zeros(npix, dtype=np.int64)
+    mag = np.zeros(npix, dtype=np.float64)
+
+    if ordinal <= 0:
+        return doy, mag
+
+    segs = chip.segments
+    years, doys = breakyears(segs.break_day)
+    hits = np.flatnonzero((segs.break_day > 0) &
+                          (years == ordyear(ordinal)) &
+                          (segs.change_prob == 1))
+
+    # First change in the year for each pixel
+    pixel = np.repeat(np.arange(npix), np.diff(chip.offsets))
+    pix, first = np.unique(pixel[hits], return_index=True)
+    sel = hits[first]
+
+    bidx = [chip.band_names.index(b) for b in bands if b in chip.band_names]
+    doy[pix] = doys[sel]
+    mag[pix] = np.linalg.norm(segs.magnitude[sel][:, bidx], axis=1)
+
+    return doy, mag
+
+
 def lc_primary(models: Sequence, ordinal: int, dfcmap: dict=_dfc,
                fill_begin: bool=True, fill_end: bool=True, fill_samelc: bool=True,
                fill_difflc: bool=True, fill_nodata: bool=True, fill_nodataval: int=None,
@@ -406,17 +946,17 @@ def lc_secondary(models: Sequence, ordinal: int, dfcmap: dict=_dfc,
 
 
 def lc_primaryconf(models: Sequence, ordinal: int, dfcmap: dict=_dfc, **kwargs) -> int:
-    return landcover_conf(models, ordinal, 0, dfcmap)
+    return landcover_conf(models, ordinal, 0, dfcmap, **kwargs)
 
 
 def lc_secondaryconf(models: Sequence, ordinal: int, dfcmap: dict=_dfc, **kwargs) -> int:
-    return landcover_conf(models, ordinal, 1, dfcmap)
+    return landcover_conf(models, ordinal, 1, dfcmap, **kwargs)
 
 
 def lc_fromto(models: Sequence, ordinal: int, dfcmap: dict=_dfc,
               fill_begin: bool=True, fill_end: bool=True, fill_samelc: bool=True,
               fill_difflc: bool=True, fill_nodata: bool=True, fill_nodataval: int=None,
-              **kwargs) -> int:
+              pos: Position=None, **kwargs) -> int:
     """
     Traditional from-to for the primary land cover.
 
@@ -436,17 +976,15 @@ def lc_fromto(models: Sequence, ordinal: int, dfcmap: dict=_dfc,
             if the date falls after the break date, then use the second
         fill_nodata: whether fill where there is no models at all
         fill_nodataval: value to use when there is no data
+        pos: precomputed position of the ordinal relative to the models
 
     Returns:
         fromto value
 
     """
-    prev_yr = dt.date.fromordinal(ordinal)
-    prev_yr = dt.date(year=prev_yr.year - 1, month=prev_yr.month, day=prev_yr.day)
-
     curr = lc_primary(models, ordinal, dfcmap, fill_begin, fill_end, fill_samelc, 
-                      fill_difflc, fill_nodata, fill_nodataval, **kwargs)
-    prev = lc_primary(models, prev_yr.toordinal(), dfcmap, fill_begin, fill_end, fill_samelc, 
+                      fill_difflc, fill_nodata, fill_nodataval, pos=pos, **kwargs)
+    prev = lc_primary(models, prevyear(ordinal), dfcmap, fill_begin, fill_end, fill_samelc, 
                       fill_difflc, fill_nodata, fill_nodataval, **kwargs)
 
     if prev == curr:
@@ -468,19 +1006,19 @@ def chg_doy(models: Sequence, ordinal: int, **kwargs) -> int:
         day of year or 0
 
     """
-    if ordinal <= 0 or not models:
+    if ordinal <= 0 or len(models) == 0:
         return 0
 
-    query_date = dt.date.fromordinal(ordinal)
+    year = ordyear(ordinal)
 
     for m in models:
         if m.break_day <= 0:
             continue
 
-        break_date = dt.date.fromordinal(m.break_day)
+        break_year, break_doy = ordyeardoy(m.break_day)
 
-        if query_date.year == break_date.year and m.change_prob == 1:
-            return break_date.timetuple().tm_yday
+        if year == break_year and m.change_prob == 1:
+            return break_doy
 
     return 0
 
@@ -499,47 +1037,50 @@ def chg_mag(models: Sequence, ordinal: int, bands: Sequence=_chg_magbands, **kwa
         magnitude or 0
 
     """
-    if ordinal <= 0 or not models:
+    if ordinal <= 0 or len(models) == 0:
         return 0
 
-    query_date = dt.date.fromordinal(ordinal)
+    year = ordyear(ordinal)
 
     for m in models:
         if m.break_day <= 0:
             continue
 
-        break_date = dt.date.fromordinal(m.break_day)
-
-        if query_date.year == break_date.year and m.change_prob == 1:
-            mags = [b.magnitude for b in m.bands if b.name in bands]
+        if year == ordyear(m.break_day) and m.change_prob == 1:
+            mags = [band.magnitude for band in (bandmodel(m, b) for b in bands)
+                    if band is not None]
             return np.linalg.norm(mags)
 
     return 0
 
 
-def chg_modelqa(models: Sequence, ordinal: int, **kwargs) -> int:
+def chg_modelqa(models: Sequence, ordinal: int, pos: Position=None, **kwargs) -> int:
     """
     Information on the quality of the curve fit the intercept the ordinal date.
 
     Args:
         models: sorted sequence of CCDC namedtuples that represent the pixel history
         ordinal: standard python ordinal starting on day 1 of year 1
+        pos: precomputed position of the ordinal relative to the models
 
     Returns:
         curve_qa or 0
 
     """
-    if ordinal <= 0 or not models:
+    if ordinal <= 0 or len(models) == 0:
         return 0
 
-    for m in models:
-        if m.start_day <= ordinal <= m.end_day:
-            return m.curve_qa
+    if pos is None:
+        pos = position(models, ordinal)
+
+    if pos.kind == POS_INSIDE:
+        return models[pos.index].curve_qa
 
     return 0
 
 
-def chg_seglength(models: Sequence, ordinal: int, ordbegin: int=__ordbegin, **kwargs) -> int:
+def chg_seglength(models: Sequence, ordinal: int, ordbegin: int=__ordbegin,
+                  pos: Position=None, **kwargs) -> int:
     """
     How long, in days, has the current model been underway. This includes
     between or outside of CCD segments as well.
@@ -548,6 +1089,7 @@ def chg_seglength(models: Sequence, ordinal: int, ordbegin: int=__ordbegin, **kw
         models: sorted sequence of CCDC namedtuples that represent the pixel history
         ordinal: standard python ordinal starting on day 1 of year 1
         ordbegin: when to start counting from
+        pos: precomputed position of the ordinal relative to the models
 
     Returns:
         number of days
@@ -555,12 +1097,16 @@ def chg_seglength(models: Sequence, ordinal: int, ordbegin: int=__ordbegin, **kw
     if ordinal <= 0:
         return 0
 
+    if pos is None:
+        pos = position(models, ordinal)
+
     diff = [ordinal - ordbegin]
-    for m in models:
-        if ordinal > m.end_day:
-            diff.append(ordinal - m.end_day)
-        else:
-            diff.append(ordinal - m.start_day)
+    if pos.kind == POS_INSIDE:
+        diff.append(ordinal - models[pos.index].start_day)
+    elif pos.kind in (POS_PREBREAK, POS_POSTBREAK):
+        diff.append(ordinal - models[pos.index - 1].end_day)
+    elif pos.kind == POS_AFTER:
+        diff.append(ordinal - models[-1].end_day)
 
     return min(filter(lambda x: x >= 0, diff), default=0)
 
@@ -577,7 +1123,7 @@ def chg_lastbrk(models: Sequence, ordinal: int, **kwargs) -> int:
     Returns:
         number of days
     """
-    if ordinal <= 0 or not models:
+    if ordinal <= 0 or len(models) == 0:
         return 0
 
     diff = [(ordinal - m.break_day) for m in models if m.change_prob == 1]
@@ -605,41 +1151,30 @@ def predict(band: BandModel, ordinal: int) -> float:
             band.intercept + sl * ordinal)
 
 
-def syntheticselect(models: Sequence, ordinal: int) -> Union[CCDCModel, None]:
+def syntheticselect(models: Sequence, ordinal: int, pos: Position=None) -> Union[CCDCModel, None]:
     """
     Select a model to build predictions from.
 
     Args:
         models: sorted sequence of CCDC namedtuples that represent the pixel history
         ordinal: standard python ordinal starting on day 1 of year 1
+        pos: precomputed position of the ordinal relative to the models
 
     Returns:
         model
     """
-    if not models:
+    if len(models) == 0:
         return None
 
-    # ord date before time series models -> cover back
-    if ordinal < models[0].start_day:
-        return models[0]
-
-    # ord date after time series models -> cover forward
-    if ordinal > models[-1].end_day:
-        return models[-1]
-
-    prev_br = 0
-    for m in models:
-        # Date is contained within the model
-        if m.start_day <= ordinal <= m.end_day:
-            return m
-        elif prev_br <= ordinal < m.start_day:
-            return m
-        elif m.end_day < ordinal < m.break_day:
-            return m
+    if pos is None:
+        pos = position(models, ordinal)
 
-        prev_br = m.break_day
+    # Between models and before the break, use the model that is breaking.
+    # Otherwise before, after, or within, the position already points at it.
+    if pos.kind == POS_PREBREAK:
+        return models[pos.index - 1]
 
-    raise ValueError
+    return models[pos.index]
 
 
 def kelvin(therm: float) -> float:
@@ -656,30 +1191,34 @@ def kelvin(therm: float) -> float:
     return therm / 10 + 27315
 
 
-def synthetic(models: Sequence, ordinal: int, **kwargs) -> List[int]:
+def synthetic(models: Sequence, ordinal: int, pos: Position=None, **kwargs) -> List[int]:
     """
     Do the model predictions in order to produce fake imagery.
 
     Args:
         models: sorted sequence of CCDC namedtuples that represent the pixel history
         ordinal: standard python ordinal starting on day 1 of year 1
+        pos: precomputed position of the ordinal relative to the models
 
     Returns:
         blue, green, red, nir, swir1, swir2, thermal values
     """
-    model = syntheticselect(models, ordinal)
+    model = syntheticselect(models, ordinal, pos)
 
     if model is None:
         return [0] * 7
 
     vals = []
     for name in ('blue', 'green', 'red', 'nir', 'swir1', 'swir2', 'thermal'):
-        for band in model.bands:
-            if band.name == name:
-                if name == 'thermal':
-                    vals.append(int(kelvin(predict(band, ordinal))))
-                else:
-                    vals.append(int(predict(band, ordinal)))
+        band = bandmodel(model, name)
+
+        if band is None:
+            continue
+
+        if name == 'thermal':
+            vals.append(int(kelvin(predict(band, ordinal))))
+        else:
+            vals.append(int(predict(band, ordinal)))
 
     return vals
 
@@ -708,6 +1247,26 @@ def prodmap() -> dict:
             'Synthetic': [synthetic, gdal.GDT_UInt16]}
 
 
+def prodvalues(models: Sequence, ordinal: int, names: Sequence[str], **kwargs) -> dict:
+    """
+    Compute several products for a pixel and date, working out where the date
+    falls relative to the models just once and sharing it between them.
+
+    Args:
+        models: sorted sequence of CCDC namedtuples that represent the pixel history
+        ordinal: standard python ordinal starting on day 1 of year 1
+        names: product names from prodmap
+        **kwargs: passed along to the product functions
+
+    Returns:
+        dictionary of product name -> value
+    """
+    prods = prodmap()
+    pos = position(models, ordinal)
+
+    return {name: prods[name][0](models, ordinal, pos=pos, **kwargs) for name in names}
+
+
 def is_lc(name: str) -> bool:
     """
     Helper function to identify if a product is a land cover thematic product.
@@ -4,7 +4,7 @@ Functions handling spatial coordinates, and reading/writing rasters.
 
 import os
 from functools import lru_cache
-from typing import Tuple, List
+from typing import Tuple, List, Iterator
 
 from osgeo import gdal
 import numpy as np
@@ -104,6 +104,28 @@ def writep(path: str, data: np.ndarray,
     return
 
 
+def windows(ds: gdal.Dataset, rows: int=512,
+            band: int=1) -> Iterator[Tuple[int, int, int, int]]:
+    """
+    Break a raster up into full width strips for windowed processing. The
+    strip height is rounded up to a multiple of the band's block height so
+    reads line up with how the data is stored.
+
+    Args:
+        ds: gdal data set
+        rows: approximate number of rows per strip
+        band: band to use for the block size
+
+    Returns:
+        generator of col_off, row_off, num_cols, num_rows
+    """
+    block_rows = max(ds.GetRasterBand(band).GetBlockSize()[1], 1)
+    step = -(-rows // block_rows) * block_rows
+
+    for row_off in range(0, ds.RasterYSize, step):
+        yield 0, row_off, ds.RasterXSize, min(step, ds.RasterYSize - row_off)
+
+
 def readrc(path: str, col_off: int=0, row_off: int=0, 
            num_cols: int=None, num_rows: int=None, band: int=1) -> np.ndarray:
     """
@@ -0,0 +1,428 @@
+"""
+A simple work queue kept on a shared file system, so that several hosts can
+pull product generation work from the same pool.
+
+Each work unit is a small JSON file that moves between directories:
+
+    todo/<unit>.json -> claimed/<unit>@<worker>.json -> done/<unit>.json
+                                                     -> failed/<unit>.json
+
+Claiming is done with a rename, which is atomic on the same file system, so
+only one worker ever gets a unit. A claimed unit's modification time is its
+lease; the worker keeps touching it while the unit is running. Units whose
+lease has expired, because the worker died, are put back in todo for someone
+else to pick up.
+"""
+
+import os
+import json
+import time
+import hashlib
+import socket
+import logging
+import threading
+import multiprocessing as mp
+from typing import Callable, Tuple, Union, Sequence
+
+from mapify.build import buildtile
+
+
+log = logging.getLogger()
+
+TODO = 'todo'
+CLAIMED = 'claimed'
+DONE = 'done'
+FAILED = 'failed'
+STATS = 'stats'
+
+
+def initqueue(root: str) -> str:
+    """
+    Make sure the queue directories exist.
+
+    Args:
+        root: queue directory
+
+    Returns:
+        the queue directory
+    """
+    for d in (TODO, CLAIMED, DONE, FAILED, STATS):
+        os.makedirs(os.path.join(root, d), exist_ok=True)
+
+    return root
+
+
+def _writejson(path: str, obj: dict) -> None:
+    """
+    Write JSON next to the destination and rename it into place, so readers
+    never see a partial file.
+    """
+    tmp = f'{path}.{os.getpid()}.tmp'
+
+    with open(tmp, 'w') as f:
+        json.dump(obj, f)
+
+    os.replace(tmp, path)
+
+
+def _readjson(path: str) -> Union[dict, None]:
+    """
+    Read a JSON file, None if it isn't there or can't be read.
+    """
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def unitname(path: str) -> str:
+    """
+    Pull the unit id from a queue file path.
+
+    Args:
+        path: file path in any of the queue directories
+
+    Returns:
+        unit id
+    """
+    return os.path.split(path)[-1][:-5].split('@')[0]
+
+
+def enqueue(root: str, unit: str, payload: dict) -> str:
+    """
+    Add a unit of work to the queue.
+
+    Args:
+        root: queue directory
+        unit: unique id for the unit, can't contain '@'
+        payload: JSON serializable arguments for the work function
+
+    Returns:
+        path to the queued file
+    """
+    if '@' in unit:
+        raise ValueError(f'Unit id cannot contain @: {unit}')
+
+    path = os.path.join(root, TODO, f'{unit}.json')
+    _writejson(path, payload)
+
+    return path
+
+
+def claim(root: str, worker: str) -> Union[Tuple[str, dict], None]:
+    """
+    Claim the next available unit of work.
+
+    Args:
+        root: queue directory
+        worker: worker id
+
+    Returns:
+        path to the claimed file and its payload, or None if nothing is available
+    """
+    todo = os.path.join(root, TODO)
+
+    for name in sorted(os.listdir(todo)):
+        if not name.endswith('.json'):
+            continue
+
+        src = os.path.join(todo, name)
+        dst = os.path.join(root, CLAIMED, f'{name[:-5]}@{worker}.json')
+
+        try:
+            # Start the lease before the rename, otherwise the claimed file
+            # still carries its enqueue time and could look expired
+            os.utime(src)
+            os.rename(src, dst)
+        except FileNotFoundError:
+            # Somebody else got to it first
+            continue
+
+        with open(dst, 'r') as f:
+            return dst, json.load(f)
+
+    return None
+
+
+def renew(path: str) -> bool:
+    """
+    Extend the lease on a claimed unit.
+
+    Args:
+        path: claimed file path
+
+    Returns:
+        False if the lease has been lost
+    """
+    try:
+        os.utime(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def _finish(root: str, path: str, state: str) -> bool:
+    try:
+        os.rename(path, os.path.join(root, state, f'{unitname(path)}.json'))
+        return True
+    except FileNotFoundError:
+        log.warning(f'Lease lost on {path}')
+        return False
+
+
+def complete(root: str, path: str) -> bool:
+    """
+    Mark a claimed unit as done.
+
+    Args:
+        root: queue directory
+        path: claimed file path
+
+    Returns:
+        False if the lease had already been lost
+    """
+    return _finish(root, path, DONE)
+
+
+def fail(root: str, path: str) -> bool:
+    """
+    Mark a claimed unit as failed, so it isn't picked up again.
+
+    Args:
+        root: queue directory
+        path: claimed file path
+
+    Returns:
+        False if the lease had already been lost
+    """
+    return _finish(root, path, FAILED)
+
+
+def reclaim(root: str, lease: float) -> int:
+    """
+    Put units with expired leases back in the queue.
+
+    Args:
+        root: queue directory
+        lease: lease length in seconds
+
+    Returns:
+        number of units put back
+    """
+    claimed = os.path.join(root, CLAIMED)
+    now = time.time()
+    count = 0
+
+    for name in os.listdir(claimed):
+        path = os.path.join(claimed, name)
+
+        try:
+            if now - os.stat(path).st_mtime < lease:
+                continue
+
+            os.rename(path, os.path.join(root, TODO, f'{unitname(path)}.json'))
+        except FileNotFoundError:
+            continue
+
+        log.warning(f'Lease expired on {name}, putting it back in the queue')
+        count += 1
+
+    return count
+
+
+def pending(root: str) -> int:
+    """
+    Number of units that are still queued or running.
+
+    Args:
+        root: queue directory
+
+    Returns:
+        unit count
+    """
+    return len(os.listdir(os.path.join(root, TODO))) + len(os.listdir(os.path.join(root, CLAIMED)))
+
+
+def _keepalive(path: str, interval: float, stop: threading.Event) -> None:
+    while not stop.wait(interval):
+        if not renew(path):
+            return
+
+
+def worker(root: str, func: Callable, worker_id: str=None, lease: float=300,
+           poll: float=5, exit_empty: bool=True) -> dict:
+    """
+    Pull units from the queue and run them until the queue is empty.
+
+    A worker id that already has stats, from an earlier run, adds to them
+    rather than starting over.
+
+    Args:
+        root: queue directory
+        func: function to call with the unit payload as keyword arguments
+        worker_id: unique worker id, defaults to host-pid
+        lease: lease length in seconds, renewed every third of that while running
+        poll: seconds to wait when there is nothing to claim
+        exit_empty: return once nothing is left queued or running
+
+    Returns:
+        worker stats
+    """
+    host = socket.gethostname()
+
+    if worker_id is None:
+        worker_id = f'{host}-{os.getpid()}'
+
+    statspath = os.path.join(root, STATS, f'{worker_id}.json')
+    stats = _readjson(statspath)
+
+    if stats is None:
+        stats = {'worker': worker_id,
+                 'host': host,
+                 'units': 0,
+                 'failed': 0,
+                 'lost': 0,
+                 'busy': 0.0,
+                 'started': time.time(),
+                 'updated': time.time()}
+
+    while True:
+        reclaim(root, lease)
+        claimed = claim(root, worker_id)
+
+        if claimed is None:
+            if exit_empty and pending(root) == 0:
+                break
+
+            time.sleep(poll)
+            continue
+
+        path, payload = claimed
+        log.debug(f'{worker_id} running {unitname(path)}')
+
+        stop = threading.Event()
+        keeper = threading.Thread(target=_keepalive, args=(path, lease / 3, stop), daemon=True)
+        keeper.start()
+
+        t0 = time.time()
+        failed = False
+        try:
+            func(**payload)
+            ok = complete(root, path)
+        except Exception:
+            log.exception(f'{worker_id} failed on {unitname(path)}')
+            failed = True
+            ok = fail(root, path)
+        finally:
+            stop.set()
+            keeper.join()
+
+        stats['busy'] += time.time() - t0
+        stats['units'] += ok and not failed
+        stats['failed'] += failed
+        stats['lost'] += not ok
+        stats['updated'] = time.time()
+        _writejson(statspath, stats)
+
+    return stats
+
+
+def nodestats(root: str) -> dict:
+    """
+    Aggregate the worker stats by host.
+
+    Args:
+        root: queue directory
+
+    Returns:
+        dictionary of host -> units, failed, lost, busy seconds, wall seconds
+        and units per hour
+    """
+    nodes = {}
+    statsdir = os.path.join(root, STATS)
+
+    for name in os.listdir(statsdir):
+        if not name.endswith('.json'):
+            continue
+
+        with open(os.path.join(statsdir, name), 'r') as f:
+            s = json.load(f)
+
+        node = nodes.setdefault(s['host'], {'workers': 0, 'units': 0, 'failed': 0, 'lost': 0,
+                                            'busy': 0.0, 'started': s['started'],
+                                            'updated': s['updated']})
+        node['workers'] += 1
+        for k in ('units', 'failed', 'lost', 'busy'):
+            node[k] += s[k]
+        node['started'] = min(node['started'], s['started'])
+        node['updated'] = max(node['updated'], s['updated'])
+
+    for node in nodes.values():
+        node['wall'] = node['updated'] - node['started']
+        node['per_hour'] = node['units'] / node['wall'] * 3600 if node['wall'] > 0 else 0.0
+
+    return nodes
+
+
+def tileunit(outdir: str) -> str:
+    """
+    Unit id for a tile build. The final directory name keeps it readable and a
+    hash of the full output path keeps it unique, since the same tile is often
+    built into more than one place, e.g. .../v1/h012v009 and .../v2/h012v009.
+
+    Args:
+        outdir: tile output directory
+
+    Returns:
+        unit id
+    """
+    path = os.path.normcase(os.path.abspath(outdir))
+    digest = hashlib.sha1(path.encode('utf-8')).hexdigest()[:12]
+
+    return '{}-{}'.format(os.path.basename(path).replace('@', '_'), digest)
+
+
+def enqueuetiles(root: str, tiles: Sequence[dict]) -> list:
+    """
+    Queue up tile builds, one unit per tile. Tiles are the unit of work, since
+    more than one host writing to the same GeoTIFF isn't safe.
+
+    Args:
+        root: queue directory
+        tiles: buildtile keyword arguments for each tile
+
+    Returns:
+        queued file paths
+    """
+    initqueue(root)
+
+    return [enqueue(root, tileunit(t['outdir']), t) for t in tiles]
+
+
+def runlocal(root: str, func: Callable=buildtile, nworkers: int=2, **kwargs) -> dict:
+    """
+    Run several workers against a queue on this machine, mainly for testing.
+
+    Args:
+        root: queue directory
+        func: function to call with each unit payload
+        nworkers: number of worker processes
+        **kwargs: passed along to worker
+
+    Returns:
+        per host stats
+    """
+    initqueue(root)
+
+    procs = [mp.Process(target=worker, args=(root, func),
+                        kwargs=dict(kwargs, worker_id=f'{socket.gethostname()}-local{i}'))
+             for i in range(nworkers)]
+
+    for p in procs:
+        p.start()
+
+    for p in procs:
+        p.join()
+
+    return nodestats(root)
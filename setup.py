@@ -30,7 +30,8 @@ setup(
         'lcmap-merlin==2.3.1'
     ],
 
-    entry_points={'gui_scripts': ['lcmap_tap = lcmap_tap.__main__:main']},
+    entry_points={'gui_scripts': ['lcmap_tap = lcmap_tap.__main__:main'],
+                  'console_scripts': ['lcmap_tap_batch = lcmap_tap.Plotting.batch:main']},
 
     python_requires='>=3.6',
 
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# mapify is imported as a top level package, as it is in its own repository
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'lcmap_tap'))
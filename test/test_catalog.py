@@ -0,0 +1,67 @@
+import os
+
+from lcmap_tap.Visualization.catalog import CATALOG_NAME, ProductCatalog
+
+_version = 'v2017.08.18'
+
+
+def _add(root, product_type, alias, years):
+    path = os.path.join(str(root), _version, product_type, alias)
+
+    os.makedirs(path, exist_ok=True)
+
+    for year in years:
+        open(os.path.join(path, '%s_%d.tif' % (alias, year)), 'w').close()
+
+
+def _age(root):
+    """
+    Set every directory's modification time well in the past, so a change made straight after the catalogue is saved
+    gets a different time even on file systems with coarse timestamps
+    """
+    for path, dirs, files in os.walk(str(root)):
+        os.utime(path, (1e9, 1e9))
+
+
+def test_saved_catalogue_is_used_while_nothing_changes(tmp_path):
+    _add(tmp_path, 'ChangeMaps', 'ChangeMap_color', (1984, 1985))
+    _age(tmp_path)
+
+    ProductCatalog.load(str(tmp_path))
+
+    catalog = ProductCatalog.read(str(tmp_path))
+
+    assert os.path.exists(os.path.join(str(tmp_path), CATALOG_NAME))
+    assert catalog.current()
+    assert catalog.years(_version, 'Change DOY') == [1984, 1985]
+
+
+def test_product_dir_added_after_saving_is_found(tmp_path):
+    _add(tmp_path, 'ChangeMaps', 'ChangeMap_color', (1984, 1985))
+    _age(tmp_path)
+
+    ProductCatalog.load(str(tmp_path))
+
+    # Under the existing ChangeMaps directory, and a CoverMaps directory that wasn't there before
+    _add(tmp_path, 'ChangeMaps', 'QAMap_color', (1984,))
+    _add(tmp_path, 'CoverMaps', 'CoverPrim_color', (1985,))
+
+    assert not ProductCatalog.read(str(tmp_path)).current()
+
+    catalog = ProductCatalog.load(str(tmp_path))
+
+    assert list(catalog.versions[_version]) == ['Change DOY', 'Change QA', 'Primary Land Cover']
+    assert catalog.years(_version, 'Change QA') == [1984]
+    assert catalog.default_version() == _version
+    assert ProductCatalog.read(str(tmp_path)).current()
+
+
+def test_file_added_after_saving_is_found(tmp_path):
+    _add(tmp_path, 'ChangeMaps', 'ChangeMap_color', (1984,))
+    _age(tmp_path)
+
+    ProductCatalog.load(str(tmp_path))
+
+    _add(tmp_path, 'ChangeMaps', 'ChangeMap_color', (1985,))
+
+    assert ProductCatalog.load(str(tmp_path)).years(_version, 'Change DOY') == [1984, 1985]
@@ -0,0 +1,83 @@
+import datetime as dt
+
+import numpy as np
+import pytest
+
+from lcmap_tap.Visualization.export import MARKER_COLOR, burn_marker, cloud_fraction, select_frames
+
+_start = dt.datetime(2000, 1, 1)
+
+
+class _Chips:
+    """
+    Just enough of Chips for select_frames, acquisitions with a given fraction of cloud
+    """
+    def __init__(self, clouds):
+        self.clouds = {(_start + dt.timedelta(days=day)).toordinal(): cloud for day, cloud in clouds.items()}
+        self.dates = np.array(sorted(self.clouds))
+
+    def qa_mosaic(self, date):
+        qa = np.full(100, 322, dtype=np.int16)
+        qa[:int(round(self.clouds[date.toordinal()] * 100))] = 352
+
+        return qa.reshape(10, 10)
+
+
+def _day(ordinal):
+    return (dt.datetime.fromordinal(ordinal) - _start).days
+
+
+def test_cloud_fraction_ignores_fill():
+    qa = np.array([322, 352, 1, 1])
+
+    assert cloud_fraction(qa) == 0.5
+    assert cloud_fraction(np.ones(4)) == 1.0
+
+
+def test_select_frames_takes_the_clearest_acquisition_of_each_period():
+    chips = _Chips({0: 0.2, 5: 0.1, 9: 0.3, 12: 0.6, 15: 0.7, 22: 0.4, 25: 0.0, 40: 0.0})
+
+    frames = select_frames(chips, _start, _start + dt.timedelta(days=30), cadence=10, max_cloud=0.5)
+
+    # Days 10 to 19 are all too cloudy and day 40 is past the end
+    assert [_day(d) for d, cloud in frames] == [5, 25]
+    assert [cloud for d, cloud in frames] == pytest.approx([0.1, 0.0])
+
+
+def test_select_frames_with_a_daily_cadence_uses_every_clear_acquisition():
+    chips = _Chips({0: 0.2, 1: 0.9, 2: 0.3})
+
+    frames = select_frames(chips, _start, _start + dt.timedelta(days=2), cadence=1, max_cloud=0.5)
+
+    assert [_day(d) for d, cloud in frames] == [0, 2]
+
+
+def test_burn_marker_outlines_the_enlarged_pixel():
+    rgb = np.arange(3 * 4 * 3, dtype=np.uint8).reshape(3, 4, 3)
+
+    out = burn_marker(rgb, 1, 2, scale=4)
+
+    assert out.shape == (12, 16, 3)
+
+    outline = np.zeros(out.shape[:2], dtype=bool)
+    outline[3, 7:13] = outline[8, 7:13] = outline[3:9, 7] = outline[3:9, 12] = True
+
+    assert (out[outline] == MARKER_COLOR).all()
+
+    # The pixel itself and everything off the outline is the enlarged image
+    enlarged = np.repeat(np.repeat(rgb, 4, axis=0), 4, axis=1)
+
+    assert (out[~outline] == enlarged[~outline]).all()
+    assert (out[4:8, 8:12] == rgb[1, 2]).all()
+    assert (rgb == np.arange(3 * 4 * 3).reshape(3, 4, 3)).all()
+
+
+def test_burn_marker_leaves_off_sides_outside_the_image():
+    rgb = np.zeros((2, 2, 3), dtype=np.uint8)
+
+    out = burn_marker(rgb, 0, 0)
+
+    expected = np.zeros((2, 2), dtype=bool)
+    expected[1, :2] = expected[:2, 1] = True
+
+    assert ((out == MARKER_COLOR).all(axis=-1) == expected).all()
@@ -0,0 +1,139 @@
+import copy
+import gc
+import sys
+
+try:
+    import resource
+
+except ImportError:
+    # Not available on Windows, only the open figure count is checked there
+    resource = None
+
+import matplotlib
+matplotlib.use('Agg')
+
+import numpy as np
+import pytest
+from matplotlib import pyplot as plt
+
+from lcmap_tap.Plotting import make_plots, DEFAULTS, LEG_DEFAULTS
+from lcmap_tap.Plotting.figures import FIGURES
+from lcmap_tap.Plotting.plot_specs import PlotSpecs
+
+_bands = ('blue', 'green', 'red', 'nir', 'swir1', 'swir2', 'thermal')
+
+_items = ['Red', 'NIR', 'NDVI']
+
+
+class _Change:
+    def __init__(self, results):
+        self.results = results
+
+
+def _pixel(rng):
+    """
+    Fake ARD observations and PyCCD results for one pixel
+    """
+    n = 800
+    ard = {'dates': np.sort(rng.randint(724000, 737000, n)),
+           'qas': rng.choice([1, 66, 322, 224], n)}
+
+    for b in _bands:
+        ard[b + 's'] = rng.randint(0, 5000, n)
+
+    models = []
+    for start, end in ((724100, 728000), (728050, 733000), (733100, 736900)):
+        m = {'start_day': start, 'end_day': end, 'break_day': end + 30, 'curve_qa': 8,
+             'change_probability': 1, 'observation_count': 100}
+
+        for b in _bands:
+            m[b] = {'intercept': rng.normal(0, 1e4), 'magnitude': 0.0, 'rmse': 100.0,
+                    'coefficients': list(rng.normal(0, 100, 7) * [1e-2, 1, 1, 1, 1, 1, 1])}
+
+        models.append(m)
+
+    return ard, _Change({'change_models': models, 'processing_mask': [1] * n})
+
+
+def _peak_rss():
+    """
+    Peak resident memory of the process in bytes, None where it isn't available
+    """
+    if resource is None:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # Bytes on macOS, KB elsewhere
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+@pytest.fixture
+def config():
+    return {'DEFAULTS': copy.deepcopy(DEFAULTS), 'LEG_DEFAULTS': copy.deepcopy(LEG_DEFAULTS)}
+
+
+def test_plotting_many_pixels_keeps_memory_bounded(config):
+    rng = np.random.RandomState(0)
+    fig = None
+    start = None
+
+    for i in range(200):
+        ard, change = _pixel(rng)
+        specs = PlotSpecs(ard, change, None, _items)
+
+        if fig is not None:
+            FIGURES.close(fig)
+
+        fig, artist_map, lines_map, axes = make_plots.draw_figure(specs, _items, i + 1, config)
+
+        assert len(plt.get_fignums()) <= 1
+
+        # Measure from after the first few plots, once module level caches have been filled
+        if i == 20:
+            gc.collect()
+            start = _peak_rss()
+
+    FIGURES.close(fig)
+
+    assert plt.get_fignums() == []
+
+    if start is not None:
+        gc.collect()
+
+        # A figure is a few MB, keeping the 180 figures drawn since the start would be hundreds
+        assert _peak_rss() - start < 50e6
+
+
+def _curves(artist_map):
+    return [(info[0], artist) for artist, info in artist_map.items() if isinstance(info, list) and len(info) == 4]
+
+
+def test_model_curves_follow_every_change_of_view(config):
+    ard, change = _pixel(np.random.RandomState(1))
+    specs = PlotSpecs(ard, change, None, _items)
+
+    fig, artist_map, lines_map, axes = make_plots.draw_figure(specs, _items, 1, config)
+    make_plots.follow_view(specs, artist_map, axes)
+
+    full = axes[0, 0].get_xlim()
+    assert all(len(days) for days, artist in _curves(artist_map))
+
+    # A toolbar pan or zoom sets the limits of whichever subplot it was used in
+    axes[-1, 0].set_xlim(729000, 729100)
+
+    for days, artist in _curves(artist_map):
+        if len(days):
+            assert days[0] >= 729000 and days[-1] <= 729100
+            assert np.array_equal(artist.get_xdata(), days)
+
+    # Zoomed in this far the model spanning the view is sampled every day
+    assert max(len(days) for days, artist in _curves(artist_map)) == 101
+
+    # Home puts back the original limits, the curves cover all of it again
+    axes[1, 0].set_xlim(full)
+
+    assert [(days[0], days[-1]) for days, artist in _curves(artist_map)] == \
+        [(start, end) for start, end in zip(specs.start_dates, specs.end_dates)] * len(_items)
+
+    FIGURES.close(fig)
@@ -0,0 +1,106 @@
+import os
+import json
+
+import pytest
+
+from mapify import build
+from mapify import manifest as mf
+
+_names = ['Chg_ChangeMag', 'LC_Primary']
+_dates = ['2000-07-01', '2010-07-01']
+
+
+class _Builds:
+    """
+    Stands in for buildchip, recording the chips built and writing empty product files so the tile looks complete
+    """
+    def __init__(self, fail_on: str=None):
+        self.chips = []
+        self.params = []
+        self.fail_on = fail_on
+
+    def __call__(self, jpath, ppath, names, dates, outdir, params, datasets):
+        key = '{}_{}'.format(*build.pathcoords(jpath))
+
+        if key == self.fail_on:
+            self.fail_on = None
+            raise KeyboardInterrupt(key)
+
+        for name in names:
+            for date in dates:
+                open(build.prodpath(outdir, name, date), 'a').close()
+
+        self.chips.append(key)
+        self.params.append(params)
+
+
+@pytest.fixture
+def tile(tmp_path):
+    jroot, proot = tmp_path / 'json', tmp_path / 'pickle'
+    jroot.mkdir()
+    proot.mkdir()
+
+    keys = []
+    for i in range(5):
+        x, y = -2565585 + i * 3000, 3314805
+        (jroot / f'H12V09_{x}_{y}.json').write_text(json.dumps([]))
+        (proot / f'H12V09_{x}_{y}_class.p').write_bytes(b'')
+        keys.append(f'{x}_{y}')
+
+    # In the order the chips are built, by file name
+    return str(jroot), str(proot), str(tmp_path / 'out'), sorted(keys)
+
+
+def _run(monkeypatch, tile, builds, **kwargs):
+    jroot, proot, outdir, keys = tile
+    monkeypatch.setattr(build, 'buildchip', builds)
+
+    return build.buildtile(jroot, proot, outdir, _names, _dates, **kwargs)
+
+
+def test_rebuild_only_recomputes_the_changed_chip(monkeypatch, tile):
+    jroot, proot, outdir, keys = tile
+
+    assert _run(monkeypatch, tile, _Builds()) == (5, 0)
+
+    changed = os.path.join(jroot, 'H12V09_{}_{}.json'.format(*keys[2].split('_')))
+    stat = os.stat(changed)
+    os.utime(changed, (stat.st_atime, stat.st_mtime + 10))
+
+    builds = _Builds()
+
+    assert _run(monkeypatch, tile, builds) == (1, 4)
+    assert builds.chips == [keys[2]]
+
+
+def test_changed_params_rebuild_every_chip(monkeypatch, tile):
+    jroot, proot, outdir, keys = tile
+
+    _run(monkeypatch, tile, _Builds())
+
+    builds = _Builds()
+
+    assert _run(monkeypatch, tile, builds, params={'fill_nodataval': 255}) == (5, 0)
+    assert builds.chips == keys
+
+
+def test_interrupted_build_resumes_after_the_last_chip(monkeypatch, tile):
+    jroot, proot, outdir, keys = tile
+
+    with pytest.raises(KeyboardInterrupt):
+        _run(monkeypatch, tile, _Builds(fail_on=keys[3]))
+
+    assert sorted(mf.load(os.path.join(outdir, build.MANIFEST_NAME))['chips']) == sorted(keys[:3])
+
+    builds = _Builds()
+
+    assert _run(monkeypatch, tile, builds) == (2, 3)
+    assert builds.chips == keys[3:]
+
+
+def test_params_keep_the_default_fill_value(monkeypatch, tile):
+    builds = _Builds()
+
+    _run(monkeypatch, tile, builds, params={'fill_difflc': False})
+
+    assert builds.params[0] == {'fill_nodataval': 0, 'fill_difflc': False}
@@ -0,0 +1,57 @@
+import datetime as dt
+
+import numpy as np
+import pytest
+
+from mapify.benchmark import synthchip
+from mapify.ccdc import spatialccdc
+from mapify.products import prodmap, prodvalues, packmodels, chipmodels, bandmodel, scaleprob
+
+_dates = ('1985-07-01', '1999-07-01', '2000-02-29', '2012-07-01', '2018-07-01')
+
+_bands = ('swir2', 'thermal', 'blue', 'nir', 'red', 'green', 'swir1')
+
+
+@pytest.fixture(scope='module')
+def chip():
+    jdata, pdata = synthchip(seed=7)
+
+    return spatialccdc(jdata, pdata), spatialccdc(jdata, pdata, packed=True)
+
+
+def test_packed_products_match_namedtuples(chip):
+    models, packed = chip
+    names = list(prodmap())
+
+    for date in _dates:
+        ordinal = dt.datetime.strptime(date, '%Y-%m-%d').toordinal()
+
+        for m, p in zip(models, chipmodels(packed)):
+            assert prodvalues(m, ordinal, names, fill_nodataval=0) == \
+                   prodvalues(p, ordinal, names, fill_nodataval=0)
+
+
+def test_probabilities_scale_like_namedtuples(chip):
+    # Values that scale differently once rounded to float32, e.g. 0.29 -> 28 in float64 but 29 in float32
+    probs = np.array([0.29, 0.53, 0.58, 0.59, 0.07, 0.57, 0.56, 0.55, 0.14])
+    model = chip[0][0][0]._replace(change_prob=0.29, class_probs1=probs, class_probs2=probs[::-1])
+    rec = packmodels([[model]]).segments[0]
+
+    assert scaleprob(rec.change_prob) == scaleprob(model.change_prob)
+    assert [scaleprob(x) for x in rec.class_probs1] == [scaleprob(x) for x in probs]
+    assert [scaleprob(x) for x in rec.class_probs2] == [scaleprob(x) for x in probs[::-1]]
+
+
+def test_bandmodel_uses_packed_band_order(chip):
+    models = chip[0][:200]
+    packed = packmodels(models, band_names=_bands)
+
+    for m, p in zip(models, chipmodels(packed)):
+        for a, b in zip(m, p):
+            for name in _bands:
+                assert bandmodel(b, name) == bandmodel(a, name)
+
+
+def test_packed_segments_keep_time_order(chip):
+    for p in chipmodels(chip[1]):
+        assert np.all(np.diff(p.start_day) > 0)
@@ -0,0 +1,114 @@
+import os
+import time
+import socket
+
+from mapify.workqueue import (CLAIMED, DONE, FAILED, TODO, claim, enqueue, enqueuetiles, initqueue, nodestats,
+                              reclaim, runlocal, tileunit, unitname, worker)
+
+
+def _record(unit, outdir):
+    """
+    Payload function that leaves a mark for every time a unit is run
+    """
+    with open(os.path.join(outdir, unit), 'a') as f:
+        f.write('x')
+
+    time.sleep(0.01)
+
+
+def _explode(unit):
+    raise RuntimeError(unit)
+
+
+def _queue(tmp_path, units, start=0):
+    root = initqueue(str(tmp_path / 'queue'))
+    outdir = tmp_path / 'out'
+    outdir.mkdir(exist_ok=True)
+
+    for i in range(start, start + units):
+        enqueue(root, f'unit{i:03d}', {'unit': f'unit{i:03d}', 'outdir': str(outdir)})
+
+    return root, outdir
+
+
+def _listing(root, state):
+    return sorted(os.listdir(os.path.join(root, state)))
+
+
+def test_tiles_with_the_same_directory_name_get_their_own_units(tmp_path):
+    tiles = [{'outdir': str(tmp_path / 'v1' / 'h012v009')},
+             {'outdir': str(tmp_path / 'v2' / 'h012v009')}]
+
+    paths = enqueuetiles(str(tmp_path / 'queue'), tiles)
+
+    assert len(set(paths)) == 2
+    assert all(os.path.exists(p) for p in paths)
+    assert all(unitname(p).startswith('h012v009-') for p in paths)
+
+
+def test_tileunit_ignores_trailing_separators(tmp_path):
+    outdir = str(tmp_path / 'v1' / 'h012v009')
+
+    assert tileunit(outdir) == tileunit(outdir + os.sep)
+
+
+def test_local_workers_run_each_unit_exactly_once(tmp_path):
+    root, outdir = _queue(tmp_path, 30)
+
+    stats = runlocal(root, _record, nworkers=3, poll=0.05)
+
+    assert sorted(os.listdir(str(outdir))) == [f'unit{i:03d}' for i in range(30)]
+    assert all((outdir / name).read_text() == 'x' for name in os.listdir(str(outdir)))
+    assert _listing(root, DONE) == [f'unit{i:03d}.json' for i in range(30)]
+    assert _listing(root, TODO) == _listing(root, CLAIMED) == _listing(root, FAILED) == []
+    assert stats[socket.gethostname()]['units'] == 30
+
+
+def test_local_runs_add_to_the_worker_stats(tmp_path):
+    root, outdir = _queue(tmp_path, 4)
+    runlocal(root, _record, nworkers=2, poll=0.05)
+    first = nodestats(root)[socket.gethostname()]
+
+    _queue(tmp_path, 5, start=4)
+    second = runlocal(root, _record, nworkers=2, poll=0.05)[socket.gethostname()]
+
+    assert second['units'] == 9
+    assert second['busy'] > first['busy']
+    assert second['started'] == first['started']
+
+
+def test_only_one_claim_gets_a_unit(tmp_path):
+    root, outdir = _queue(tmp_path, 1)
+
+    first = claim(root, 'a')
+    second = claim(root, 'b')
+
+    assert first is not None and second is None
+    assert unitname(first[0]) == 'unit000'
+    assert first[1]['unit'] == 'unit000'
+    assert _listing(root, CLAIMED) == ['unit000@a.json']
+
+
+def test_expired_leases_go_back_in_the_queue(tmp_path):
+    root, outdir = _queue(tmp_path, 2)
+
+    stale, payload = claim(root, 'a')
+    claim(root, 'b')
+
+    # Only the unit whose worker stopped renewing the lease is put back
+    os.utime(stale, (time.time() - 600, time.time() - 600))
+
+    assert reclaim(root, lease=300) == 1
+    assert _listing(root, TODO) == [os.path.basename(stale).split('@')[0] + '.json']
+    assert _listing(root, CLAIMED) == ['unit001@b.json']
+
+
+def test_units_that_raise_are_marked_failed(tmp_path):
+    root = initqueue(str(tmp_path / 'queue'))
+    enqueue(root, 'bad', {'unit': 'bad'})
+
+    stats = worker(root, _explode, worker_id='w', poll=0.05)
+
+    assert _listing(root, FAILED) == ['bad.json']
+    assert _listing(root, TODO) == _listing(root, CLAIMED) == _listing(root, DONE) == []
+    assert stats['failed'] == 1 and stats['units'] == 0